@@ -0,0 +1,334 @@
+"""
+Mergeable accumulators for the business insights
+Every t-test, ANOVA and correlation in business_insights.json only needs counts,
+means and sums of squared deviations (Welford/Chan moments) of its groups, and
+the correlation needs the co-moments of its pairs. InsightAccumulator keeps
+these per discount side, per category and per bucket of the quantile split
+variables, so a batch of appended rows is folded in with O(batch) work and the
+tests are re-derived from a state whose size does not grow with the data.
+
+The quantile splits (price tertiles for insight4, the 90th-percentile
+rating_count for insight7) use log-spaced buckets of relative width ALPHA, as in
+DDSketch: the estimated quantile is within ALPHA (1%) of a value of the right
+rank, and only rows in the bucket holding a threshold can fall on the other side
+of the split than in a full run. Their number is reported as split_error_rows.
+"""
+
+import math
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+ACCUMULATOR_VERSION = 1
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+# Bucket of zero (and anything below MIN_VALUE)
+ZERO_BUCKET = -(2 ** 31)
+MIN_VALUE = 1e-9
+
+DISCOUNT_SPLIT = 30
+TOP_PRODUCTS_QUANTILE = 0.9
+PRICE_TIERS = ['Low', 'Mid', 'High']
+
+
+class Moments:
+    """Count, mean and sum of squared deviations (m2) of a sample"""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = int(n)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+
+    @classmethod
+    def of(cls, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls()
+        mean = values.mean()
+        return cls(len(values), mean, ((values - mean) ** 2).sum())
+
+    def merge(self, other):
+        """Chan et al.'s pairwise update; returns a new Moments"""
+        n = self.n + other.n
+        if not n:
+            return Moments()
+        delta = other.mean - self.mean
+        return Moments(n, self.mean + delta * other.n / n, self.m2 + other.m2 + delta * delta * self.n * other.n / n)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+
+class CoMoments:
+    """Moments of paired samples plus their co-moment, for the Pearson correlation"""
+
+    def __init__(self, n=0, mean_x=0.0, mean_y=0.0, m2_x=0.0, m2_y=0.0, c_xy=0.0):
+        self.n = int(n)
+        self.mean_x, self.mean_y = float(mean_x), float(mean_y)
+        self.m2_x, self.m2_y, self.c_xy = float(m2_x), float(m2_y), float(c_xy)
+
+    @classmethod
+    def of(cls, x, y):
+        x = np.asarray(x, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+        present = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[present], y[present]
+        if not len(x):
+            return cls()
+        dx, dy = x - x.mean(), y - y.mean()
+        return cls(len(x), x.mean(), y.mean(), (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum())
+
+    def merge(self, other):
+        n = self.n + other.n
+        if not n:
+            return CoMoments()
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        return CoMoments(n, self.mean_x + dx * other.n / n, self.mean_y + dy * other.n / n,
+                         self.m2_x + other.m2_x + dx * dx * weight, self.m2_y + other.m2_y + dy * dy * weight,
+                         self.c_xy + other.c_xy + dx * dy * weight)
+
+    @property
+    def correlation(self):
+        denominator = math.sqrt(self.m2_x * self.m2_y)
+        return self.c_xy / denominator if denominator else float('nan')
+
+
+# --- Moments per key, as DataFrames with n/mean/m2 columns ---
+
+def grouped_moments(keys, values):
+    """Moments of values per key (missing keys and values skipped)"""
+    frame = pd.DataFrame({'key': np.asarray(keys), 'value': np.asarray(values, dtype='float64')}).dropna()
+    grouped = frame.groupby('key')['value']
+    mean = grouped.transform('mean')
+    result = pd.DataFrame({
+        'n': grouped.size(),
+        'mean': grouped.mean(),
+        'm2': ((frame['value'] - mean) ** 2).groupby(frame['key']).sum(),
+    })
+    result.index.name = None
+    return result
+
+
+def merge_grouped(left, right):
+    """Per-key Chan merge of two grouped_moments frames (keys of either side kept)"""
+    if left is None:
+        return right
+    keys = left.index.union(right.index)
+    a = left.reindex(keys, fill_value=0)
+    b = right.reindex(keys, fill_value=0)
+    n = a['n'] + b['n']
+    delta = b['mean'] - a['mean']
+    safe_n = n.where(n > 0, 1)
+    return pd.DataFrame({
+        'n': n.astype('int64'),
+        'mean': a['mean'] + delta * b['n'] / safe_n,
+        'm2': a['m2'] + b['m2'] + delta * delta * a['n'] * b['n'] / safe_n,
+    }, index=keys)
+
+
+def total(frame):
+    """Moments of the union of the rows of a grouped_moments frame"""
+    frame = frame[frame['n'] > 0]
+    n = int(frame['n'].sum())
+    if not n:
+        return Moments()
+    mean = float((frame['n'] * frame['mean']).sum() / n)
+    return Moments(n, mean, float(frame['m2'].sum() + (frame['n'] * (frame['mean'] - mean) ** 2).sum()))
+
+
+# --- Log-spaced buckets for the quantile splits ---
+
+def log_bucket(values):
+    """Bucket of each value: k such that GAMMA**(k-1) < value <= GAMMA**k"""
+    values = np.asarray(values, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keys = np.ceil(np.log(np.maximum(values, MIN_VALUE)) / math.log(GAMMA))
+    return np.where(values > MIN_VALUE, keys, ZERO_BUCKET)
+
+
+def bucket_value(key):
+    """Value within ALPHA (relative) of everything in the bucket"""
+    return 0.0 if key == ZERO_BUCKET else 2 * GAMMA ** key / (GAMMA + 1)
+
+
+class SplitHistogram:
+    """
+    Rows per log bucket of a split variable x, plus the moments of a target y of
+    the rows with both values, so groups defined by quantiles of x can be formed
+    from whole buckets
+    """
+
+    def __init__(self):
+        self.counts = pd.Series(dtype='int64')
+        self.moments = None
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+        present = ~np.isnan(x)
+        keys = log_bucket(x[present])
+        counts = pd.Series(keys).value_counts()
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64').sort_index()
+        self.moments = merge_grouped(self.moments, grouped_moments(keys, y[present])).sort_index()
+        return self
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0).astype('int64').sort_index()
+        if other.moments is not None:
+            self.moments = merge_grouped(self.moments, other.moments).sort_index()
+        return self
+
+    def quantile(self, q):
+        """Linearly interpolated quantile of x, like Series.quantile, from the bucket values"""
+        n = int(self.counts.sum())
+        if not n:
+            return float('nan')
+        rank = q * (n - 1)
+        cumulative = self.counts.cumsum().to_numpy()
+        keys = self.counts.index.to_numpy()
+        low = bucket_value(keys[np.searchsorted(cumulative, math.floor(rank), side='right')])
+        high = bucket_value(keys[np.searchsorted(cumulative, math.ceil(rank), side='right')])
+        return low + (high - low) * (rank - math.floor(rank))
+
+    def split(self, thresholds, right=True):
+        """
+        Moments of y in the len(thresholds) + 1 groups cut at the buckets of the
+        thresholds, and the rows of y in those boundary buckets. A threshold's whole
+        bucket goes to the group below it (x <= t) when right, else above it (x >= t).
+        """
+        moments = self.moments if self.moments is not None else pd.DataFrame(columns=['n', 'mean', 'm2'])
+        edges = log_bucket(thresholds)
+        keys = moments.index.to_numpy()
+        group = np.searchsorted(edges, keys, side='left' if right else 'right')
+        groups = [total(moments[group == i]) for i in range(len(edges) + 1)]
+        boundary = int(moments.loc[np.isin(keys, edges), 'n'].sum())
+        return groups, boundary
+
+
+def insight_categories(category_stats):
+    """The top/bottom 5 categories by avg_rating and the 10 with the most rated products"""
+    return (category_stats.nlargest(5, 'avg_rating')['category'].tolist(),
+            category_stats.nsmallest(5, 'avg_rating')['category'].tolist(),
+            category_stats.nlargest(10, 'product_count')['category'].tolist())
+
+
+class InsightAccumulator:
+    """Mergeable state behind every business insight test"""
+
+    def __init__(self):
+        self.version = ACCUMULATOR_VERSION
+        self.rows = 0
+        # insight1/2: rating and rating_count on either side of DISCOUNT_SPLIT
+        self.rating_by_discount = [Moments(), Moments()]
+        self.reviews_by_discount = [Moments(), Moments()]
+        # insight3/5: rating and discount per category
+        self.category_rating = None
+        self.category_discount = None
+        # insight4: rating by price bucket, insight7: rating by rating_count bucket
+        self.price = SplitHistogram()
+        self.reviews = SplitHistogram()
+        # insight6: discount vs rating
+        self.discount_rating = CoMoments()
+
+    def update(self, df):
+        """Fold a cleaned frame (rows appended to the dataset) into the state"""
+        rating = df['rating_clean'].astype('float64')
+        discount = df['discount_percentage_clean'].astype('float64')
+        reviews = df['rating_count_clean'].astype('float64')
+        high = discount >= DISCOUNT_SPLIT
+        low = discount < DISCOUNT_SPLIT
+        self.rows += len(df)
+        self.rating_by_discount = [self.rating_by_discount[0].merge(Moments.of(rating[high])),
+                                   self.rating_by_discount[1].merge(Moments.of(rating[low]))]
+        self.reviews_by_discount = [self.reviews_by_discount[0].merge(Moments.of(reviews[high])),
+                                    self.reviews_by_discount[1].merge(Moments.of(reviews[low]))]
+        category = df['category'].astype(object)
+        self.category_rating = merge_grouped(self.category_rating, grouped_moments(category, rating))
+        self.category_discount = merge_grouped(self.category_discount, grouped_moments(category, discount))
+        self.price.update(df['discounted_price_clean'], rating)
+        self.reviews.update(reviews, rating)
+        self.discount_rating = self.discount_rating.merge(CoMoments.of(discount, rating))
+        return self
+
+    def merge(self, other):
+        """Merge another InsightAccumulator (e.g. of another partition) into this one"""
+        self.rows += other.rows
+        self.rating_by_discount = [a.merge(b) for a, b in zip(self.rating_by_discount, other.rating_by_discount)]
+        self.reviews_by_discount = [a.merge(b) for a, b in zip(self.reviews_by_discount, other.reviews_by_discount)]
+        if other.category_rating is not None:
+            self.category_rating = merge_grouped(self.category_rating, other.category_rating)
+            self.category_discount = merge_grouped(self.category_discount, other.category_discount)
+        self.price.merge(other.price)
+        self.reviews.merge(other.reviews)
+        self.discount_rating = self.discount_rating.merge(other.discount_rating)
+        return self
+
+    def category_stats(self):
+        """avg_rating and product_count per category, as in PartialAggregates.category_stats"""
+        part = self.category_rating.sort_index()
+        return pd.DataFrame({
+            'category': part.index.to_numpy(dtype=object),
+            'avg_rating': part['mean'].round(2).to_numpy(),
+            'product_count': part['n'].astype('int64').to_numpy(),
+        })
+
+    def summaries(self):
+        """{insight id: (group moments, extra fields)}, the input of process_data.insight_records"""
+        top_cats, bottom_cats, top_10_cats = insight_categories(self.category_stats())
+        ratings, discounts = self.category_rating, self.category_discount
+        cat_discounts = discounts.loc[discounts.index.isin(top_10_cats)].sort_index()
+        edges = [self.price.quantile(1 / 3), self.price.quantile(2 / 3)]
+        tiers, tier_boundary = self.price.split(edges)
+        threshold = self.reviews.quantile(TOP_PRODUCTS_QUANTILE)
+        (others, top), top_boundary = self.reviews.split([threshold], right=False)
+        return {
+            'insight1': (self.rating_by_discount, {}),
+            'insight2': (self.reviews_by_discount, {}),
+            'insight3': ([total(ratings.loc[ratings.index.isin(top_cats)]),
+                          total(ratings.loc[ratings.index.isin(bottom_cats)])],
+                         {'top_categories': top_cats, 'bottom_categories': bottom_cats}),
+            'insight4': (tiers if log_bucket(edges)[0] != log_bucket(edges)[1] else [],
+                         {'split_error_rows': tier_boundary}),
+            'insight5': ([Moments(*row) for row in cat_discounts[['n', 'mean', 'm2']].itertuples(index=False)],
+                         {'category_means': {cat: discounts['mean'].get(cat, float('nan')) for cat in top_10_cats[:5]}}),
+            'insight6': (self.discount_rating, {}),
+            'insight7': ([top, others], {'split_error_rows': top_boundary}),
+        }
+
+
+# --- Tests from moments ---
+
+def ttest(a, b):
+    """Student's two-sample t-test (equal variances, like stats.ttest_ind) from Moments"""
+    result = stats.ttest_ind_from_stats(a.mean, math.sqrt(a.variance), a.n, b.mean, math.sqrt(b.variance), b.n)
+    return result.statistic, result.pvalue
+
+
+def anova(groups):
+    """One-way ANOVA F statistic and p-value (like stats.f_oneway) from Moments"""
+    n = sum(g.n for g in groups)
+    k = len(groups)
+    grand = sum(g.n * g.mean for g in groups) / n
+    between = sum(g.n * (g.mean - grand) ** 2 for g in groups)
+    within = sum(g.m2 for g in groups)
+    f_stat = (between / (k - 1)) / (within / (n - k))
+    return f_stat, stats.f.sf(f_stat, k - 1, n - k)
+
+
+def load_accumulator(path):
+    """Load a saved InsightAccumulator, or None if the file is missing or from another version"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if getattr(state, 'version', None) != ACCUMULATOR_VERSION:
+        return None
+    return state
@@ -0,0 +1,247 @@
+"""
+Mergeable partial aggregates for the Amazon Sales pipeline
+Lets the category/price/discount statistics be built chunk by chunk (or in
+parallel) and finalized into the same tables process_data.py writes
+"""
+
+import pandas as pd
+
+from cleaning import clean_frame
+
+# Binning shared with process_data.py
+PRICE_RANGE_BINS = [0, 500, 1000, 2000, 5000, float('inf')]
+PRICE_RANGE_LABELS = ['0-500', '500-1000', '1000-2000', '2000-5000', '5000+']
+DISCOUNT_RANGE_BINS = [0, 10, 20, 30, 40, 50, 100]
+DISCOUNT_RANGE_LABELS = ['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+']
+Q3_BINS = [0, 500, 1000, 2000, 5000, 10000, float('inf')]
+Q3_LABELS = ['0-500', '500-1k', '1k-2k', '2k-5k', '5k-10k', '10k+']
+
+# Raw columns the aggregates need, so chunked reads can skip the rest
+RAW_COLUMNS = ['product_id', 'category', 'discounted_price', 'actual_price',
+               'discount_percentage', 'rating', 'rating_count']
+
+# value column -> (prefix of its sum/sumsq/n partials, fixed-point scale of the sum).
+# Sums are kept as scaled integers so partials merge exactly in any order; the
+# inputs are parsed from text with at most a few decimals.
+VALUE_COLUMNS = {
+    'rating_clean': ('rating', 10000),
+    'discounted_price_clean': ('price', 10000),
+    'discount_percentage_clean': ('discount', 10000),
+    'rating_count_clean': ('reviews', 1),
+}
+VALUE_COLUMNS_BY_PREFIX = {prefix: scale for prefix, scale in VALUE_COLUMNS.values()}
+
+
+def add_ranges(df):
+    """Add the price_range/discount_range categoricals to a cleaned frame"""
+    df['price_range'] = pd.cut(df['discounted_price_clean'], bins=PRICE_RANGE_BINS, labels=PRICE_RANGE_LABELS)
+    df['discount_range'] = pd.cut(df['discount_percentage_clean'], bins=DISCOUNT_RANGE_BINS, labels=DISCOUNT_RANGE_LABELS)
+    return df
+
+
+def _partial_frame(df):
+    # Per-row contributions: sums, sums of squares and non-null counts of every value column
+    cols = {'rows': df['product_id'].notna().astype('int64')}
+    for col, (prefix, scale) in VALUE_COLUMNS.items():
+        values = df[col].astype('float64')
+        present = values.notna()
+        cols[f'{prefix}_sum'] = (values * scale).round().fillna(0).astype('int64')
+        cols[f'{prefix}_sumsq'] = (values * values).fillna(0)
+        cols[f'{prefix}_n'] = present.astype('int64')
+    return pd.DataFrame(cols, index=df.index)
+
+
+def _partials(df, key=None):
+    # Partial sums grouped by key (or a single 'all' row when key is None)
+    frame = _partial_frame(df)
+    if key is None:
+        return frame.groupby(pd.Series('all', index=df.index)).sum()
+    return frame.groupby(df[key], observed=True).sum()
+
+
+def category_cube(df):
+    """
+    Partial sums of a cleaned frame per (category, price_range, discount_range, Q3 bins) cell,
+    plus the cell size 'n'. Missing keys are kept as their own cells, so the cube holds
+    everything PartialAggregates needs and cells of one category can be replaced on their own.
+    """
+    frame = _partial_frame(df)
+    frame['n'] = 1
+    keys = [
+        df['category'],
+        df['price_range'],
+        df['discount_range'],
+        pd.cut(df['discounted_price_clean'], bins=Q3_BINS, labels=Q3_LABELS).rename('q3_discounted'),
+        pd.cut(df['actual_price_clean'], bins=Q3_BINS, labels=Q3_LABELS).rename('q3_actual'),
+    ]
+    return frame.groupby(keys, observed=True, dropna=False).sum()
+
+
+def _mean(part, prefix):
+    scale = VALUE_COLUMNS_BY_PREFIX[prefix]
+    return part[f'{prefix}_sum'] / (part[f'{prefix}_n'] * scale)
+
+
+def _combine(left, right):
+    if left is None:
+        return right
+    return pd.concat([left, right]).groupby(level=0, observed=True).sum()
+
+
+class PartialAggregates:
+    """Running sums/counts per category, price bin and discount bin plus the Q3 histogram"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.overall = None
+        self.by_category = None
+        self.by_price_range = None
+        self.by_discount_range = None
+        self.q3_discounted = pd.Series(0, index=Q3_LABELS, dtype='int64')
+        self.q3_actual = pd.Series(0, index=Q3_LABELS, dtype='int64')
+
+    def update(self, df):
+        """Fold a cleaned frame (with price_range/discount_range) into the aggregates"""
+        self.total_rows += len(df)
+        self.overall = _combine(self.overall, _partials(df))
+        self.by_category = _combine(self.by_category, _partials(df, 'category'))
+        self.by_price_range = _combine(self.by_price_range, _partials(df, 'price_range'))
+        self.by_discount_range = _combine(self.by_discount_range, _partials(df, 'discount_range'))
+        disc_bins = pd.cut(df['discounted_price_clean'], bins=Q3_BINS, labels=Q3_LABELS)
+        actual_bins = pd.cut(df['actual_price_clean'], bins=Q3_BINS, labels=Q3_LABELS)
+        self.q3_discounted += disc_bins.value_counts().reindex(Q3_LABELS, fill_value=0)
+        self.q3_actual += actual_bins.value_counts().reindex(Q3_LABELS, fill_value=0)
+        return self
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Build the aggregates from a category_cube (or a concatenation of cubes)"""
+        aggregates = cls()
+        cells = cube.reset_index()
+        values = cells.drop(columns=list(cube.index.names) + ['n'])
+        aggregates.total_rows = int(cells['n'].sum())
+        aggregates.overall = values.groupby(pd.Series('all', index=cells.index)).sum()
+        aggregates.by_category = values.groupby(cells['category'], observed=True).sum()
+        aggregates.by_price_range = values.groupby(cells['price_range'], observed=True).sum()
+        aggregates.by_discount_range = values.groupby(cells['discount_range'], observed=True).sum()
+        aggregates.q3_discounted = cells.groupby('q3_discounted', observed=True)['n'].sum().reindex(Q3_LABELS, fill_value=0).astype('int64')
+        aggregates.q3_actual = cells.groupby('q3_actual', observed=True)['n'].sum().reindex(Q3_LABELS, fill_value=0).astype('int64')
+        return aggregates
+
+    def merge(self, other):
+        """Merge another PartialAggregates into this one"""
+        self.total_rows += other.total_rows
+        for name in ['overall', 'by_category', 'by_price_range', 'by_discount_range']:
+            if getattr(other, name) is not None:
+                setattr(self, name, _combine(getattr(self, name), getattr(other, name)))
+        self.q3_discounted += other.q3_discounted
+        self.q3_actual += other.q3_actual
+        return self
+
+    # --- Finalization into the dashboard tables ---
+
+    def category_stats(self):
+        part = self.by_category.sort_index()
+        stats_df = pd.DataFrame({
+            'avg_rating': _mean(part, 'rating'),
+            'product_count': part['rating_n'].astype('int64'),
+            'avg_price': _mean(part, 'price'),
+            'avg_discount': _mean(part, 'discount'),
+            'total_reviews': part['reviews_sum'].astype('int64'),
+        }).round(2)
+        stats_df.index.name = 'category'
+        return stats_df.reset_index()
+
+    def _range_stats(self, part, labels, name):
+        if part is None:
+            part = pd.DataFrame(columns=['rows', 'rating_sum', 'rating_n'])
+        part = part.reindex(labels, fill_value=0)
+        return pd.DataFrame({
+            name: pd.Categorical(labels, categories=labels, ordered=True),
+            'avg_rating': _mean(part, 'rating').round(2).to_numpy(),
+            'product_count': part['rows'].astype('int64').to_numpy(),
+        })
+
+    def price_range_stats(self):
+        return self._range_stats(self.by_price_range, PRICE_RANGE_LABELS, 'price_range')
+
+    def discount_stats(self):
+        return self._range_stats(self.by_discount_range, DISCOUNT_RANGE_LABELS, 'discount_range')
+
+    def summary_stats(self):
+        return {
+            'total_products': int(self.total_rows),
+            'total_categories': int(len(self.by_category)),
+            'avg_rating': float(_mean(self.overall, 'rating').iloc[0]),
+            'avg_price': float(_mean(self.overall, 'price').iloc[0]),
+            'avg_discount': float(_mean(self.overall, 'discount').iloc[0]),
+            'total_reviews': int(self.overall['reviews_sum'].iloc[0]),
+        }
+
+    def q3_price_distribution(self):
+        return [{'price_range': label, 'discounted_count': int(self.q3_discounted[label]), 'actual_count': int(self.q3_actual[label])}
+                for label in Q3_LABELS]
+
+
+def aggregate_csv(path, chunksize=100000, encoding='utf-8', consumers=()):
+    """
+    Stream a raw CSV in chunks and return its PartialAggregates; every cleaned
+    chunk is also passed to consumer.update() (e.g. a sampling.ScatterSampler)
+    """
+    aggregates = PartialAggregates()
+    for chunk in pd.read_csv(path, encoding=encoding, usecols=RAW_COLUMNS, chunksize=chunksize):
+        chunk = add_ranges(clean_frame(chunk))
+        aggregates.update(chunk)
+        for consumer in consumers:
+            consumer.update(chunk)
+    return aggregates
+
+
+def top_products_by_category(df, n=3):
+    """
+    Q2: the n most-reviewed products of every category as (category, rows) pairs in
+    category order; with a product_group column (dedup.with_groups) each group is
+    listed once per category, under its most-reviewed listing
+    """
+    # Same rows as grp.nlargest(n, 'rating_count_clean') per group: stable descending
+    # sort (ties keep row order, missing counts last), then the first n of each category
+    ranked = df.sort_values('rating_count_clean', ascending=False, kind='stable', na_position='last')
+    grouped = 'product_group' in ranked.columns
+    if grouped:
+        ranked = ranked[~(ranked.duplicated(['category', 'product_group']) & ranked['product_group'].notna())]
+    top = ranked.groupby('category').head(n).sort_values('category', kind='stable')
+    result = []
+    for cat, grp in top.groupby('category', sort=False):
+        cat_short = cat.split('|')[-1] if isinstance(cat, str) else str(cat)
+        rows = []
+        groups = grp['product_group'] if grouped else [None] * len(grp)
+        for name, count, rating, group in zip(grp['product_name'], grp['rating_count_clean'], grp['rating_clean'], groups):
+            rows.append({
+                'category': cat_short,
+                'product_name': (name[:60] + '...') if len(str(name)) > 60 else name,
+                'rating_count': int(count) if pd.notna(count) else 0,
+                'rating': round(float(rating), 2) if pd.notna(rating) else None
+            })
+            if grouped:
+                rows[-1]['product_group'] = group if isinstance(group, str) else None
+        result.append((cat, rows))
+    return result
+
+
+def product_popularity(df):
+    """
+    Q5: occurrences, mean rating and total reviews per product_name, in product_name
+    order; with a product_group column, per group under its canonical name, plus the
+    number of distinct names (variants) it was listed under
+    """
+    if 'product_group' in df.columns:
+        counts = df.groupby('product_group', observed=True).agg(
+            product_name=('canonical_name', 'first'), occurrences=('product_id', 'count'),
+            avg_rating=('rating_clean', 'mean'), total_reviews=('rating_count_clean', 'sum'),
+            variants=('product_name', 'nunique')).reset_index()
+        # Plain strings, so the tables sort and merge by value
+        counts = counts.astype({'product_name': object, 'product_group': object})
+        return counts[['product_name', 'product_group', 'occurrences', 'avg_rating', 'total_reviews', 'variants']]
+    counts = df.groupby('product_name').agg({'product_id': 'count', 'rating_clean': 'mean', 'rating_count_clean': 'sum'}).reset_index()
+    counts.columns = ['product_name', 'occurrences', 'avg_rating', 'total_reviews']
+    return counts
@@ -0,0 +1,98 @@
+"""
+Benchmark: per-row apply() cleaners vs the vectorized cleaning module
+Checks both paths agree on synthetic ₹/comma/percent formatted columns, then times them
+
+Usage: python benchmarks/bench_cleaning.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cleaning import (clean_price, clean_discount, clean_rating_count,
+                      clean_price_column, clean_discount_column, clean_rating_count_column)
+
+
+def make_columns(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    # Log-uniform list prices snapped to ₹..9 price points, a few with paise
+    actual = np.round(np.exp(rng.uniform(np.log(99), np.log(150000), rows)), -1) - 1
+    actual[rng.random(rows) < 0.05] += 0.5
+    discount = rng.integers(0, 95, rows)
+    discounted = np.round(actual * (1 - discount / 100))
+    # Heavy-tailed review counts
+    counts = np.minimum(rng.lognormal(6, 2.5, rows), 500000).astype(int)
+    cols = pd.DataFrame({
+        'discounted_price': ['₹{:,.2f}'.format(v).replace('.00', '') for v in discounted],
+        'actual_price': ['₹{:,.2f}'.format(v).replace('.00', '') for v in actual],
+        'discount_percentage': [f'{d}%' for d in discount],
+        'rating_count': [f'{c:,}' for c in counts],
+    })
+    # Sprinkle in missing and malformed values
+    for col in cols.columns:
+        cols.loc[rng.random(rows) < 0.01, col] = np.nan
+    cols.loc[rng.random(rows) < 0.001, 'rating_count'] = 'n/a'
+    cols.loc[rng.random(rows) < 0.001, 'discount_percentage'] = '--%'
+    return cols
+
+
+def legacy(cols):
+    return pd.DataFrame({
+        'discounted_price': cols['discounted_price'].apply(clean_price),
+        'actual_price': cols['actual_price'].apply(clean_price),
+        'discount_percentage': cols['discount_percentage'].apply(clean_discount),
+        'rating_count': cols['rating_count'].apply(clean_rating_count),
+    })
+
+
+def vectorized(cols):
+    return pd.DataFrame({
+        'discounted_price': clean_price_column(cols['discounted_price']),
+        'actual_price': clean_price_column(cols['actual_price']),
+        'discount_percentage': clean_discount_column(cols['discount_percentage']),
+        'rating_count': clean_rating_count_column(cols['rating_count']),
+    })
+
+
+def timed(fn, cols, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(cols)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cols = make_columns(args.rows)
+    old, old_time = timed(legacy, cols, args.repeat)
+    new, new_time = timed(vectorized, cols, args.repeat)
+
+    for col in cols.columns:
+        expected = old[col].astype('float64')
+        actual = new[col].astype('float64')
+        if not np.array_equal(expected.to_numpy(), actual.to_numpy(), equal_nan=True):
+            raise SystemExit(f"Mismatch in {col}")
+
+    old_mem = old.memory_usage(deep=True).sum() / 1e6
+    new_mem = new.memory_usage(deep=True).sum() / 1e6
+    print(f"rows: {args.rows:,}")
+    print(f"  apply():    {old_time:8.3f}s  {old_mem:8.1f} MB")
+    print(f"  vectorized: {new_time:8.3f}s  {new_mem:8.1f} MB")
+    print(f"  speedup:    {old_time / new_time:8.2f}x")
+    print("  outputs identical")
+
+
+if __name__ == '__main__':
+    main()
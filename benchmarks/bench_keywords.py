@@ -0,0 +1,91 @@
+"""
+Benchmark: Q6 list-of-keywords value_counts vs the keywords module
+Checks the exact counter matches the old output on synthetic product names, then
+reports time, peak traced memory and top-20 recall of the Space-Saving summary
+
+Usage: python benchmarks/bench_keywords.py --rows 1000000 --capacity 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from keywords import top_keywords
+
+
+def _word(i):
+    # i written in base 26 with letters, so every word is alphabetic
+    letters = 'ab'
+    while i:
+        i, digit = divmod(i, 26)
+        letters += chr(ord('a') + digit)
+    return letters
+
+
+def make_names(rows, products=None, vocabulary=20000, seed=42):
+    rng = np.random.default_rng(seed)
+    products = products or max(1, rows // 4)
+    # Zipf-distributed words, 6-20 per name, plus some model numbers that are not keywords
+    words = np.array([_word(i) for i in range(vocabulary)], dtype=object)
+    names = []
+    for _ in range(products):
+        picks = np.minimum(rng.zipf(1.3, rng.integers(6, 21)), vocabulary) - 1
+        tokens = list(words[picks])
+        tokens.append(f'X{rng.integers(100, 999)}')
+        names.append(' '.join(tokens).title())
+    names = np.array(names, dtype=object)
+    # Popular listings repeat
+    return pd.Series(names[np.minimum(rng.zipf(1.5, rows), products) - 1])
+
+
+def legacy(names):
+    all_kw = []
+    for name in names.dropna():
+        if isinstance(name, str):
+            all_kw.extend(w.lower() for w in name.split() if w.isalpha() and len(w) > 1)
+    return list(pd.Series(all_kw).value_counts().head(20).items())
+
+
+def traced(fn, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--capacity', type=int, default=2000)
+    args = parser.parse_args()
+
+    names = make_names(args.rows)
+    old, old_time, old_peak = traced(legacy, names)
+    exact, exact_time, exact_peak = traced(top_keywords, names)
+    approx, approx_time, approx_peak = traced(top_keywords, names, capacity=args.capacity)
+
+    if exact != old:
+        raise SystemExit("Exact keyword counts differ from the list/value_counts version")
+    recall = len({k for k, _ in approx} & {k for k, _ in old}) / max(1, len(old))
+    worst = max((count - dict(old).get(k, count)) for k, count in approx) if approx else 0
+
+    print(f"rows: {args.rows:,}")
+    print(f"  list + value_counts:  {old_time:8.3f}s  peak {old_peak:8.1f} MB")
+    print(f"  exact counter:        {exact_time:8.3f}s  peak {exact_peak:8.1f} MB")
+    print(f"  space-saving ({args.capacity}): {approx_time:8.3f}s  peak {approx_peak:8.1f} MB"
+          f"  top-20 recall {recall:.0%}, max overestimate {worst}")
+    print("  exact output identical")
+
+
+if __name__ == '__main__':
+    main()
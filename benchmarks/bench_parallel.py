@@ -0,0 +1,86 @@
+"""
+Benchmark: scaling of the category/product aggregations from 1 to N worker processes
+Builds a synthetic cleaned frame, checks every worker count reproduces the serial
+result, and reports the time per stage
+
+Usage: python benchmarks/bench_parallel.py --rows 2000000 --categories 5000 --max-workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from aggregates import add_ranges
+from parallel import get_backend, parallel_aggregates, parallel_top_products, parallel_product_popularity
+
+
+def make_frame(rows, categories, products, seed=42):
+    rng = np.random.default_rng(seed)
+    cat_names = np.array([f'Top{i % 20}|Mid{i % 300}|Leaf{i}' for i in range(categories)], dtype=object)
+    product_names = np.array([f'Product {i} with a reasonably long catalog title' for i in range(products)], dtype=object)
+    actual = np.round(np.exp(rng.uniform(np.log(99), np.log(150000), rows)), -1) - 1
+    discount = rng.integers(0, 95, rows).astype(float)
+    df = pd.DataFrame({
+        'product_id': [f'B{i:09d}' for i in range(rows)],
+        'product_name': product_names[rng.integers(0, products, rows)],
+        'category': cat_names[rng.zipf(1.3, rows) % categories],
+        'discounted_price_clean': np.round(actual * (1 - discount / 100)),
+        'actual_price_clean': actual,
+        'discount_percentage_clean': discount,
+        'rating_clean': np.round(rng.uniform(2, 5, rows), 1),
+        'rating_count_clean': pd.array(np.minimum(rng.lognormal(6, 2.5, rows), 500000).astype(int), dtype='Int32'),
+    })
+    return add_ranges(df)
+
+
+def run(df, workers):
+    backend = get_backend(workers)
+    timings = {}
+    start = time.perf_counter()
+    aggregates = parallel_aggregates(df, backend)
+    timings['aggregates'] = time.perf_counter() - start
+    start = time.perf_counter()
+    q2 = parallel_top_products(df, backend)
+    timings['q2_top_products'] = time.perf_counter() - start
+    start = time.perf_counter()
+    q5 = parallel_product_popularity(df, backend)
+    timings['q5_popularity'] = time.perf_counter() - start
+    return (aggregates.category_stats(), q2, q5), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--categories', type=int, default=3000)
+    parser.add_argument('--products', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.categories, args.products)
+    print(f"rows: {args.rows:,}  categories: {df['category'].nunique():,}  products: {df['product_name'].nunique():,}")
+    print(f"{'workers':>8} {'aggregates':>11} {'q2':>8} {'q5':>8} {'total':>8} {'speedup':>8}")
+
+    baseline, baseline_total = None, None
+    workers = 1
+    while workers <= args.max_workers:
+        result, timings = run(df, workers)
+        total = sum(timings.values())
+        if baseline is None:
+            baseline, baseline_total = result, total
+        else:
+            pd.testing.assert_frame_equal(result[0], baseline[0])
+            assert result[1] == baseline[1], "Q2 rows differ from serial run"
+            pd.testing.assert_frame_equal(result[2], baseline[2])
+        print(f"{workers:>8} {timings['aggregates']:>10.2f}s {timings['q2_top_products']:>7.2f}s "
+              f"{timings['q5_popularity']:>7.2f}s {total:>7.2f}s {baseline_total / total:>7.2f}x")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Benchmark: the full process_data.py pipeline on synthetic Amazon-style CSVs
+Generates exports of the requested sizes (₹1,099 prices, |-delimited category
+paths, comma-formatted rating counts), runs the pipeline on each in a fresh
+process with --profile and writes wall time, peak RSS and (with --allocations)
+traced allocations per stage to one JSON file. With --baseline, stages that got
+slower than the threshold are listed and the exit status is 1.
+
+The pipeline runs with --resamples 0. With --resamples N, each size also gets a
+separate '<size>+resampling' run of just the business insights with N resamples.
+
+Usage: python benchmarks/bench_pipeline.py --sizes 10k 1m 10m --output bench_pipeline.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPT = os.path.join(ROOT, 'process_data.py')
+
+DEPARTMENTS = {
+    'Electronics': ['Mobiles&Accessories', 'HomeTheater,TV&Video', 'Headphones,Earbuds&Accessories', 'Cameras&Photography', 'WearableTechnology'],
+    'Computers&Accessories': ['Accessories&Peripherals', 'NetworkingDevices', 'ExternalDevices&DataStorage', 'Printers,Inks&Accessories', 'Monitors'],
+    'Home&Kitchen': ['Kitchen&HomeAppliances', 'Heating,Cooling&AirQuality', 'HomeStorage&Organization', 'Kitchen&Dining', 'Furniture'],
+    'OfficeProducts': ['OfficePaperProducts', 'OfficeElectronics', 'Arts&Crafts'],
+    'MusicalInstruments': ['Microphones', 'Keyboards'],
+    'Toys&Games': ['Arts&Crafts', 'Puzzles'],
+}
+LEAVES = ['Cables', 'Chargers', 'Cases&Covers', 'Adapters', 'Stands', 'Remotes', 'Batteries', 'Filters',
+          'Mice', 'Keyboards', 'Bags', 'Lamps', 'Kettles', 'Mixers', 'Heaters', 'Fans', 'Notebooks', 'Pens']
+WORDS = ['USB', 'Type', 'Cable', 'Fast', 'Charging', 'Smart', 'TV', 'Wireless', 'Bluetooth', 'Black', 'White',
+         'with', 'for', 'and', 'to', 'in', 'of', 'HD', 'LED', 'Data', 'Sync', 'Braided', 'Compatible', 'iPhone',
+         'Android', 'Laptop', 'Stainless', 'Steel', 'Water', 'Bottle', 'Electric', 'Kettle', 'Portable', 'Mini',
+         'Pro', 'Ultra', 'Power', 'Bank', 'Mouse', 'Keyboard', 'Speaker', 'Watch', 'Earbuds', 'Noise', 'Cancelling',
+         'Mic', 'Camera', 'Tripod', 'Stand', 'Holder', 'Adjustable', 'Ergonomic', 'Premium', 'Durable', 'Heavy',
+         'Duty', 'Pack', 'Set', 'Combo', 'Original', 'Warranty', 'Year', 'Inch', 'Full', 'Display', 'Home', 'Office']
+TITLES = ['Good product', 'Value for money', 'Nice', 'Worth the price', 'Excellent', 'Not bad', 'Average',
+          'Works as expected', 'Poor quality', 'Stopped working', 'Great product', 'Awesome', 'Satisfied']
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def _format_rupees(values):
+    # Thousands separators for each distinct value only, then broadcast back
+    codes, uniques = pd.factorize(values)
+    return np.array(['₹{:,}'.format(v) for v in uniques], dtype=object)[codes]
+
+
+def _format_counts(values):
+    codes, uniques = pd.factorize(values)
+    return np.array(['{:,}'.format(v) for v in uniques], dtype=object)[codes]
+
+
+def make_products(count, rng):
+    categories = [f'{top}|{mid}|{leaf}' for top, mids in DEPARTMENTS.items() for mid in mids
+                  for leaf in LEAVES if rng.random() < 0.6]
+    words = np.array(WORDS, dtype=object)
+    lengths = rng.integers(4, 16, count)
+    picks = rng.integers(0, len(words), lengths.sum())
+    ends = np.cumsum(lengths)
+    names = [' '.join(words[picks[end - n:end]]) + f' {rng.integers(1, 999)}GB' for n, end in zip(lengths, ends)]
+    actual = (np.round(np.exp(rng.uniform(np.log(199), np.log(150000), count)), -2) - 1).astype('int64')
+    discount = rng.integers(0, 91, count)
+    discounted = np.maximum(np.round(actual * (1 - discount / 100), -1) - 1, 49).astype('int64')
+    return pd.DataFrame({
+        'product_id': [f'B0{i:08X}' for i in rng.permutation(count) + 0x1000000],
+        'product_name': names,
+        'category': np.array(categories, dtype=object)[rng.zipf(1.4, count) % len(categories)],
+        'discounted_price': _format_rupees(discounted),
+        'actual_price': _format_rupees(actual),
+        'discount_percentage': [f'{d}%' for d in discount],
+    })
+
+
+def make_csv(path, rows, seed=42, chunk_rows=1000000):
+    """Write a synthetic raw export of `rows` rows to path (popular products are listed more than once)"""
+    rng = np.random.default_rng(seed)
+    products = make_products(max(1, rows * 2 // 3), rng)
+    titles = np.array(TITLES, dtype=object)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        chunk = products.iloc[(rng.zipf(1.2, n) - 1) % len(products)].reset_index(drop=True)
+        rating = np.round(np.clip(rng.normal(4.1, 0.3, n), 2, 5), 1).astype(str).astype(object)
+        rating[rng.random(n) < 0.0005] = '|'
+        counts = _format_counts(np.minimum(rng.lognormal(6, 2.5, n), 500000).astype('int64'))
+        counts[rng.random(n) < 0.002] = np.nan
+        chunk['rating'] = rating
+        chunk['rating_count'] = counts
+        chunk['review_title'] = titles[rng.integers(0, len(titles), n)]
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def run(csv_path, workdir, allocations, extra):
+    profile = os.path.join(workdir, 'profile.json')
+    cmd = [sys.executable, SCRIPT, '--input', csv_path, '--output-dir', os.path.join(workdir, 'out'),
+           '--cache-dir', os.path.join(workdir, 'cache'), '--no-cache', '--profile', profile, *extra]
+    if allocations:
+        cmd.append('--trace-allocations')
+    subprocess.run(cmd, cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+    with open(profile, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def regressions(result, baseline, threshold):
+    """(size, stage, old seconds, new seconds) for stages slower than baseline by more than threshold"""
+    found = []
+    old_runs = {run['size']: run for run in baseline['runs']}
+    for run in result['runs']:
+        old = old_runs.get(run['size'])
+        if old is None:
+            continue
+        old_stages = {step['stage']: step['seconds'] for step in old['stages']}
+        for step in run['stages'] + [{'stage': 'total', 'seconds': run['total_seconds']}]:
+            before = old_stages.get(step['stage'], old['total_seconds'] if step['stage'] == 'total' else None)
+            # Ignore stages too short to time reliably
+            if before is not None and step['seconds'] > 0.05 and step['seconds'] > before * (1 + threshold):
+                found.append((run['size'], step['stage'], before, step['seconds']))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'], help='rows per generated CSV, e.g. 10k 1m 10m')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'amazon_bench'),
+                        help='where generated CSVs are kept and reused')
+    parser.add_argument('--output', default='bench_pipeline.json')
+    parser.add_argument('--allocations', action='store_true', help='trace Python allocations per stage (slower)')
+    parser.add_argument('--baseline', default=None, help='earlier --output file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown per stage (0.25 = 25%%)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--resamples', type=int, default=0,
+                        help='also profile the business insights with this many resamples as a separate case')
+    parser.add_argument('pipeline_args', nargs=argparse.REMAINDER,
+                        help='extra process_data.py arguments after --, e.g. -- --workers 4')
+    args = parser.parse_args()
+    # Resampling is profiled on its own (--resamples), not inside every pipeline run
+    extra = ['--resamples', '0'] + [a for a in args.pipeline_args if a != '--']
+    cases = [('', [])]
+    if args.resamples:
+        cases.append(('+resampling', ['--only', 'business_insights', '--resamples', str(args.resamples)]))
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    result = {'pipeline_args': extra, 'runs': []}
+    for size in args.sizes:
+        rows = parse_size(size)
+        csv_path = os.path.join(args.data_dir, f'amazon_{size}_{args.seed}.csv')
+        if not os.path.exists(csv_path):
+            print(f"Generating {rows:,} rows -> {csv_path}")
+            make_csv(csv_path + '.tmp', rows, seed=args.seed)
+            os.replace(csv_path + '.tmp', csv_path)
+        for suffix, case_args in cases:
+            with tempfile.TemporaryDirectory() as workdir:
+                profile = run(csv_path, workdir, args.allocations, extra + case_args)
+            profile.update({'size': size + suffix, 'rows': rows})
+            result['runs'].append(profile)
+
+            print(f"\n{size}{suffix} ({rows:,} rows): {profile['total_seconds']:.2f}s, peak RSS {profile['peak_rss_mb']} MB")
+            for step in sorted(profile['stages'], key=lambda step: -step['seconds'])[:12]:
+                extra_cols = f"  alloc peak {step['peak_allocated_mb']:8.1f} MB" if 'peak_allocated_mb' in step else ''
+                print(f"  {step['stage']:32s} {step['seconds']:8.3f}s  rss {step.get('peak_rss_mb', 0):8.1f} MB{extra_cols}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(result, json.load(f), args.threshold)
+        for size, stage, before, after in found:
+            print(f"  REGRESSION {size} {stage}: {before:.3f}s -> {after:.3f}s")
+        if found:
+            raise SystemExit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
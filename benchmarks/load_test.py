@@ -0,0 +1,173 @@
+"""
+Load test for server.py: concurrent keep-alive clients issuing a mix of queries
+Reports p50/p90/p99/max latency and throughput. With --input a server is started
+on a free port for the run (otherwise --host/--port must point at a running one).
+
+Usage: python benchmarks/load_test.py --input amazon_sales_data.csv --concurrency 32 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SERVER = os.path.join(ROOT, 'server.py')
+
+PRICE_RANGES = ['0-500', '500-1000', '1000-2000', '2000-5000', '5000+']
+DISCOUNT_RANGES = ['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+']
+
+
+async def request(reader, writer, host, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, body
+
+
+def make_queries(prefixes, count, distinct, seed):
+    """count request paths drawn from `distinct` different queries (controls the cache hit rate)"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        prefix = quote(rng.choice(prefixes), safe='')
+        price = rng.choice(PRICE_RANGES)
+        discount = rng.choice(DISCOUNT_RANGES)
+        page = rng.randrange(0, 5)
+        pool.append(rng.choice([
+            f'/api/category_stats?prefix={prefix}&sort=avg_rating&limit=25&offset={page * 25}',
+            f'/api/category_stats?level={rng.randrange(1, 4)}&price_range={price}',
+            f'/api/products?prefix={prefix}&price_range={price}&sort=rating_count&limit=20&offset={page * 20}',
+            f'/api/products?discount_range={quote(discount)}&sort=rating&limit=50',
+            f'/api/top_products?prefix={prefix}&limit=30&offset={page * 30}',
+            f'/api/top_rated_products?price_range={price}',
+            f'/api/summary_stats?prefix={prefix}',
+        ]))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+async def client(host, port, queue, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((status, path))
+    finally:
+        writer.close()
+
+
+async def run(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, body = await request(reader, writer, args.host, '/api/category_stats?level=2&limit=1000')
+    writer.close()
+    prefixes = [row['category'] for row in json.loads(body)]
+    prefixes += [p.split('|')[0] for p in prefixes]
+
+    queue = asyncio.Queue()
+    for path in make_queries(prefixes, args.requests, args.distinct, args.seed):
+        queue.put_nowait(path)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(args.host, args.port, queue, latencies, errors) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    result = {
+        'requests': len(latencies),
+        'concurrency': args.concurrency,
+        'distinct_queries': args.distinct,
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p90_ms': round(float(np.percentile(ms, 90)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'max_ms': round(float(ms.max()), 2),
+    }
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, body = await request(reader, writer, args.host, '/api/health')
+    writer.close()
+    result['server_cache'] = json.loads(body)['cache']
+    return result, errors
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    args.port = free_port()
+    proc = subprocess.Popen([sys.executable, SERVER, '--input', args.input, '--port', str(args.port),
+                             '--cache-size', str(args.cache_size)], stdout=subprocess.DEVNULL)
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((args.host, args.port), timeout=1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit("Server exited during startup")
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("Server did not start in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', default=None, help='start server.py on this CSV for the test')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--distinct', type=int, default=500, help='distinct queries in the mix')
+    parser.add_argument('--cache-size', type=int, default=512, help='server LRU size when started with --input')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='also write the results as JSON')
+    args = parser.parse_args()
+
+    proc = start_server(args) if args.input else None
+    try:
+        result, errors = asyncio.run(run(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+    for status, path in errors[:5]:
+        print(f"  error {status}: {path}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
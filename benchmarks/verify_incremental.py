@@ -0,0 +1,102 @@
+"""
+Check: incremental runs produce byte-identical outputs to a full rebuild
+Builds a synthetic raw CSV, applies several rounds of edits (modified, added,
+removed, reordered and re-categorized rows) and compares every output the
+incremental mode writes against a fresh full run of process_data.py
+
+Usage: python benchmarks/verify_incremental.py --rows 20000 --rounds 4
+"""
+
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPT = os.path.join(ROOT, 'process_data.py')
+
+INCREMENTAL_OUTPUTS = [
+    'category_stats.json', 'price_range_stats.json', 'discount_stats.json', 'summary_stats.json',
+    'top_categories.json', 'top_rated_products.json', 'category_tree.json',
+    'insight_q1_avg_rating_by_category.json', 'insight_q2_top_products_by_category.json',
+    'insight_q3_price_distribution.json', 'insight_q4_avg_discount_by_category.json',
+    'insight_q5_popular_products.json', 'insight_q9_top5_categories.json',
+]
+
+
+def make_raw(rows, rng):
+    categories = [f'Dept{i % 7}|Group{i % 40}|Leaf{i}' for i in range(300)]
+    actual = np.round(np.exp(rng.uniform(np.log(99), np.log(150000), rows)), -1) - 1
+    discount = rng.integers(0, 95, rows)
+    discounted = np.round(actual * (1 - discount / 100))
+    return pd.DataFrame({
+        'product_id': [f'B{i:09d}' for i in rng.integers(0, rows, rows)],
+        'product_name': [f'Product {i} cable charger' for i in rng.integers(0, rows // 3, rows)],
+        'category': np.array(categories, dtype=object)[rng.integers(0, len(categories), rows)],
+        'discounted_price': ['₹{:,.0f}'.format(v) for v in discounted],
+        'actual_price': ['₹{:,.0f}'.format(v) for v in actual],
+        'discount_percentage': [f'{d}%' for d in discount],
+        'rating': np.round(rng.uniform(2, 5, rows), 1).astype(str),
+        'rating_count': ['{:,}'.format(c) for c in rng.integers(0, 50000, rows)],
+    })
+
+
+def mutate(raw, rng):
+    raw = raw.copy()
+    n = len(raw)
+    edit = rng.choice(n, size=max(1, n // 200), replace=False)
+    raw.loc[edit, 'rating'] = np.round(rng.uniform(1, 5, len(edit)), 1).astype(str)
+    raw.loc[edit[::2], 'discounted_price'] = '₹1,099'
+    moved = rng.choice(n, size=max(1, n // 500), replace=False)
+    raw.loc[moved, 'category'] = raw['category'].iloc[rng.integers(0, n, len(moved))].to_numpy()
+    raw = raw.drop(index=rng.choice(n, size=max(1, n // 300), replace=False))
+    added = make_raw(max(1, n // 250), rng)
+    raw = pd.concat([raw, added], ignore_index=True)
+    # Swap two rows inside one category (changes tie order only)
+    cat = raw['category'].iloc[0]
+    same = raw.index[raw['category'] == cat][:2]
+    if len(same) == 2:
+        raw.loc[[same[0], same[1]]] = raw.loc[[same[1], same[0]]].to_numpy()
+    return raw.reset_index(drop=True)
+
+
+def run(workdir, *args):
+    os.makedirs(os.path.join(workdir, 'dashboard_data'), exist_ok=True)
+    subprocess.run([sys.executable, SCRIPT, '--input', os.path.join(workdir, '..', 'input.csv'), *args],
+                   cwd=workdir, check=True, stdout=subprocess.DEVNULL, env={**os.environ, 'PYTHONPATH': ROOT})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    raw = make_raw(args.rows, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        incremental_dir = os.path.join(tmp, 'incremental')
+        full_dir = os.path.join(tmp, 'full')
+        state = os.path.join(tmp, 'state.pkl')
+        for round_no in range(args.rounds + 1):
+            if round_no:
+                raw = mutate(raw, rng)
+            raw.to_csv(os.path.join(tmp, 'input.csv'), index=False)
+            run(incremental_dir, '--incremental', state)
+            run(full_dir)
+            mismatched = [name for name in INCREMENTAL_OUTPUTS
+                          if not filecmp.cmp(os.path.join(incremental_dir, 'dashboard_data', name),
+                                             os.path.join(full_dir, 'dashboard_data', name), shallow=False)]
+            if mismatched:
+                raise SystemExit(f"round {round_no}: incremental output differs from full rebuild: {mismatched}")
+            print(f"round {round_no}: {len(raw):,} rows, {len(INCREMENTAL_OUTPUTS)} outputs byte-identical")
+
+
+if __name__ == '__main__':
+    main()
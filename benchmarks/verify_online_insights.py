@@ -0,0 +1,97 @@
+"""
+Check: business insights updated with --append agree with a full recompute
+Builds a synthetic raw CSV, writes the insight accumulators from a full run on
+its first rows, then appends the remaining rows batch by batch. After each batch
+the --append result is compared with a full run over all rows seen so far:
+every insight must have the same fields, insights 1, 2, 3, 5 and 6 must match
+up to rounding, and the group sizes of the quantile-split insights 4 and 7 may
+differ by at most their split_error_rows.
+
+Usage: python benchmarks/verify_online_insights.py --rows 50000 --batches 4
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from verify_incremental import make_raw
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPT = os.path.join(ROOT, 'process_data.py')
+
+EXACT = ['insight1', 'insight2', 'insight3', 'insight5', 'insight6']
+
+
+def run(workdir, *args):
+    os.makedirs(os.path.join(workdir, 'dashboard_data'), exist_ok=True)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, SCRIPT, '--no-cache', '--resamples', '0', *args],
+                   cwd=workdir, check=True, stdout=subprocess.DEVNULL, env={**os.environ, 'PYTHONPATH': ROOT})
+    with open(os.path.join(workdir, 'dashboard_data', 'business_insights.json'), encoding='utf-8') as f:
+        return {insight['id']: insight for insight in json.load(f)}, time.perf_counter() - start
+
+
+def same(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-6, abs_tol=1e-4)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batches', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    raw = make_raw(args.rows, rng)
+    base_rows = args.rows // 2
+    bounds = np.linspace(base_rows, args.rows, args.batches + 1).astype(int)
+    with tempfile.TemporaryDirectory() as tmp:
+        online_dir = os.path.join(tmp, 'online')
+        full_dir = os.path.join(tmp, 'full')
+        state = os.path.join(tmp, 'insights.pkl')
+        raw.iloc[:base_rows].to_csv(os.path.join(tmp, 'base.csv'), index=False)
+        run(online_dir, '--input', os.path.join(tmp, 'base.csv'), '--only', 'business_insights', '--insight-state', state)
+        for batch_no, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]), 1):
+            batch_path = os.path.join(tmp, f'batch{batch_no}.csv')
+            raw.iloc[start:end].to_csv(batch_path, index=False)
+            online, online_time = run(online_dir, '--append', batch_path, '--insight-state', state)
+            raw.iloc[:end].to_csv(os.path.join(tmp, 'input.csv'), index=False)
+            full, full_time = run(full_dir, '--input', os.path.join(tmp, 'input.csv'), '--only', 'business_insights')
+
+            if {k: list(v) for k, v in online.items()} != {k: list(v) for k, v in full.items()}:
+                raise SystemExit(f"batch {batch_no}: appended insights have different fields than a full run")
+            mismatched = [name for name in EXACT if not same(online[name], full[name])]
+            if mismatched:
+                raise SystemExit(f"batch {batch_no}: appended insights differ from a full run: {mismatched}")
+            top_gap = abs(online['insight7']['top_products_count'] - full['insight7']['top_products_count'])
+            if top_gap > online['insight7']['split_error_rows']:
+                raise SystemExit(f"batch {batch_no}: insight7 groups differ by {top_gap} rows, "
+                                 f"more than split_error_rows={online['insight7']['split_error_rows']}")
+            tier_gap = max(abs(online['insight4']['tier_means'][t] - full['insight4']['tier_means'][t])
+                           for t in full['insight4']['tier_means'])
+            count_gap = max(abs(online['insight4']['tier_counts'][t] - full['insight4']['tier_counts'][t])
+                            for t in full['insight4']['tier_counts'])
+            if count_gap > online['insight4']['split_error_rows']:
+                raise SystemExit(f"batch {batch_no}: insight4 tiers differ by {count_gap} rows, "
+                                 f"more than split_error_rows={online['insight4']['split_error_rows']}")
+            print(f"batch {batch_no}: {end:,} rows, append {online_time:.2f}s vs full {full_time:.2f}s; "
+                  f"insights {', '.join(EXACT)} match; insight4 F {online['insight4']['f_statistic']} vs "
+                  f"{full['insight4']['f_statistic']} (tier means within {tier_gap:.3f}, "
+                  f"{online['insight4']['split_error_rows']} boundary rows); insight7 top group off by {top_gap} "
+                  f"of {online['insight7']['split_error_rows']} boundary rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Columnar cache of the cleaned dataset
+The cleaned frame is written as uncompressed Feather (Arrow IPC) keyed by the
+input file's size, mtime and SHA-256 and by the source of the cleaning code
+(so a change to cleaning.py or the range buckets is a cache miss), and read back through a memory map with
+category/product_name dictionary-encoded. Requires pyarrow; without it the
+cache is disabled and every run re-parses the CSV.
+"""
+
+import hashlib
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+CACHE_VERSION = 1
+
+# Modules that produce the cached frame; their source is part of the cache key
+CLEANING_SOURCES = ['cleaning.py', 'aggregates.py', 'cache.py']
+
+# Columns later stages use; the long raw text columns are not cached
+CACHED_COLUMNS = [
+    'product_id', 'product_name', 'category', 'review_title',
+    'discounted_price_clean', 'actual_price_clean', 'discount_amount',
+    'discount_percentage_clean', 'rating_clean', 'rating_count_clean',
+    'price_range', 'discount_range',
+]
+DICTIONARY_COLUMNS = ['category', 'product_name']
+
+
+def available():
+    return pa is not None
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cleaning_version():
+    """SHA-256 of the CLEANING_SOURCES"""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in CLEANING_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _input_key(input_path):
+    return hashlib.sha256(os.path.abspath(input_path).encode('utf-8')).hexdigest()[:16]
+
+
+def _meta_path(input_path, cache_dir):
+    # One metadata file per input path, pointing at the cache file for its current content
+    return os.path.join(cache_dir, f'{_input_key(input_path)}.json')
+
+
+def _load_meta(input_path, cache_dir):
+    path = _meta_path(input_path, cache_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_meta(input_path, cache_dir):
+    # The metadata if it was written by this cache version and cleaning code
+    meta = _load_meta(input_path, cache_dir)
+    if meta is None or meta.get('version') != CACHE_VERSION or meta.get('code') != cleaning_version():
+        return None
+    if not os.path.exists(os.path.join(cache_dir, meta['file'])):
+        return None
+    return meta
+
+
+def _write_meta(meta, input_path, cache_dir):
+    path = _meta_path(input_path, cache_dir)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_cleaned(input_path, cache_dir):
+    """Return the cached cleaned frame for input_path, or None if there is no valid cache"""
+    if not available():
+        return None
+    meta = _read_meta(input_path, cache_dir)
+    if meta is None:
+        return None
+    stat = os.stat(input_path)
+    if meta['size'] != stat.st_size:
+        return None
+    if meta['mtime_ns'] != stat.st_mtime_ns:
+        # Touched but possibly unchanged: fall back to the content hash
+        if file_sha256(input_path) != meta['sha256']:
+            return None
+        meta['mtime_ns'] = stat.st_mtime_ns
+        _write_meta(meta, input_path, cache_dir)
+    return read_feather(os.path.join(cache_dir, meta['file']))
+
+
+def input_sha256(input_path, cache_dir):
+    """SHA-256 of input_path, taken from the cache metadata while size and mtime still match"""
+    meta = _read_meta(input_path, cache_dir) if available() else None
+    stat = os.stat(input_path)
+    if meta is not None and meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+        return meta['sha256']
+    return file_sha256(input_path)
+
+
+def read_feather(path):
+    """Memory-mapped read of an uncompressed Feather file into pandas"""
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def store_cleaned(df, input_path, cache_dir):
+    """Write the cleaned frame to the cache for input_path and return the cache file path"""
+    if not available():
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(input_path)
+    sha256 = file_sha256(input_path)
+    table = df[[col for col in CACHED_COLUMNS if col in df.columns]].copy()
+    for col in DICTIONARY_COLUMNS:
+        table[col] = table[col].astype('category')
+    name = f'{_input_key(input_path)}-{sha256[:16]}.feather'
+    path = os.path.join(cache_dir, name)
+    # Uncompressed so the file can be memory-mapped on read
+    feather.write_feather(table, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+
+    old = _load_meta(input_path, cache_dir)
+    _write_meta({'version': CACHE_VERSION, 'code': cleaning_version(), 'input': os.path.abspath(input_path),
+                 'size': stat.st_size,
+                 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256, 'file': name}, input_path, cache_dir)
+    if old is not None and old.get('file') not in (None, name) and os.path.exists(os.path.join(cache_dir, old['file'])):
+        os.remove(os.path.join(cache_dir, old['file']))
+    return path
@@ -0,0 +1,129 @@
+"""
+Cleaning helpers for the Amazon Sales Dataset
+Parses the ₹/comma/percent formatted columns with vectorized string ops
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# First number in a price string once currency symbols and commas are gone
+PRICE_PATTERN = re.compile(r'(\d+\.?\d*)')
+
+INT32_MIN = np.iinfo(np.int32).min
+INT32_MAX = np.iinfo(np.int32).max
+
+
+# --- Scalar cleaners (original per-row implementation, kept as reference) ---
+
+def clean_price(price_str):
+    if pd.isna(price_str):
+        return None
+    # Remove currency symbols and commas
+    price_str = str(price_str).replace('₹', '').replace(',', '').strip()
+    # Extract numbers
+    numbers = re.findall(r'\d+\.?\d*', price_str)
+    if numbers:
+        return float(numbers[0])
+    return None
+
+
+def clean_discount(discount_str):
+    if pd.isna(discount_str):
+        return None
+    discount_str = str(discount_str).replace('%', '').strip()
+    try:
+        return float(discount_str)
+    except:
+        return None
+
+
+def clean_rating_count(count_str):
+    if pd.isna(count_str):
+        return None
+    count_str = str(count_str).replace(',', '').strip()
+    try:
+        return int(float(count_str))
+    except:
+        return None
+
+
+# --- Vectorized cleaners ---
+
+def _as_text(series):
+    # str() of every non-null value, nulls kept as NaN so they stay missing
+    text = series.astype(str)
+    return text.where(series.notna())
+
+
+def _parse_uniques(series, parse):
+    # Formatted prices/counts repeat heavily, so parse each distinct string once
+    # and broadcast the result back through the factorized codes
+    codes, uniques = pd.factorize(series)
+    parsed = parse(pd.Series(uniques)).to_numpy('float64')
+    values = np.full(len(codes), np.nan)
+    valid = codes >= 0
+    values[valid] = parsed[codes[valid]]
+    return pd.Series(values, index=series.index)
+
+
+def _compact_float(values, compact=True):
+    # float32 only when it round-trips every value exactly
+    values = values.astype('float64')
+    if compact:
+        narrow = values.astype('float32')
+        if np.array_equal(narrow.to_numpy('float64'), values.to_numpy(), equal_nan=True):
+            return narrow
+    return values
+
+
+def _compact_int(values):
+    # Int32 whenever the range allows it, Int64 otherwise (both lossless)
+    values = values.astype('Int64')
+    if values.dropna().empty or (values.min() >= INT32_MIN and values.max() <= INT32_MAX):
+        return values.astype('Int32')
+    return values
+
+
+def clean_price_column(series, compact=False):
+    """Vectorized equivalent of clean_price"""
+    def parse(uniques):
+        text = _as_text(uniques).str.replace('₹', '', regex=False).str.replace(',', '', regex=False)
+        return pd.to_numeric(text.str.extract(PRICE_PATTERN, expand=False), errors='coerce')
+    return _compact_float(_parse_uniques(series, parse), compact)
+
+
+def clean_discount_column(series, compact=False):
+    """Vectorized equivalent of clean_discount"""
+    def parse(uniques):
+        text = _as_text(uniques).str.replace('%', '', regex=False).str.strip()
+        return pd.to_numeric(text, errors='coerce')
+    return _compact_float(_parse_uniques(series, parse), compact)
+
+
+def clean_rating_count_column(series):
+    """Vectorized equivalent of clean_rating_count (nullable integer result)"""
+    def parse(uniques):
+        text = _as_text(uniques).str.replace(',', '', regex=False).str.strip()
+        return pd.to_numeric(text, errors='coerce').astype('float64')
+    values = _parse_uniques(series, parse)
+    # int(float(x)) truncates toward zero and rejects inf
+    values = np.trunc(values.where(np.isfinite(values)))
+    return _compact_int(values)
+
+
+def clean_frame(df, compact=False):
+    """
+    Add the *_clean columns used by the pipeline to df (in place) and return it.
+    Counts are always nullable integers; compact=True also stores prices and
+    discounts as float32 where that is lossless. It is off by default because
+    float32 means and sums drift in the rounded dashboard outputs.
+    """
+    df['discounted_price_clean'] = clean_price_column(df['discounted_price'], compact)
+    df['actual_price_clean'] = clean_price_column(df['actual_price'], compact)
+    df['discount_amount'] = df['actual_price_clean'] - df['discounted_price_clean']
+    df['discount_percentage_clean'] = clean_discount_column(df['discount_percentage'], compact)
+    df['rating_clean'] = pd.to_numeric(df['rating'], errors='coerce')
+    df['rating_count_clean'] = clean_rating_count_column(df['rating_count'])
+    return df
@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import StatCard from '@/components/StatCard'
 import CategoryChart from '@/components/CategoryChart'
 import PriceRangeChart from '@/components/PriceRangeChart'
@@ -28,8 +29,7 @@ export default function Home() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/summary_stats.json')
-      .then(res => res.json())
+    fetchOutput('summary_stats.json')
       .then(data => {
         setSummaryStats(data)
         setLoading(false)
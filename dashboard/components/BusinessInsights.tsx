@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import { TrendingUp, TrendingDown, Minus, CheckCircle, XCircle, AlertCircle } from 'lucide-react'
 
 interface BusinessInsight {
@@ -20,8 +21,7 @@ export default function BusinessInsights() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/business_insights.json')
-      .then(res => res.json())
+    fetchOutput('business_insights.json')
       .then((data: BusinessInsight[]) => {
         setInsights(data)
         setLoading(false)
@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchData } from '@/lib/api'
 import { ComposedChart, Bar, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts'
 
 interface CategoryData {
@@ -14,9 +15,8 @@ export default function CategoryChart() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/category_stats.json')
-      .then(res => res.json())
-      .then((data: CategoryData[]) => {
+    fetchData<CategoryData[]>('category_stats?sort=product_count&limit=10', 'category_stats.json')
+      .then(data => {
         const sorted = data
           .filter(item => item.product_count > 0)
           .sort((a, b) => b.product_count - a.product_count)
@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import { ComposedChart, Bar, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts'
 
 interface DiscountData {
@@ -14,8 +15,7 @@ export default function DiscountChart() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/discount_stats.json')
-      .then(res => res.json())
+    fetchOutput('discount_stats.json')
       .then((data: DiscountData[]) => {
         setData(data.filter(item => item.discount_range !== 'nan'))
         setLoading(false)
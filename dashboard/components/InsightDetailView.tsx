@@ -1,18 +1,24 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchData, fetchOutput } from '@/lib/api'
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, ScatterChart, Scatter } from 'recharts'
 
-const INSIGHT_DATA_URL: Record<string, string> = {
-  q1: '/dashboard_data/insight_q1_avg_rating_by_category.json',
-  q2: '/dashboard_data/insight_q2_top_products_by_category.json',
-  q3: '/dashboard_data/insight_q3_price_distribution.json',
-  q4: '/dashboard_data/insight_q4_avg_discount_by_category.json',
-  q5: '/dashboard_data/insight_q5_popular_products.json',
-  q6: '/dashboard_data/insight_q6_keywords.json',
-  q7: '/dashboard_data/insight_q7_popular_reviews.json',
-  q8: '/dashboard_data/insight_q8_correlation.json',
-  q9: '/dashboard_data/insight_q9_top5_categories.json',
+const INSIGHT_DATA_FILE: Record<string, string> = {
+  q1: 'insight_q1_avg_rating_by_category.json',
+  q2: 'insight_q2_top_products_by_category.json',
+  q3: 'insight_q3_price_distribution.json',
+  q4: 'insight_q4_avg_discount_by_category.json',
+  q5: 'insight_q5_popular_products.json',
+  q6: 'insight_q6_keywords.json',
+  q7: 'insight_q7_popular_reviews.json',
+  q8: 'insight_q8_correlation.json',
+  q9: 'insight_q9_top5_categories.json',
+}
+
+// Insights the query API can serve (same records as the static file)
+const INSIGHT_API_PATH: Record<string, string> = {
+  q2: 'top_products?limit=30',
 }
 
 interface InsightDetailViewProps {
@@ -24,14 +30,14 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    const url = INSIGHT_DATA_URL[insightId]
-    if (!url) {
+    const file = INSIGHT_DATA_FILE[insightId]
+    if (!file) {
       setLoading(false)
       return
     }
     setLoading(true)
-    fetch(url)
-      .then(res => res.json())
+    const request = INSIGHT_API_PATH[insightId] ? fetchData(INSIGHT_API_PATH[insightId], file) : fetchOutput(file)
+    request
       .then(setData)
       .catch(() => setData(null))
       .finally(() => setLoading(false))
@@ -49,7 +55,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
 
   switch (insightId) {
     case 'q1': {
-      const rows = data as { category_short: string; avg_rating: number }[]
+      const rows = data as { category_short: string; category_path?: string; avg_rating: number }[]
       return (
         <div className="overflow-x-auto -mx-2">
           <table className="min-w-full text-sm">
@@ -62,7 +68,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
             <tbody>
               {rows.map((r, i) => (
                 <tr key={i} className="border-b border-gray-100">
-                  <td className="py-2 px-2 text-gray-800">{r.category_short}</td>
+                  <td className="py-2 px-2 text-gray-800" title={r.category_path}>{r.category_short}</td>
                   <td className="py-2 px-2 text-right font-medium">{r.avg_rating}</td>
                 </tr>
               ))}
@@ -115,7 +121,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
       )
     }
     case 'q4': {
-      const rows = data as { category_short: string; avg_discount: number }[]
+      const rows = data as { category_short: string; category_path?: string; avg_discount: number }[]
       return (
         <div className="overflow-x-auto -mx-2">
           <table className="min-w-full text-sm">
@@ -128,7 +134,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
             <tbody>
               {rows.map((r, i) => (
                 <tr key={i} className="border-b border-gray-100">
-                  <td className="py-2 px-2 text-gray-800">{r.category_short}</td>
+                  <td className="py-2 px-2 text-gray-800" title={r.category_path}>{r.category_short}</td>
                   <td className="py-2 px-2 text-right font-medium">{r.avg_discount}%</td>
                 </tr>
               ))}
@@ -138,7 +144,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
       )
     }
     case 'q5': {
-      const rows = data as { product_name_short: string; occurrences: number; avg_rating: number; total_reviews: number }[]
+      const rows = data as { product_name_short: string; occurrences: number; avg_rating: number; total_reviews: number; variants?: number }[]
       return (
         <div className="overflow-x-auto -mx-2 max-h-64 overflow-y-auto">
           <table className="min-w-full text-sm">
@@ -153,7 +159,10 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
             <tbody>
               {rows.map((r, i) => (
                 <tr key={i} className="border-b border-gray-100">
-                  <td className="py-2 px-2 text-gray-800">{r.product_name_short}</td>
+                  <td className="py-2 px-2 text-gray-800">
+                    {r.product_name_short}
+                    {r.variants && r.variants > 1 ? <span className="text-gray-500"> (+{r.variants - 1} similar names)</span> : null}
+                  </td>
                   <td className="py-2 px-2 text-right">{r.occurrences}</td>
                   <td className="py-2 px-2 text-right">{r.avg_rating}</td>
                   <td className="py-2 px-2 text-right">{r.total_reviews?.toLocaleString() ?? '-'}</td>
@@ -223,7 +232,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
       )
     }
     case 'q9': {
-      const rows = data as { category_short: string; avg_rating: number; product_count: number }[]
+      const rows = data as { category_short: string; category_path?: string; avg_rating: number; product_count: number }[]
       return (
         <div className="overflow-x-auto -mx-2">
           <table className="min-w-full text-sm">
@@ -237,7 +246,7 @@ export default function InsightDetailView({ insightId }: InsightDetailViewProps)
             <tbody>
               {rows.map((r, i) => (
                 <tr key={i} className="border-b border-gray-100">
-                  <td className="py-2 px-2 text-gray-800">{r.category_short}</td>
+                  <td className="py-2 px-2 text-gray-800" title={r.category_path}>{r.category_short}</td>
                   <td className="py-2 px-2 text-right font-medium">{r.avg_rating}</td>
                   <td className="py-2 px-2 text-right">{r.product_count}</td>
                 </tr>
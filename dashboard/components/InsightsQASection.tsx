@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import {
   BarChart3,
   Star,
@@ -41,8 +42,7 @@ export default function InsightsQASection() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/insights_qa.json')
-      .then(res => res.json())
+    fetchOutput('insights_qa.json')
       .then((data: InsightItem[]) => {
         setItems(data.filter(item => !['q3', 'q6', 'q8'].includes(item.id)))
         setLoading(false)
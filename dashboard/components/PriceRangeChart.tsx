@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import { ComposedChart, Bar, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts'
 
 interface PriceRangeData {
@@ -14,8 +15,7 @@ export default function PriceRangeChart() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/price_range_stats.json')
-      .then(res => res.json())
+    fetchOutput('price_range_stats.json')
       .then((data: PriceRangeData[]) => {
         setData(data.filter(item => item.price_range !== 'nan'))
         setLoading(false)
@@ -1,25 +1,70 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import { ScatterChart, Scatter, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts'
 
 interface ScatterPoint {
   price: number
   rating: number
+  category?: string
+  price_range?: string
+  weight?: number
+}
+
+interface DensityLevel {
+  price_bins: number
+  rating_bins: number
+  cells: [number, number, number][]
 }
 
 interface CorrelationData {
   correlation: number
   scatter: ScatterPoint[]
+  sample?: { rows: number; strata: number; per_stratum: number }
+  density?: { price_log10: [number, number]; rating: [number, number]; levels: DensityLevel[] }
+}
+
+const LEVEL_NAMES = ['Coarse', 'Medium', 'Fine', 'Finest']
+
+// Price x rating heatmap of one density level (log price axis, darker = more products)
+function DensityHeatmap({ density, level }: { density: NonNullable<CorrelationData['density']>; level: DensityLevel }) {
+  const [low, high] = density.price_log10
+  const [minRating, maxRating] = density.rating
+  const max = Math.max(1, ...level.cells.map(cell => cell[2]))
+  const width = 600
+  const height = 300
+  const cellWidth = width / level.price_bins
+  const cellHeight = height / level.rating_bins
+  const priceAt = (bin: number) => Math.round(10 ** (low + ((high - low) * bin) / level.price_bins))
+  const ratingAt = (bin: number) => (minRating + ((maxRating - minRating) * bin) / level.rating_bins).toFixed(1)
+  return (
+    <svg viewBox={`0 0 ${width} ${height}`} className="w-full h-80 bg-gray-50 rounded">
+      {level.cells.map(([x, y, count]) => (
+        <rect
+          key={`${x}-${y}`}
+          x={x * cellWidth}
+          y={height - (y + 1) * cellHeight}
+          width={cellWidth}
+          height={cellHeight}
+          fill="#3b82f6"
+          fillOpacity={0.15 + 0.85 * Math.sqrt(count / max)}
+        >
+          <title>{`₹${priceAt(x).toLocaleString()}-${priceAt(x + 1).toLocaleString()}, rating ${ratingAt(y)}-${ratingAt(y + 1)}: ${count.toLocaleString()} products`}</title>
+        </rect>
+      ))}
+    </svg>
+  )
 }
 
 export default function PriceRatingCorrelationChart() {
   const [data, setData] = useState<CorrelationData | null>(null)
   const [loading, setLoading] = useState(true)
+  const [view, setView] = useState<'sample' | 'density'>('sample')
+  const [level, setLevel] = useState(1)
 
   useEffect(() => {
-    fetch('/dashboard_data/insight_q8_correlation.json')
-      .then(res => res.json())
+    fetchOutput('insight_q8_correlation.json')
       .then((data: CorrelationData) => {
         setData(data)
         setLoading(false)
@@ -30,6 +75,8 @@ export default function PriceRatingCorrelationChart() {
   if (loading) return <div className="h-64 flex items-center justify-center text-gray-500">Loading...</div>
   if (!data) return null
 
+  const levels = data.density?.levels ?? []
+
   return (
     <div>
       <p className="text-sm text-gray-700 mb-3">
@@ -37,15 +84,44 @@ export default function PriceRatingCorrelationChart() {
         <span className="font-mono bg-gray-100 px-2 py-0.5 rounded">{data.correlation}</span>
         {' '}(weak positive)
       </p>
-      <ResponsiveContainer width="100%" height={320}>
-        <ScatterChart margin={{ top: 8, right: 8, bottom: 8, left: 8 }}>
-          <CartesianGrid strokeDasharray="3 3" />
-          <XAxis dataKey="price" name="Price (₹)" tick={{ fontSize: 10 }} />
-          <YAxis dataKey="rating" name="Rating" domain={[3, 5]} tick={{ fontSize: 10 }} />
-          <Tooltip cursor={{ strokeDasharray: '3 3' }} />
-          <Scatter data={data.scatter} fill="#3b82f6" name="Product" />
-        </ScatterChart>
-      </ResponsiveContainer>
+      {levels.length > 0 && (
+        <div className="flex flex-wrap items-center gap-2 mb-3 text-sm">
+          {(['sample', 'density'] as const).map(option => (
+            <button
+              key={option}
+              onClick={() => setView(option)}
+              className={`px-3 py-1 rounded ${view === option ? 'bg-blue-600 text-white' : 'bg-gray-100 text-gray-700'}`}
+            >
+              {option === 'sample' ? 'Sampled products' : 'Density'}
+            </button>
+          ))}
+          {view === 'density' && (
+            <select value={level} onChange={e => setLevel(Number(e.target.value))} className="border rounded px-2 py-1">
+              {levels.map((l, i) => (
+                <option key={i} value={i}>{`${LEVEL_NAMES[i] ?? i} (${l.price_bins} x ${l.rating_bins})`}</option>
+              ))}
+            </select>
+          )}
+          {view === 'sample' && data.sample && (
+            <span className="text-gray-500">
+              {data.scatter.length} of {data.sample.rows.toLocaleString()} products, up to {data.sample.per_stratum} per department and price range
+            </span>
+          )}
+        </div>
+      )}
+      {view === 'density' && data.density && levels[level] ? (
+        <DensityHeatmap density={data.density} level={levels[level]} />
+      ) : (
+        <ResponsiveContainer width="100%" height={320}>
+          <ScatterChart margin={{ top: 8, right: 8, bottom: 8, left: 8 }}>
+            <CartesianGrid strokeDasharray="3 3" />
+            <XAxis dataKey="price" name="Price (₹)" scale="log" domain={['auto', 'auto']} tick={{ fontSize: 10 }} />
+            <YAxis dataKey="rating" name="Rating" domain={[3, 5]} tick={{ fontSize: 10 }} />
+            <Tooltip cursor={{ strokeDasharray: '3 3' }} />
+            <Scatter data={data.scatter} fill="#3b82f6" name="Product" />
+          </ScatterChart>
+        </ResponsiveContainer>
+      )}
     </div>
   )
 }
@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts'
 
 interface PriceRow {
@@ -14,8 +15,7 @@ export default function PriceVsDiscountChart() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/insight_q3_price_distribution.json')
-      .then(res => res.json())
+    fetchOutput('insight_q3_price_distribution.json')
       .then((data: PriceRow[]) => {
         setData(data)
         setLoading(false)
@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchOutput } from '@/lib/api'
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts'
 
 interface KeywordRow {
@@ -13,8 +14,7 @@ export default function ProductKeywordsChart() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/insight_q6_keywords.json')
-      .then(res => res.json())
+    fetchOutput('insight_q6_keywords.json')
       .then((data: KeywordRow[]) => {
         setData(data)
         setLoading(false)
@@ -1,6 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
+import { fetchData } from '@/lib/api'
 
 interface Product {
   product_name: string
@@ -18,9 +19,8 @@ export default function TopProductsTable() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetch('/dashboard_data/top_rated_products.json')
-      .then(res => res.json())
-      .then((data: Product[]) => {
+    fetchData<Product[]>('top_rated_products?limit=5', 'top_rated_products.json')
+      .then(data => {
         setData(data.slice(0, 5))
         setLoading(false)
       })
@@ -0,0 +1,57 @@
+// Data loading: the query API from server.py when NEXT_PUBLIC_API_URL is set
+// (e.g. http://localhost:8000), otherwise the files in /dashboard_data
+
+const API_URL = process.env.NEXT_PUBLIC_API_URL
+
+interface Manifest {
+  bundle?: { file: string }
+  outputs?: Record<string, { file?: string }>
+}
+
+let manifest: Promise<Manifest | null> | null = null
+let bundle: Promise<Record<string, unknown> | null> | null = null
+
+// manifest.json (revalidated on each load) is the commit point of a run: it names the
+// content-hashed copies of that run's outputs, which browsers and CDNs can cache for good
+function loadManifest() {
+  if (!manifest) {
+    manifest = fetch('/dashboard_data/manifest.json', { cache: 'no-cache' })
+      .then(res => (res.ok ? res.json() : null))
+      .catch(() => null)
+  }
+  return manifest
+}
+
+// Every JSON output in one request: the manifest's bundle
+function loadBundle() {
+  if (!bundle) {
+    bundle = loadManifest()
+      .then(manifest => (manifest?.bundle ? getJson(`/dashboard_data/${manifest.bundle.file}`) : null))
+      .catch(() => null)
+  }
+  return bundle
+}
+
+function getJson(url: string) {
+  return fetch(url).then(res => {
+    if (!res.ok) throw new Error(`${url}: ${res.status}`)
+    return res.json()
+  })
+}
+
+// Outputs missing from the bundle are read through the manifest's hashed copy too, so
+// every file comes from the same run; only without a manifest (e.g. files copied by
+// hand) are the plain files fetched
+export function fetchOutput<T = any>(file: string): Promise<T> {
+  return loadBundle().then(data => {
+    if (data && file in data) return data[file] as T
+    return loadManifest().then(manifest => {
+      const hashed = manifest?.outputs?.[file]?.file
+      return getJson(`/dashboard_data/${hashed ?? file}`)
+    })
+  })
+}
+
+export function fetchData<T>(apiPath: string, staticFile: string): Promise<T> {
+  return API_URL ? getJson(`${API_URL.replace(/\/$/, '')}/api/${apiPath}`) : fetchOutput<T>(staticFile)
+}
@@ -2,6 +2,15 @@
 const nextConfig = {
   images: {
     unoptimized: true
+  },
+  async headers() {
+    return [
+      {
+        // Content-hashed copies written by process_data.py never change
+        source: '/dashboard_data/hashed/:path*',
+        headers: [{ key: 'Cache-Control', value: 'public, max-age=31536000, immutable' }]
+      }
+    ]
   }
 }
 
@@ -0,0 +1,230 @@
+"""
+Near-duplicate product names
+The same item is often listed under slightly different names (a colour, a cable
+length or a reordered title). Names are normalized (lowercase, punctuation to
+spaces) and split into words; every distinct name gets a MinHash signature of
+its word set, and names whose signatures collide in any LSH band are candidate
+pairs. Candidates whose estimated similarity is near the threshold get their
+exact word-set Jaccard similarity computed, and only pairs reaching the threshold
+count. Groups are not chained through these pairs: names are visited from the
+most listed down, and each name not yet grouped becomes a group centre that
+takes every ungrouped name matching it, so every member matches its centre (the
+group's canonical name). Signatures are built from batches of names.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+NUM_PERM = 64
+BANDS = 16
+# Signature cells (shingles x permutations) hashed at once
+MAX_CELLS = 4000000
+# Bucket members each name is compared with (all of them in buckets up to this size)
+MAX_BUCKET = 50
+# MinHash estimates with 64 permutations are off by about 0.05 (one standard
+# deviation), so candidates this far below the threshold still get an exact check
+ESTIMATE_MARGIN = 0.15
+
+_EMPTY = np.iinfo(np.uint32).max
+_MIX = np.uint64(0x100000001B3)
+
+
+def normalize(names):
+    """Lowercase, with runs of punctuation and whitespace collapsed to one space"""
+    return pd.Series(names, dtype=object).str.lower().str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+
+
+def _shingles(names):
+    # (position of the name, 64-bit hash of a word) for every distinct word of every name
+    words = names.str.split().explode().dropna()
+    pairs = pd.DataFrame({
+        'name': words.index.to_numpy(),
+        'hash': pd.util.hash_array(words.to_numpy(dtype=object)),
+    }).drop_duplicates()
+    return pairs['name'].to_numpy(), pairs['hash'].to_numpy()
+
+
+def minhash_signatures(names, num_perm=NUM_PERM, seed=1, max_cells=MAX_CELLS):
+    """
+    uint32 signatures (len(names) x num_perm) of the word sets of already
+    normalized names; names without words get an all-max signature
+    """
+    rng = np.random.default_rng(seed)
+    # Multiply-shift hashes: the top 32 bits of a * x + b (mod 2^64) for odd a
+    a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    names = pd.Series(names, dtype=object).reset_index(drop=True)
+    signatures = np.full((len(names), num_perm), _EMPTY, dtype=np.uint32)
+    # Batches of names sized for about 16 distinct words per name
+    batch_size = max(1, max_cells // (16 * num_perm))
+    for start in range(0, len(names), batch_size):
+        rows, hashes = _shingles(names.iloc[start:start + batch_size])
+        if len(rows):
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            block = ((hashes[:, None] * a + b) >> np.uint64(32)).astype(np.uint32)
+            signatures[rows[starts]] = np.minimum.reduceat(block, starts, axis=0)
+    return signatures
+
+
+def _band_keys(signatures, bands):
+    # One uint64 key per (band, row) from the band's signature values
+    width = signatures.shape[1] // bands
+    keys = np.zeros((bands, len(signatures)), dtype=np.uint64)
+    for band in range(bands):
+        for column in signatures[:, band * width:(band + 1) * width].T:
+            keys[band] = keys[band] * _MIX ^ column.astype(np.uint64)
+    return keys
+
+
+def lsh_candidates(signatures, bands=BANDS, max_bucket=MAX_BUCKET, threshold=0):
+    """
+    Unique (i, j) pairs, i < j, of rows that agree on every value of at least one
+    band and whose similarity() reaches threshold. Every pair inside a bucket is
+    checked, since a bucket can hold names that are not near-duplicates of each
+    other; in buckets larger than max_bucket, members are ordered by the next
+    band's key and each is paired with the next max_bucket - 1 members only.
+    Pairs are checked band by band, so only matching pairs are kept in memory.
+    """
+    present = np.flatnonzero(signatures[:, 0] != _EMPTY)
+    keys = _band_keys(signatures[present], bands)
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    for band in range(bands):
+        order = np.lexsort((keys[(band + 1) % bands], keys[band]))
+        sorted_keys = keys[band][order]
+        first = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        starts = np.flatnonzero(first)
+        sizes = np.diff(np.r_[starts, len(order)])
+        # Position of every sorted row inside its bucket, and how many members follow it
+        rank = np.arange(len(order)) - np.repeat(starts, sizes)
+        following = np.repeat(sizes, sizes) - rank - 1
+        members = np.flatnonzero(following > 0)
+        for offset in range(1, min(max_bucket, int(sizes.max(initial=1)))):
+            members = members[following[members] >= offset]
+            block = np.column_stack([present[order[members]], present[order[members + offset]]])
+            if threshold > 0:
+                block = block[similarity(signatures, block) >= threshold]
+            pairs.append(block)
+    pairs = np.sort(np.concatenate(pairs).astype(np.int64), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def similarity(signatures, pairs, max_cells=MAX_CELLS):
+    """Estimated Jaccard similarity of each pair: the fraction of equal signature values"""
+    result = np.empty(len(pairs))
+    step = max(1, max_cells // signatures.shape[1])
+    for start in range(0, len(pairs), step):
+        chunk = pairs[start:start + step]
+        result[start:start + step] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return result
+
+
+def word_sets(names):
+    """Sparse 0/1 matrix (len(names) x distinct words) of the word sets of already normalized names"""
+    names = pd.Series(names, dtype=object).reset_index(drop=True)
+    words = names.str.split().explode().dropna()
+    columns, _ = pd.factorize(words.to_numpy(dtype=object))
+    matrix = csr_matrix((np.ones(len(columns)), (words.index.to_numpy(), columns)),
+                        shape=(len(names), int(columns.max(initial=-1)) + 1))
+    # Repeated words in one name count once
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def jaccard(sets, pairs, max_cells=MAX_CELLS):
+    """Exact Jaccard similarity of each pair of rows of a word_sets() matrix"""
+    sizes = sets.getnnz(axis=1)
+    result = np.empty(len(pairs))
+    # Pairs per chunk sized for about 16 distinct words per name
+    step = max(1, max_cells // 16)
+    for start in range(0, len(pairs), step):
+        chunk = pairs[start:start + step]
+        shared = np.asarray(sets[chunk[:, 0]].multiply(sets[chunk[:, 1]]).sum(axis=1)).ravel()
+        with np.errstate(invalid='ignore'):
+            result[start:start + step] = shared / (sizes[chunk[:, 0]] + sizes[chunk[:, 1]] - shared)
+    return np.nan_to_num(result)
+
+
+def _centre_labels(n, pairs, priority):
+    # Visit names in priority order; an ungrouped name becomes a centre and takes every
+    # ungrouped name it is paired with, so no group is chained through its members
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    both = np.concatenate([pairs, pairs[:, ::-1]])
+    both = both[np.lexsort((priority[both[:, 1]], both[:, 0]))]
+    starts = np.searchsorted(both[:, 0], np.arange(n + 1))
+    grouped = np.zeros(n, dtype=bool)
+    linked = np.unique(both[:, 0])
+    for node in linked[np.argsort(priority[linked], kind='stable')]:
+        if grouped[node]:
+            continue
+        grouped[node] = True
+        members = both[starts[node]:starts[node + 1], 1]
+        members = members[~grouped[members]]
+        grouped[members] = True
+        labels[members] = node
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def cluster_names(names, threshold=0.8, num_perm=NUM_PERM, bands=BANDS, seed=1, priority=None):
+    """
+    Integer label per name: equal after normalize(), or grouped with a centre name
+    whose exact word-set Jaccard similarity reaches threshold. Centres are picked in
+    priority order (lowest first; default the order of names), and each group's
+    centre is its name with the lowest priority.
+    """
+    codes, uniques = pd.factorize(normalize(names), use_na_sentinel=False)
+    if priority is None:
+        priority = np.arange(len(codes))
+    # Priority of a normalized name: that of its best raw name
+    unique_priority = pd.Series(np.asarray(priority)).groupby(codes).min().to_numpy()
+    signatures = minhash_signatures(uniques, num_perm, seed)
+    pairs = lsh_candidates(signatures, bands, threshold=threshold - ESTIMATE_MARGIN)
+    pairs = pairs[jaccard(word_sets(uniques), pairs) >= threshold]
+    return _centre_labels(len(uniques), pairs, unique_priority)[codes]
+
+
+def product_groups(df, threshold=0.8):
+    """
+    One row per distinct product_name: its product_group (the smallest product_id
+    in the group), canonical_name (the group's most listed name) and variants
+    (distinct names in the group)
+    """
+    # Smallest product_id through its code in sorted order (missing ids sort last)
+    id_codes, id_values = pd.factorize(df['product_id'], sort=True)
+    id_codes = np.where(id_codes < 0, len(id_values), id_codes)
+    id_values = np.append(np.asarray(id_values, dtype=object), np.nan)
+    rows = pd.DataFrame({'product_name': df['product_name'], 'id': id_codes}).groupby(
+        'product_name', observed=True, sort=True).agg(listings=('id', 'size'), first_id=('id', 'min'))
+    names = rows.index.to_numpy(dtype=object)
+    # Centres are the most listed names, ties to the first name in sort order (names are sorted)
+    priority = np.argsort(-rows['listings'].to_numpy(), kind='stable').argsort()
+    labels = cluster_names(names, threshold, priority=priority)
+    # Canonical name: the group's centre, i.e. its most listed name
+    ranked = pd.DataFrame({'label': labels, 'name': names, 'listings': rows['listings'].to_numpy()})
+    ranked = ranked.sort_values(['label', 'listings', 'name'], ascending=[True, False, True], kind='stable')
+    canonical = ranked.drop_duplicates('label').set_index('label')['name']
+    first_ids = pd.Series(rows['first_id'].to_numpy()).groupby(labels).min()
+    return pd.DataFrame({
+        'product_group': id_values[first_ids.to_numpy()[labels]],
+        'canonical_name': canonical.reindex(labels).to_numpy(dtype=object),
+        'variants': np.bincount(labels)[labels],
+    }, index=pd.Index(names, name='product_name'))
+
+
+def with_groups(frame, groups):
+    """frame plus the product_group and canonical_name of each row's product_name (frame itself if groups is None)"""
+    if groups is None:
+        return frame
+    # Look up each distinct name once, then broadcast the codes to the rows (as categoricals)
+    codes, names = pd.factorize(frame['product_name'])
+    lookup = groups.reindex(pd.Index(np.asarray(names, dtype=object)))
+    frame = frame.copy()
+    for column in ['product_group', 'canonical_name']:
+        value_codes, values = pd.factorize(lookup[column])
+        # Rows without a name (code -1) stay missing
+        row_codes = np.where(codes >= 0, np.append(value_codes, -1)[codes], -1)
+        frame[column] = pd.Categorical.from_codes(row_codes, categories=values)
+    return frame
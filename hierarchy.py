@@ -0,0 +1,96 @@
+"""
+Rollup of the per-category partial aggregates over the |-delimited category path
+Every prefix of a category path ('Electronics', 'Electronics|Mobiles', ...) is a
+node with an integer id; the nodes' counts and sums are built from the
+per-category partials in PartialAggregates, so the tree can be made in every
+mode (full, streaming, incremental) without touching the rows again
+"""
+
+import numpy as np
+import pandas as pd
+
+from aggregates import VALUE_COLUMNS_BY_PREFIX
+
+# Partial columns summed into every node
+NODE_COLUMNS = ['rows', 'rating_sum', 'rating_sumsq', 'rating_n', 'discount_sum', 'discount_sumsq',
+                'discount_n', 'reviews_sum']
+
+
+def leaf_names(categories):
+    """Last component of every category path, splitting each distinct path once"""
+    codes, uniques = pd.factorize(pd.Series(categories), use_na_sentinel=False)
+    leaves = [cat.split('|')[-1] if isinstance(cat, str) else cat for cat in uniques]
+    index = categories.index if isinstance(categories, pd.Series) else None
+    return pd.Series(np.array(leaves, dtype=object)[codes], index=index)
+
+
+def category_levels(categories):
+    """
+    Integer-coded hierarchy of distinct category paths: returns (levels, nodes) where
+    levels[i, d] is the node id of the depth-d prefix of categories[i] (-1 past its
+    leaf) and nodes holds each node's parent id, depth, name and full path. Ids are
+    assigned in (depth, path) order.
+    """
+    parts = [cat.split('|') for cat in categories]
+    depth = max((len(p) for p in parts), default=0)
+    prefixes = [['|'.join(p[:d + 1]) if len(p) > d else None for p in parts] for d in range(depth)]
+    paths = sorted({(d, path) for d in range(depth) for path in prefixes[d] if path is not None})
+    ids = {key: i for i, key in enumerate(paths)}
+    levels = np.full((len(parts), depth), -1, dtype='int32')
+    for d in range(depth):
+        for i, path in enumerate(prefixes[d]):
+            if path is not None:
+                levels[i, d] = ids[(d, path)]
+    nodes = pd.DataFrame({
+        'parent': [ids[(d - 1, path.rsplit('|', 1)[0])] if d else -1 for d, path in paths],
+        'depth': [d for d, _ in paths],
+        'name': [path.rsplit('|', 1)[-1] for _, path in paths],
+        'path': [path for _, path in paths],
+    }, index=pd.RangeIndex(len(paths), name='id'))
+    return levels, nodes
+
+
+def rollup(aggregates):
+    """Node table with the summed partials of every category-path prefix"""
+    part = aggregates.by_category
+    part = part[[isinstance(cat, str) for cat in part.index]]
+    levels, nodes = category_levels(list(part.index))
+    values = part[NODE_COLUMNS].to_numpy(dtype='float64')
+    sums = np.zeros((len(nodes), len(NODE_COLUMNS)))
+    for d in range(levels.shape[1]):
+        present = levels[:, d] >= 0
+        np.add.at(sums, levels[present, d], values[present])
+    cube = nodes.join(pd.DataFrame(sums, columns=NODE_COLUMNS, index=nodes.index))
+    for col in ['rows', 'rating_n', 'discount_n', 'reviews_sum', 'rating_sum', 'discount_sum']:
+        cube[col] = cube[col].round().astype('int64')
+    return cube
+
+
+def _node_dict(row):
+    # Sums only (means and variances follow from sum, sumsq and n), to keep the file small
+    return {
+        'id': int(row.Index),
+        'name': row.name,
+        'count': int(row.rows),
+        'rating_n': int(row.rating_n),
+        'rating_sum': round(row.rating_sum / VALUE_COLUMNS_BY_PREFIX['rating'], 4),
+        'rating_sumsq': round(float(row.rating_sumsq), 4),
+        'discount_n': int(row.discount_n),
+        'discount_sum': round(row.discount_sum / VALUE_COLUMNS_BY_PREFIX['discount'], 4),
+        'discount_sumsq': round(float(row.discount_sumsq), 4),
+        'total_reviews': int(row.reviews_sum),
+    }
+
+
+def category_tree(cube):
+    """Nested {'levels', 'children': [node, ...]} with each node's children sorted by name"""
+    nodes = {}
+    roots = []
+    for row in cube.itertuples():
+        node = _node_dict(row)
+        nodes[node['id']] = node
+        if row.parent < 0:
+            roots.append(node)
+        else:
+            nodes[row.parent].setdefault('children', []).append(node)
+    return {'levels': int(cube['depth'].max() + 1) if len(cube) else 0, 'children': roots}
@@ -0,0 +1,171 @@
+"""
+Incremental recompute for the Amazon Sales pipeline
+Keeps per-category partial aggregates, top-N lists and a content hash per
+product_id row in a local state file, and on each run only re-cleans and
+re-aggregates the categories/product names whose rows changed
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from cleaning import clean_frame
+from aggregates import (PartialAggregates, add_ranges, category_cube,
+                        top_products_by_category, product_popularity)
+
+STATE_VERSION = 1
+
+# Candidate rows kept per category for the global top_rated list
+TOP_RATED_N = 20
+TOP_RATED_COLUMNS = ['product_name', 'category', 'rating_clean', 'rating_count_clean', 'discounted_price_clean']
+
+
+def row_keys(raw):
+    """product_id plus its occurrence number, since a product can be listed more than once"""
+    codes, _ = pd.factorize(raw['product_id'], use_na_sentinel=False)
+    occurrence = pd.Series(codes, index=raw.index).groupby(codes).cumcount()
+    return raw['product_id'].astype(str) + '#' + occurrence.astype(str)
+
+
+def row_hashes(raw, keys):
+    """Content hash of every raw row (all columns plus its key)"""
+    content = pd.util.hash_pandas_object(raw, index=False)
+    return pd.Series(pd.util.hash_pandas_object(pd.DataFrame({'key': keys.to_numpy(), 'row': content.to_numpy()}), index=False).to_numpy(),
+                     index=keys.to_numpy())
+
+
+def fingerprints(hashes, groups):
+    """
+    Order-sensitive fingerprint of the rows of every group: XOR of the row hashes
+    tagged with their rank inside the group. Any added, removed, edited or reordered
+    row changes the fingerprint of its group.
+    """
+    codes, uniques = pd.factorize(groups, use_na_sentinel=False)
+    rank = pd.Series(codes).groupby(codes).cumcount()
+    tagged = pd.util.hash_pandas_object(pd.DataFrame({'hash': hashes.to_numpy(), 'rank': rank.to_numpy()}), index=False).to_numpy()
+    result = np.zeros(len(uniques), dtype='uint64')
+    np.bitwise_xor.at(result, codes, tagged)
+    return pd.Series(result, index=pd.Index(uniques, dtype=object))
+
+
+def _changed(old, new):
+    # Keys whose fingerprint differs, including keys only present on one side
+    keys = old.index.union(new.index, sort=False)
+    old_pos = old.index.get_indexer(keys)
+    new_pos = new.index.get_indexer(keys)
+    old_values = np.append(old.to_numpy(), np.uint64(0))[old_pos]
+    new_values = np.append(new.to_numpy(), np.uint64(0))[new_pos]
+    return keys[(old_pos < 0) | (new_pos < 0) | (old_values != new_values)]
+
+
+def _top_rated_candidates(df, keys):
+    # The first TOP_RATED_N rows of every category in nlargest order (missing ratings last)
+    ranked = df.sort_values('rating_clean', ascending=False, kind='stable', na_position='last')
+    top = ranked.groupby('category', dropna=False, sort=False).head(TOP_RATED_N)
+    candidates = top[TOP_RATED_COLUMNS].copy()
+    candidates['_key'] = keys.loc[top.index].to_numpy()
+    return candidates
+
+
+class IncrementalState:
+    """Everything needed to rewrite the aggregate and top-N outputs without a full rebuild"""
+
+    def __init__(self):
+        self.version = STATE_VERSION
+        self.row_hashes = pd.Series(dtype='uint64')
+        self.category_fingerprints = pd.Series(dtype='uint64')
+        self.product_fingerprints = pd.Series(dtype='uint64')
+        self.cube = None
+        self.top_products = {}
+        self.top_rated_candidates = None
+        self.products = None
+        self.top_rated = None
+
+    def update(self, raw):
+        """Fold a new full raw CSV into the state; returns a dict describing what changed"""
+        raw = raw.reset_index(drop=True)
+        keys = row_keys(raw)
+        hashes = row_hashes(raw, keys)
+        category_fps = fingerprints(pd.Series(hashes.to_numpy()), raw['category'])
+        product_fps = fingerprints(pd.Series(hashes.to_numpy()), raw['product_name'])
+        categories = _changed(self.category_fingerprints, category_fps)
+        products = _changed(self.product_fingerprints, product_fps)
+
+        in_categories = raw['category'].isin(categories)
+        in_products = raw['product_name'].isin(products)
+        # Only the rows of changed categories/product names are cleaned
+        changed = add_ranges(clean_frame(raw[in_categories | in_products].copy()))
+        changed_categories = changed[in_categories[changed.index]]
+        changed_products = changed[in_products[changed.index]]
+        key_series = pd.Series(keys.to_numpy(), index=raw.index)
+
+        # Category cube cells, Q2 lists and top_rated candidates of the changed categories
+        cube = category_cube(changed_categories)
+        if self.cube is not None:
+            kept = self.cube[~self.cube.index.get_level_values('category').isin(categories)]
+            cube = pd.concat([kept, cube])
+        self.cube = cube
+        for cat in categories:
+            self.top_products.pop(cat, None)
+        self.top_products.update(top_products_by_category(changed_categories))
+        candidates = _top_rated_candidates(changed_categories, key_series)
+        if self.top_rated_candidates is not None:
+            kept = self.top_rated_candidates[~self.top_rated_candidates['category'].isin(categories)]
+            candidates = pd.concat([kept, candidates])
+        self.top_rated_candidates = candidates
+
+        # Q5 rows of the changed product names
+        popularity = product_popularity(changed_products)
+        if self.products is not None:
+            kept = self.products[~self.products['product_name'].isin(products)]
+            popularity = pd.concat([kept, popularity])
+        self.products = popularity.sort_values('product_name').reset_index(drop=True)
+
+        # Global top_rated: candidates back in current file order, then the same nlargest
+        position = pd.Series(np.arange(len(raw)), index=keys.to_numpy())
+        ordered = candidates.assign(_pos=position.loc[candidates['_key']].to_numpy()).sort_values('_pos')
+        self.top_rated = ordered.nlargest(TOP_RATED_N, 'rating_clean')[TOP_RATED_COLUMNS].reset_index(drop=True)
+
+        common = hashes.index.intersection(self.row_hashes.index)
+        report = {
+            'rows': len(raw),
+            'added': int((~hashes.index.isin(self.row_hashes.index)).sum()),
+            'removed': int((~self.row_hashes.index.isin(hashes.index)).sum()),
+            'modified': int((hashes.loc[common] != self.row_hashes.loc[common]).sum()),
+            'recomputed_categories': len(categories),
+            'recomputed_products': len(products),
+            'recleaned_rows': len(changed),
+        }
+        self.row_hashes = hashes
+        self.category_fingerprints = category_fps
+        self.product_fingerprints = product_fps
+        return report
+
+    def aggregates(self):
+        return PartialAggregates.from_cube(self.cube)
+
+    def top_products_list(self):
+        """Q2 rows in category order (missing categories excluded, like groupby)"""
+        cats = sorted(cat for cat in self.top_products if isinstance(cat, str))
+        return [row for cat in cats for row in self.top_products[cat]]
+
+
+def load_state(path):
+    """Load a saved IncrementalState, or a fresh one if the file is missing or from another version"""
+    if not os.path.exists(path):
+        return IncrementalState()
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if getattr(state, 'version', None) != STATE_VERSION:
+        return IncrementalState()
+    return state
+
+
+def save_state(state, path):
+    # Write to a temp file first so an interrupted run never leaves a truncated state
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
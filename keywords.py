@@ -0,0 +1,112 @@
+"""
+Keyword counting for Q6 (most popular product-name keywords)
+Product names are factorized first, so each distinct name is tokenized once and
+its tokens are weighted by how often the name occurs. Counts are kept either
+exactly (one entry per distinct keyword) or in a Space-Saving summary of fixed
+capacity, which overestimates any count by at most total/capacity.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Optional filter for common English filler words in product names
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'up', 'with', 'without', 'your',
+])
+
+
+def tokenize(names, ngram=1, stopwords=None):
+    """
+    Keywords of a Series of product names as a Series indexed by the name's position:
+    lowercase alphabetic words longer than one letter, or space-joined runs of `ngram` of them
+    """
+    # object dtype so the str methods are Python's own (same rules as str.isalpha/str.lower)
+    names = pd.Series(np.asarray(names, dtype=object))
+    words = names.str.split().explode().dropna()
+    words = words[words.str.isalpha() & (words.str.len() > 1)].str.lower()
+    if stopwords:
+        words = words[~words.isin(stopwords)]
+    if ngram > 1:
+        # Words of the same name that are ngram-1 places further on
+        grams = words
+        for shift in range(1, ngram):
+            grams = grams + ' ' + words.groupby(level=0).shift(-shift)
+        words = grams.dropna()
+    return words
+
+
+class KeywordCounter:
+    """Keyword counts, exact when capacity is None, otherwise a Space-Saving summary"""
+
+    def __init__(self, capacity=None, ngram=1, stopwords=None):
+        self.capacity = capacity
+        self.ngram = ngram
+        self.stopwords = stopwords
+        self.total = 0
+        # Exact mode: keyword -> count in first-seen order (like value_counts before sorting)
+        self.counts = {}
+        # Space-Saving mode: estimated counts and their maximum overestimate
+        self.estimates = pd.Series(dtype='int64')
+        self.errors = pd.Series(dtype='int64')
+
+    def update(self, names, weights=None):
+        """Count the keywords of names (each name counted weights[i] times, default once)"""
+        tokens = tokenize(names, self.ngram, self.stopwords)
+        if weights is None:
+            weights = np.ones(len(names), dtype='int64')
+        batch = pd.Series(np.asarray(weights, dtype='int64')[tokens.index.to_numpy(dtype='int64')])
+        batch = batch.groupby(tokens.to_numpy(), sort=False).sum()
+        self._add(batch)
+        return self
+
+    def _add(self, batch, batch_errors=None, batch_floor=0, total=None):
+        self.total += int(batch.sum()) if total is None else total
+        if self.capacity is None:
+            counts = self.counts
+            for keyword, count in zip(batch.index, batch.to_numpy().tolist()):
+                counts[keyword] = counts.get(keyword, 0) + count
+            return
+        # Mergeable Space-Saving: a keyword missing from a full summary may have
+        # been counted up to that summary's smallest estimate before being dropped
+        floor = int(self.estimates.min()) if len(self.estimates) >= self.capacity else 0
+        keys = self.estimates.index.union(batch.index)
+        if batch_errors is None:
+            batch_errors = pd.Series(0, index=batch.index, dtype='int64')
+        estimates = self.estimates.reindex(keys, fill_value=floor) + batch.reindex(keys, fill_value=batch_floor)
+        errors = self.errors.reindex(keys, fill_value=floor) + batch_errors.reindex(keys, fill_value=batch_floor)
+        if len(estimates) > self.capacity:
+            estimates = estimates.nlargest(self.capacity)
+            errors = errors[estimates.index]
+        self.estimates = estimates
+        self.errors = errors
+
+    def merge(self, other):
+        """Fold another counter (same settings) into this one"""
+        if self.capacity is None:
+            self._add(pd.Series(other.counts, dtype='int64'), total=other.total)
+        else:
+            floor = int(other.estimates.min()) if len(other.estimates) >= other.capacity else 0
+            self._add(other.estimates, other.errors, floor, total=other.total)
+        return self
+
+    def top(self, k=20):
+        """The k most frequent keywords as (keyword, count) pairs, most frequent first"""
+        if self.capacity is None:
+            counts = pd.Series(self.counts, dtype='int64')
+        else:
+            counts = self.estimates
+        # Stable, so ties keep first-seen order like value_counts
+        return list(counts.sort_values(ascending=False, kind='stable').head(k).items())
+
+
+def top_keywords(names, k=20, capacity=None, ngram=1, stopwords=None, batch_size=50000):
+    """Q6: the k most frequent keywords of a Series of product names (missing names skipped)"""
+    codes, uniques = pd.factorize(names.dropna())
+    weights = np.bincount(codes, minlength=len(uniques))
+    counter = KeywordCounter(capacity, ngram, stopwords)
+    # Distinct names in first-seen order, so exact ties break like value_counts
+    uniques = np.asarray(uniques, dtype=object)
+    for start in range(0, len(uniques), batch_size):
+        counter.update(uniques[start:start + batch_size], weights[start:start + batch_size])
+    return counter.top(k)
@@ -0,0 +1,90 @@
+"""
+Execution backends for the category/product aggregations
+Rows are split by a hash of the grouping key, so every group lands on exactly one
+worker and the per-worker results merge back into the serial answer
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from aggregates import PartialAggregates, top_products_by_category, product_popularity
+from dedup import with_groups
+
+
+class SerialBackend:
+    """Runs every partition in the current process"""
+
+    workers = 1
+
+    def map(self, fn, parts):
+        return [fn(part) for part in parts]
+
+
+class ProcessPoolBackend:
+    """
+    Runs partitions on a ProcessPoolExecutor with the given number of workers.
+    With the spawn/forkserver start methods (the default on Windows and macOS)
+    workers re-import the main module, so scripts must guard their entry point.
+    """
+
+    def __init__(self, workers, start_method=None):
+        self.workers = workers
+        self.start_method = start_method
+
+    def map(self, fn, parts):
+        context = multiprocessing.get_context(self.start_method) if self.start_method else None
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            return list(executor.map(fn, parts))
+
+
+def get_backend(workers=1):
+    """SerialBackend for workers <= 1, ProcessPoolBackend otherwise (0 = one per CPU)"""
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return SerialBackend()
+    return ProcessPoolBackend(workers)
+
+
+def partition(df, key, n):
+    """Split df into n frames by a stable hash of df[key]; row order is kept within each part"""
+    if n <= 1:
+        return [df]
+    buckets = pd.util.hash_pandas_object(df[key], index=False).to_numpy() % n
+    return [df[buckets == i] for i in range(n)]
+
+
+def _partial_aggregates(df):
+    return PartialAggregates().update(df)
+
+
+def parallel_aggregates(df, backend):
+    """PartialAggregates of df, computed per category partition and merged"""
+    columns = ['product_id', 'category', 'discounted_price_clean', 'actual_price_clean',
+               'discount_percentage_clean', 'rating_clean', 'rating_count_clean',
+               'price_range', 'discount_range']
+    parts = backend.map(_partial_aggregates, partition(df[columns], 'category', backend.workers))
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    return merged
+
+
+def parallel_top_products(df, backend, n=3, groups=None):
+    """Q2 rows for every category (same order as top_products_by_category), one per product group if given"""
+    columns = ['category', 'product_name', 'rating_count_clean', 'rating_clean']
+    parts = backend.map(top_products_by_category,
+                        partition(with_groups(df[columns], groups), 'category', backend.workers))
+    groups = sorted((pair for part in parts for pair in part), key=lambda pair: pair[0])
+    return [row for _, rows in groups for row in rows]
+
+
+def parallel_product_popularity(df, backend, groups=None):
+    """Q5 per-product table (same rows and order as product_popularity), per product group if given"""
+    columns = ['product_name', 'product_id', 'rating_clean', 'rating_count_clean']
+    key = 'product_name' if groups is None else 'product_group'
+    parts = backend.map(product_popularity, partition(with_groups(df[columns], groups), key, backend.workers))
+    return pd.concat(parts).sort_values(['product_name', key]).reset_index(drop=True)
@@ -0,0 +1,229 @@
+"""
+Minimal stage engine for the Amazon Sales pipeline
+Stages declare their inputs; results are memoized on disk under a key built from
+the code version, the stage's own key function and the keys of its inputs, and
+stages whose inputs are ready run concurrently on a thread pool
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from profiling import measure
+
+
+class Stage:
+    """A named computation over the results of other stages"""
+
+    def __init__(self, name, func, inputs=(), output=None, memo=True, key=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.output = output
+        self.memo = memo
+        self.key = key
+
+
+class Registry:
+    """Ordered collection of stages, filled with the @registry.stage decorator"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, name, inputs=(), output=None, memo=True, key=None):
+        """
+        Register func(ctx, *inputs) as stage `name`. output is the file it publishes,
+        memo=False skips the on-disk memo, key(ctx) adds external state (e.g. the
+        input file hash) to the memo key.
+        """
+        def decorator(func):
+            self.stages[name] = Stage(name, func, inputs, output, memo, key)
+            return func
+        return decorator
+
+    def outputs(self):
+        return [name for name, stage in self.stages.items() if stage.output]
+
+    def closure(self, targets, provided=()):
+        """targets plus everything they depend on (short of provided stages), in registration order"""
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            if name not in needed:
+                needed.add(name)
+                if name not in provided:
+                    pending.extend(self.stages[name].inputs)
+        return [name for name in self.stages if name in needed]
+
+
+def write_output(result, path):
+    """Compact JSON: DataFrames as pandas records (or CSV), everything else through orjson when installed"""
+    if isinstance(result, pd.DataFrame):
+        if path.endswith('.csv'):
+            result.to_csv(path, index=False)
+        else:
+            result.to_json(path, orient='records')
+    elif orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class Pipeline:
+    """Resolves the stages needed for a set of targets, loading memos and running the rest"""
+
+    def __init__(self, registry, ctx, memo_dir=None, jobs=1, code_version='', output_dir=None, log=print,
+                 profiler=None):
+        self.registry = registry
+        self.ctx = ctx
+        self.memo_dir = memo_dir
+        self.jobs = max(1, jobs)
+        self.code_version = code_version
+        self.output_dir = output_dir
+        self.log = log
+        self.profiler = profiler
+
+    def _keys(self, names, provided):
+        # Merkle-style keys: a stage's key covers its inputs' keys, so nothing large is hashed.
+        # Stages fed from outside (provided) have no key and neither do their dependents.
+        keys = {}
+        for name in names:
+            if name in provided:
+                keys[name] = None
+                continue
+            stage = self.registry.stages[name]
+            extra = stage.key(self.ctx) if stage.key else ''
+            keys[name] = self._combine(name, [keys[i] for i in stage.inputs], extra)
+        return keys
+
+    def _combine(self, name, input_keys, extra=''):
+        if any(key is None for key in input_keys):
+            return None
+        digest = hashlib.sha256()
+        for part in [self.code_version, name, str(extra), *input_keys]:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _memo_path(self, name, key):
+        return os.path.join(self.memo_dir, f'{name}-{key[:20]}.pkl')
+
+    def _load_memo(self, name, key):
+        stage = self.registry.stages[name]
+        if not (self.memo_dir and stage.memo and key):
+            return False, None
+        path = self._memo_path(name, key)
+        if not os.path.exists(path):
+            return False, None
+        with open(path, 'rb') as f:
+            return True, pickle.load(f)
+
+    def _save_memo(self, name, key, result):
+        stage = self.registry.stages[name]
+        if not (self.memo_dir and stage.memo and key):
+            return
+        os.makedirs(self.memo_dir, exist_ok=True)
+        path = self._memo_path(name, key)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        # Keep only the latest memo of every stage
+        for old in glob.glob(os.path.join(self.memo_dir, f'{name}-*.pkl')):
+            if old != path:
+                os.remove(old)
+
+    def run(self, targets=None, provided=None):
+        """Compute targets (default: every stage with an output); returns {stage: result}"""
+        provided = dict(provided or {})
+        targets = list(targets or self.registry.outputs())
+        names = self.registry.closure(targets, provided)
+        keys = self._keys(names, provided)
+        results = dict(provided)
+        for name, result in provided.items():
+            self._publish(name, result, targets)
+
+        # Walk down from the targets: a memo hit means its inputs are not needed
+        to_run = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in results or name in to_run:
+                continue
+            hit, result = self._load_memo(name, keys[name])
+            if hit:
+                self.log(f"  [{name}] memoized")
+                results[name] = result
+                self._publish(name, result, targets)
+                continue
+            to_run.add(name)
+            pending.extend(self.registry.stages[name].inputs)
+
+        if self.profiler is not None:
+            # Profiled runs: each stage and then its write on this thread, one at a time,
+            # so the measured times and memory of different stages do not overlap
+            while to_run:
+                ready = self._ready(names, to_run, results)
+                if not ready:
+                    raise RuntimeError(f"Stages cannot run, missing inputs: {sorted(to_run)}")
+                name = ready[0]
+                to_run.discard(name)
+                stage = self.registry.stages[name]
+                result, elapsed = self._timed(stage, [results[i] for i in stage.inputs])
+                self._finish(name, result, elapsed, keys, results, targets)
+            return results
+
+        # Run the rest, each stage as soon as all of its inputs are available
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            running = {}
+            while to_run or running:
+                for name in self._ready(names, to_run, results):
+                    to_run.discard(name)
+                    stage = self.registry.stages[name]
+                    running[executor.submit(self._timed, stage, [results[i] for i in stage.inputs])] = name
+                if not running:
+                    raise RuntimeError(f"Stages cannot run, missing inputs: {sorted(to_run)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result, elapsed = future.result()
+                    self._finish(name, result, elapsed, keys, results, targets)
+        return results
+
+    def _ready(self, names, to_run, results):
+        # Stages still to run whose inputs are all available, in registration order
+        return [name for name in names if name in to_run
+                and all(i in results for i in self.registry.stages[name].inputs)]
+
+    def _finish(self, name, result, elapsed, keys, results, targets):
+        self.log(f"  [{name}] computed in {elapsed:.2f}s")
+        results[name] = result
+        self._save_memo(name, keys[name], result)
+        self._publish(name, result, targets)
+
+    def _timed(self, stage, inputs):
+        start = time.perf_counter()
+        with measure(self.profiler, stage.name):
+            result = stage.func(self.ctx, *inputs)
+        return result, time.perf_counter() - start
+
+    def _publish(self, name, result, targets):
+        stage = self.registry.stages[name]
+        if self.output_dir and stage.output and name in targets:
+            with measure(self.profiler, f'{name}:write'):
+                write_output(result, os.path.join(self.output_dir, stage.output))
@@ -1,396 +1,647 @@
 """
 Data Processing Script for Amazon Sales Dataset Analysis
 Generates processed data and insights for the dashboard and report
+
+Every output is a stage of the registry below (see pipeline.py), so the module
+can be imported and single stages run, e.g. `python process_data.py --only insight_q6`
 """
 
+import argparse
+import hashlib
+import os
+import shutil
 import pandas as pd
 import numpy as np
-import json
-import re
 from collections import Counter
 from scipy import stats
 
-# Read the dataset
-print("Loading data...")
-df = pd.read_csv('amazon_sales_data.csv', encoding='utf-8')
+from cleaning import clean_frame
+from accumulators import (DISCOUNT_SPLIT, PRICE_TIERS, TOP_PRODUCTS_QUANTILE, CoMoments, InsightAccumulator,
+                          Moments, anova, insight_categories, load_accumulator, ttest)
+from aggregates import add_ranges, aggregate_csv
+from cache import load_cleaned, store_cleaned, input_sha256
+from dedup import product_groups, with_groups
+from hierarchy import category_tree, leaf_names, rollup
+from incremental import load_state, save_state
+from keywords import STOPWORDS, top_keywords
+from parallel import get_backend, parallel_aggregates, parallel_top_products, parallel_product_popularity
+from pipeline import Registry, Pipeline
+from profiling import Profiler, measure
+from publish import publish, staging_dir
+from resampling import Resampler, skipped_fields
+from sampling import ScatterSampler
 
-# Basic statistics
-print(f"Dataset shape: {df.shape}")
-print(f"Columns: {list(df.columns)}")
+registry = Registry()
 
-# Data cleaning and preprocessing
-print("\nCleaning data...")
+# Modules whose source is part of every memo key, so code changes invalidate the memos
+SOURCE_MODULES = ['process_data.py', 'pipeline.py', 'cleaning.py', 'aggregates.py', 'parallel.py', 'cache.py',
+                  'keywords.py', 'resampling.py', 'profiling.py', 'hierarchy.py', 'publish.py',
+                  'dedup.py', 'accumulators.py', 'sampling.py']
 
-# Clean price columns - remove currency symbols and convert to float
-def clean_price(price_str):
-    if pd.isna(price_str):
-        return None
-    # Remove currency symbols and commas
-    price_str = str(price_str).replace('₹', '').replace(',', '').strip()
-    # Extract numbers
-    numbers = re.findall(r'\d+\.?\d*', price_str)
-    if numbers:
-        return float(numbers[0])
-    return None
-
-df['discounted_price_clean'] = df['discounted_price'].apply(clean_price)
-df['actual_price_clean'] = df['actual_price'].apply(clean_price)
-
-# Calculate discount amount
-df['discount_amount'] = df['actual_price_clean'] - df['discounted_price_clean']
-
-# Clean discount percentage
-def clean_discount(discount_str):
-    if pd.isna(discount_str):
-        return None
-    discount_str = str(discount_str).replace('%', '').strip()
-    try:
-        return float(discount_str)
-    except:
-        return None
+# Outputs that only need the partial aggregates (what --chunksize can write)
+AGGREGATE_OUTPUTS = [
+    'insight_q1', 'insight_q3', 'insight_q4', 'insight_q9', 'summary_stats',
+    'category_stats', 'price_range_stats', 'discount_stats', 'top_categories', 'category_tree',
+]
+# ... plus Q8, whose sample is drawn from the same chunks
+STREAMING_OUTPUTS = AGGREGATE_OUTPUTS + ['insight_q8']
+# ... plus the top-N tables --incremental keeps in its state
+INCREMENTAL_OUTPUTS = AGGREGATE_OUTPUTS + ['insight_q2', 'insight_q5', 'top_rated_products']
 
-df['discount_percentage_clean'] = df['discount_percentage'].apply(clean_discount)
 
-# Clean rating
-df['rating_clean'] = pd.to_numeric(df['rating'], errors='coerce')
+def code_version():
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCE_MODULES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# --- Loading and cleaning ---
+
+@registry.stage('cleaned', memo=False, key=lambda ctx: input_sha256(ctx.input, ctx.cache_dir))
+def cleaned(ctx):
+    # Reuse the cleaned columnar cache when the input file is unchanged
+    with measure(ctx.profiler, 'cleaned:load_cache'):
+        df = None if ctx.no_cache else load_cleaned(ctx.input, ctx.cache_dir)
+    if df is not None:
+        print(f"Loaded cleaned data from cache: {df.shape}")
+        return df
+
+    # Read the dataset
+    print("Loading data...")
+    with measure(ctx.profiler, 'cleaned:read_csv'):
+        df = pd.read_csv(ctx.input, encoding='utf-8')
+
+    # Basic statistics
+    print(f"Dataset shape: {df.shape}")
+    print(f"Columns: {list(df.columns)}")
+
+    # Data cleaning and preprocessing
+    print("\nCleaning data...")
+
+    # Parse the ₹/comma/percent formatted columns (vectorized)
+    with measure(ctx.profiler, 'cleaned:clean_frame'):
+        clean_frame(df)
+
+    # Price range / discount range buckets
+    add_ranges(df)
+
+    # Write the cache and continue from its memory-mapped copy, so cached and
+    # uncached runs see the same (dictionary-encoded) frame
+    if not ctx.no_cache:
+        with measure(ctx.profiler, 'cleaned:store_cache'):
+            if store_cleaned(df, ctx.input, ctx.cache_dir):
+                df = load_cleaned(ctx.input, ctx.cache_dir)
+    return df
+
+
+# --- Category, price range and discount analysis ---
+
+@registry.stage('aggregates', inputs=['cleaned'])
+def aggregates(ctx, df):
+    # Exact partial aggregates, shared with the streaming and incremental modes;
+    # category groupbys run on hash partitions of the key (serial for --workers 1)
+    return parallel_aggregates(df, ctx.backend)
 
-# Clean rating_count
-def clean_rating_count(count_str):
-    if pd.isna(count_str):
-        return None
-    count_str = str(count_str).replace(',', '').strip()
-    try:
-        return int(float(count_str))
-    except:
-        return None
 
-df['rating_count_clean'] = df['rating_count'].apply(clean_rating_count)
-
-# Category analysis
-category_stats = df.groupby('category').agg({
-    'rating_clean': ['mean', 'count'],
-    'discounted_price_clean': 'mean',
-    'discount_percentage_clean': 'mean',
-    'rating_count_clean': 'sum'
-}).round(2)
-
-category_stats.columns = ['avg_rating', 'product_count', 'avg_price', 'avg_discount', 'total_reviews']
-category_stats = category_stats.reset_index()
-
-# Price range analysis
-df['price_range'] = pd.cut(df['discounted_price_clean'], 
-                          bins=[0, 500, 1000, 2000, 5000, float('inf')],
-                          labels=['0-500', '500-1000', '1000-2000', '2000-5000', '5000+'])
-
-price_range_stats = df.groupby('price_range', observed=False).agg({
-    'rating_clean': 'mean',
-    'product_id': 'count'
-}).round(2)
-price_range_stats.columns = ['avg_rating', 'product_count']
-price_range_stats = price_range_stats.reset_index()
-
-# Discount analysis
-df['discount_range'] = pd.cut(df['discount_percentage_clean'],
-                              bins=[0, 10, 20, 30, 40, 50, 100],
-                              labels=['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+'])
-
-discount_stats = df.groupby('discount_range', observed=False).agg({
-    'rating_clean': 'mean',
-    'product_id': 'count'
-}).round(2)
-discount_stats.columns = ['avg_rating', 'product_count']
-discount_stats = discount_stats.reset_index()
-
-# Top products by rating (rename for dashboard compatibility)
-top_rated = df.nlargest(20, 'rating_clean')[['product_name', 'category', 'rating_clean', 'rating_count_clean', 'discounted_price_clean']]
-top_rated = top_rated.rename(columns={
-    'rating_clean': 'rating',
-    'rating_count_clean': 'rating_count',
-    'discounted_price_clean': 'discounted_price'
-})
-
-# Top categories by average rating
-top_categories = category_stats.nlargest(10, 'avg_rating')
-
-# Save processed data for dashboard
-print("\nSaving processed data...")
-
-# Summary statistics
-summary_stats = {
-    'total_products': int(len(df)),
-    'total_categories': int(df['category'].nunique()),
-    'avg_rating': float(df['rating_clean'].mean()),
-    'avg_price': float(df['discounted_price_clean'].mean()),
-    'avg_discount': float(df['discount_percentage_clean'].mean()),
-    'total_reviews': int(df['rating_count_clean'].sum())
-}
+@registry.stage('category_stats', inputs=['aggregates'], output='category_stats.json')
+def category_stats(ctx, aggregates):
+    return aggregates.category_stats()
+
+
+@registry.stage('summary_stats', inputs=['aggregates'], output='summary_stats.json')
+def summary_stats(ctx, aggregates):
+    return aggregates.summary_stats()
+
+
+@registry.stage('price_range_stats', inputs=['aggregates'], output='price_range_stats.json')
+def price_range_stats(ctx, aggregates):
+    return aggregates.price_range_stats()
+
+
+@registry.stage('discount_stats', inputs=['aggregates'], output='discount_stats.json')
+def discount_stats(ctx, aggregates):
+    return aggregates.discount_stats()
+
+
+@registry.stage('top_categories', inputs=['category_stats'], output='top_categories.json')
+def top_categories(ctx, category_stats):
+    # Top categories by average rating
+    return category_stats.nlargest(10, 'avg_rating')
+
+
+@registry.stage('category_cube', inputs=['aggregates'])
+def category_cube(ctx, aggregates):
+    # Counts and sums for every prefix level of the category paths
+    return rollup(aggregates)
+
+
+@registry.stage('category_tree', inputs=['category_cube'], output='category_tree.json')
+def category_tree_json(ctx, category_cube):
+    # Compact drill-down tree from top-level department to leaf category
+    return category_tree(category_cube)
+
 
 # --- Per-Q&A insight data (tables/charts for dashboard) ---
 
-# Q1: Average rating by category (table)
-q1_avg_rating = category_stats[['category', 'avg_rating']].copy()
-q1_avg_rating['category_short'] = q1_avg_rating['category'].str.split('|').str[-1]
-q1_avg_rating = q1_avg_rating.sort_values('avg_rating', ascending=False).head(25)
-q1_avg_rating[['category_short', 'avg_rating']].round(2).to_json('dashboard_data/insight_q1_avg_rating_by_category.json', orient='records', indent=2)
-
-# Q2: Top products by rating_count per category (table)
-q2_list = []
-for cat, grp in df.groupby('category'):
-    top3 = grp.nlargest(3, 'rating_count_clean')[['product_name', 'rating_count_clean', 'rating_clean']]
-    cat_short = cat.split('|')[-1] if isinstance(cat, str) else str(cat)
-    for _, row in top3.iterrows():
-        q2_list.append({
-            'category': cat_short,
-            'product_name': (row['product_name'][:60] + '...') if len(str(row['product_name'])) > 60 else row['product_name'],
-            'rating_count': int(row['rating_count_clean']) if pd.notna(row['rating_count_clean']) else 0,
-            'rating': round(float(row['rating_clean']), 2) if pd.notna(row['rating_clean']) else None
-        })
-# Limit to first 30 rows for dashboard
-with open('dashboard_data/insight_q2_top_products_by_category.json', 'w', encoding='utf-8') as f:
-    json.dump(q2_list[:30], f, indent=2)
-
-# Q3: Distribution of discounted vs actual prices (binned counts)
-bins = [0, 500, 1000, 2000, 5000, 10000, float('inf')]
-labels = ['0-500', '500-1k', '1k-2k', '2k-5k', '5k-10k', '10k+']
-df['_disc_bin'] = pd.cut(df['discounted_price_clean'], bins=bins, labels=labels)
-df['_actual_bin'] = pd.cut(df['actual_price_clean'], bins=bins, labels=labels)
-q3_disc = df.groupby('_disc_bin', observed=False).size().reindex(labels, fill_value=0).reset_index(name='discounted_count')
-q3_actual = df.groupby('_actual_bin', observed=False).size().reindex(labels, fill_value=0).reset_index(name='actual_count')
-q3 = [{'price_range': str(r), 'discounted_count': int(d), 'actual_count': int(a)} for r, d, a in zip(q3_disc['_disc_bin'], q3_disc['discounted_count'], q3_actual['actual_count'])]
-with open('dashboard_data/insight_q3_price_distribution.json', 'w', encoding='utf-8') as f:
-    json.dump(q3, f, indent=2)
-df.drop(columns=['_disc_bin', '_actual_bin'], inplace=True)
-
-# Q4: Average discount by category (table)
-q4_discount = category_stats[['category', 'avg_discount']].copy()
-q4_discount['category_short'] = q4_discount['category'].str.split('|').str[-1]
-q4_discount = q4_discount.sort_values('avg_discount', ascending=False).head(25)
-q4_discount[['category_short', 'avg_discount']].round(2).to_json('dashboard_data/insight_q4_avg_discount_by_category.json', orient='records', indent=2)
-
-# Q5: Most popular product names (value_counts)
-q5_counts = df.groupby('product_name').agg({'product_id': 'count', 'rating_clean': 'mean', 'rating_count_clean': 'sum'}).reset_index()
-q5_counts.columns = ['product_name', 'occurrences', 'avg_rating', 'total_reviews']
-q5_counts = q5_counts.sort_values('total_reviews', ascending=False).head(15)
-q5_counts['product_name_short'] = q5_counts['product_name'].apply(lambda x: (x[:55] + '...') if len(str(x)) > 55 else x)
-q5_list = q5_counts[['product_name_short', 'occurrences', 'avg_rating', 'total_reviews']].round(2).to_dict('records')
-with open('dashboard_data/insight_q5_popular_products.json', 'w', encoding='utf-8') as f:
-    json.dump(q5_list, f, indent=2)
-
-# Q6: Most popular keywords from product names
-def extract_keywords(name):
-    if not isinstance(name, str):
+@registry.stage('insight_q1', inputs=['category_stats'], output='insight_q1_avg_rating_by_category.json')
+def insight_q1(ctx, category_stats):
+    # Q1: Average rating by category (table)
+    q1_avg_rating = category_stats[['category', 'avg_rating']].copy()
+    q1_avg_rating['category_short'] = leaf_names(q1_avg_rating['category'])
+    q1_avg_rating = q1_avg_rating.sort_values('avg_rating', ascending=False).head(25)
+    # Full path too, since different paths can share a leaf name
+    return q1_avg_rating[['category_short', 'avg_rating', 'category']].rename(columns={'category': 'category_path'}).round(2)
+
+
+@registry.stage('product_groups', inputs=['cleaned'], key=lambda ctx: ctx.dedup_threshold)
+def product_groups_table(ctx, df):
+    # Near-duplicate product names (MinHash/LSH over their words), None with --dedup-threshold 0
+    if not ctx.dedup_threshold:
+        return None
+    return product_groups(df, ctx.dedup_threshold)
+
+
+@registry.stage('top_products', inputs=['cleaned', 'product_groups'])
+def top_products(ctx, df, groups):
+    # Full Q2 list: top products by rating_count per category, each product group once
+    return parallel_top_products(df, ctx.backend, groups=groups)
+
+
+@registry.stage('insight_q2', inputs=['top_products'], output='insight_q2_top_products_by_category.json')
+def insight_q2(ctx, top_products):
+    # Q2: first 30 rows for dashboard
+    return top_products[:30]
+
+
+@registry.stage('insight_q3', inputs=['aggregates'], output='insight_q3_price_distribution.json')
+def insight_q3(ctx, aggregates):
+    # Q3: Distribution of discounted vs actual prices (binned counts)
+    return aggregates.q3_price_distribution()
+
+
+@registry.stage('insight_q4', inputs=['category_stats'], output='insight_q4_avg_discount_by_category.json')
+def insight_q4(ctx, category_stats):
+    # Q4: Average discount by category (table)
+    q4_discount = category_stats[['category', 'avg_discount']].copy()
+    q4_discount['category_short'] = leaf_names(q4_discount['category'])
+    q4_discount = q4_discount.sort_values('avg_discount', ascending=False).head(25)
+    # Full path too, since different paths can share a leaf name
+    return q4_discount[['category_short', 'avg_discount', 'category']].rename(columns={'category': 'category_path'}).round(2)
+
+
+@registry.stage('product_popularity', inputs=['cleaned', 'product_groups'])
+def product_popularity(ctx, df, groups):
+    # Occurrences, mean rating and total reviews of every product group (or name)
+    return parallel_product_popularity(df, ctx.backend, groups=groups)
+
+
+@registry.stage('insight_q5', inputs=['product_popularity'], output='insight_q5_popular_products.json')
+def insight_q5(ctx, product_popularity):
+    # Q5: Most popular product names
+    q5_counts = product_popularity.sort_values('total_reviews', ascending=False).head(15)
+    q5_counts['product_name_short'] = q5_counts['product_name'].apply(lambda x: (x[:55] + '...') if len(str(x)) > 55 else x)
+    columns = ['product_name_short', 'occurrences', 'avg_rating', 'total_reviews']
+    columns += [col for col in ['product_group', 'variants'] if col in q5_counts.columns]
+    return q5_counts[columns].round(2).to_dict('records')
+
+
+def keyword_settings(ctx):
+    return f'{ctx.keyword_capacity}/{ctx.keyword_ngram}/{ctx.stopwords}'
+
+
+@registry.stage('insight_q6', inputs=['cleaned'], output='insight_q6_keywords.json', key=keyword_settings)
+def insight_q6(ctx, df):
+    # Q6: Most popular keywords from product names (exact counts unless --keyword-capacity is set)
+    top = top_keywords(df['product_name'], k=20, capacity=ctx.keyword_capacity or None,
+                       ngram=ctx.keyword_ngram, stopwords=STOPWORDS if ctx.stopwords else None)
+    return [{'keyword': k, 'count': int(v)} for k, v in top]
+
+
+@registry.stage('insight_q7', inputs=['cleaned'], output='insight_q7_popular_reviews.json')
+def insight_q7(ctx, df):
+    # Q7: Top review titles (value_counts)
+    if 'review_title' not in df.columns:
         return []
-    return [w.lower() for w in name.split() if w.isalpha() and len(w) > 1]
-all_kw = []
-for name in df['product_name'].dropna():
-    all_kw.extend(extract_keywords(name))
-kw_counts = pd.Series(all_kw).value_counts().head(20)
-q6 = [{'keyword': k, 'count': int(v)} for k, v in kw_counts.items()]
-with open('dashboard_data/insight_q6_keywords.json', 'w', encoding='utf-8') as f:
-    json.dump(q6, f, indent=2)
-
-# Q7: Top review titles (value_counts)
-if 'review_title' in df.columns:
     q7_titles = df['review_title'].dropna().astype(str).value_counts().head(15).reset_index()
     q7_titles.columns = ['review_title', 'count']
     q7_titles['review_title_short'] = q7_titles['review_title'].str[:50] + '...'
-    q7_titles[['review_title_short', 'count']].to_json('dashboard_data/insight_q7_popular_reviews.json', orient='records', indent=2)
-else:
-    with open('dashboard_data/insight_q7_popular_reviews.json', 'w', encoding='utf-8') as f:
-        json.dump([], f)
-
-# Q8: Correlation discounted_price vs rating + sample for scatter
-corr_val = df['discounted_price_clean'].corr(df['rating_clean'])
-q8_sample = df[['discounted_price_clean', 'rating_clean']].dropna().sample(n=min(80, len(df)), random_state=42)
-q8 = {'correlation': round(float(corr_val), 4), 'scatter': q8_sample.rename(columns={'discounted_price_clean': 'price', 'rating_clean': 'rating'}).round(2).to_dict('records')}
-with open('dashboard_data/insight_q8_correlation.json', 'w', encoding='utf-8') as f:
-    json.dump(q8, f, indent=2)
-
-# Q9: Top 5 categories by rating (already have top_categories)
-q9_top5 = category_stats.nlargest(5, 'avg_rating')[['category', 'avg_rating', 'product_count']].copy()
-q9_top5['category_short'] = q9_top5['category'].str.split('|').str[-1]
-q9_top5[['category_short', 'avg_rating', 'product_count']].round(2).to_json('dashboard_data/insight_q9_top5_categories.json', orient='records', indent=2)
-
-# Save JSON files for dashboard
-with open('dashboard_data/summary_stats.json', 'w', encoding='utf-8') as f:
-    json.dump(summary_stats, f, indent=2)
-
-category_stats.to_json('dashboard_data/category_stats.json', orient='records', indent=2)
-price_range_stats.to_json('dashboard_data/price_range_stats.json', orient='records', indent=2)
-discount_stats.to_json('dashboard_data/discount_stats.json', orient='records', indent=2)
-top_rated.to_json('dashboard_data/top_rated_products.json', orient='records', indent=2)
-top_categories.to_json('dashboard_data/top_categories.json', orient='records', indent=2)
-
-# Save cleaned dataset
-df_clean = df[[
-    'product_id', 'product_name', 'category', 
-    'discounted_price_clean', 'actual_price_clean', 'discount_percentage_clean',
-    'rating_clean', 'rating_count_clean', 'price_range', 'discount_range'
-]].rename(columns={
-    'discounted_price_clean': 'discounted_price',
-    'actual_price_clean': 'actual_price',
-    'discount_percentage_clean': 'discount_percentage',
-    'rating_clean': 'rating',
-    'rating_count_clean': 'rating_count'
-})
-
-df_clean.to_csv('dashboard_data/cleaned_data.csv', index=False)
-
-# --- Business Insights: Statistical Hypothesis Tests ---
-print("\nComputing Business Insights (statistical tests)...")
-
-business_insights = []
-
-# 1. Discounts vs Ratings (Do discounts hurt quality perception?)
-high_discount = df[df['discount_percentage_clean'] >= 30]['rating_clean'].dropna()
-low_discount = df[df['discount_percentage_clean'] < 30]['rating_clean'].dropna()
-if len(high_discount) > 0 and len(low_discount) > 0:
-    t_stat, p_value = stats.ttest_ind(high_discount, low_discount)
-    business_insights.append({
-        'id': 'insight1',
-        'question': 'Do discounts hurt quality perception?',
-        'hypothesis': 'H0: Average rating of high-discount products = average rating of low-discount products',
-        'test': 'Two-sample t-test',
-        'high_discount_mean': round(float(high_discount.mean()), 3),
-        'low_discount_mean': round(float(low_discount.mean()), 3),
-        'high_discount_count': int(len(high_discount)),
-        'low_discount_count': int(len(low_discount)),
-        't_statistic': round(float(t_stat), 4),
-        'p_value': round(float(p_value), 6),
-        'significant': bool(p_value < 0.05),
-        'interpretation': 'High discounts have {} ratings than low discounts'.format('significantly different' if p_value < 0.05 else 'similar'),
-        'recommendation': 'Avoid over-discounting core products' if p_value < 0.05 and high_discount.mean() < low_discount.mean() else 'Discounts do not significantly impact quality perception'
-    })
+    return q7_titles[['review_title_short', 'count']]
 
-# 2. Discounts vs Popularity (Do discounts drive engagement?)
-high_disc_reviews = df[df['discount_percentage_clean'] >= 30]['rating_count_clean'].dropna()
-low_disc_reviews = df[df['discount_percentage_clean'] < 30]['rating_count_clean'].dropna()
-if len(high_disc_reviews) > 0 and len(low_disc_reviews) > 0:
-    t_stat, p_value = stats.ttest_ind(high_disc_reviews, low_disc_reviews)
-    business_insights.append({
-        'id': 'insight2',
-        'question': 'Do discounts drive engagement?',
-        'hypothesis': 'H0: Mean rating_count for high-discount products = mean rating_count for low-discount products',
-        'test': 'One-sided two-sample t-test',
-        'high_discount_mean_reviews': round(float(high_disc_reviews.mean()), 1),
-        'low_discount_mean_reviews': round(float(low_disc_reviews.mean()), 1),
-        't_statistic': round(float(t_stat), 4),
-        'p_value': round(float(p_value), 6),
-        'significant': bool(p_value < 0.05),
-        'interpretation': 'High-discount products have {} reviews than low-discount products'.format('significantly more' if p_value < 0.05 and high_disc_reviews.mean() > low_disc_reviews.mean() else 'similar'),
-        'recommendation': 'Discounts increase engagement' if p_value < 0.05 and high_disc_reviews.mean() > low_disc_reviews.mean() else 'Discounts do not significantly drive engagement'
-    })
 
-# 3. Category Quality Comparison (Which categories are strong/weak?)
-# Top 5 vs Bottom 5 categories by avg rating
-top_cats = category_stats.nlargest(5, 'avg_rating')['category'].tolist()
-bottom_cats = category_stats.nsmallest(5, 'avg_rating')['category'].tolist()
-top_cat_ratings = df[df['category'].isin(top_cats)]['rating_clean'].dropna()
-bottom_cat_ratings = df[df['category'].isin(bottom_cats)]['rating_clean'].dropna()
-if len(top_cat_ratings) > 0 and len(bottom_cat_ratings) > 0:
-    t_stat, p_value = stats.ttest_ind(top_cat_ratings, bottom_cat_ratings)
-    business_insights.append({
-        'id': 'insight3',
-        'question': 'Which categories are strong/weak?',
-        'hypothesis': 'H0: Mean rating for top categories = mean rating for bottom categories',
-        'test': 'Two-sample t-test',
-        'top_categories_mean': round(float(top_cat_ratings.mean()), 3),
-        'bottom_categories_mean': round(float(bottom_cat_ratings.mean()), 3),
-        'top_categories': [cat.split('|')[-1] for cat in top_cats[:3]],
-        'bottom_categories': [cat.split('|')[-1] for cat in bottom_cats[:3]],
-        't_statistic': round(float(t_stat), 4),
-        'p_value': round(float(p_value), 6),
-        'significant': bool(p_value < 0.05),
-        'interpretation': 'Top categories have {} ratings than bottom categories'.format('significantly higher' if p_value < 0.05 else 'similar'),
-        'recommendation': 'Focus on high-performing categories; investigate low-performing ones' if p_value < 0.05 else 'Category ratings are similar'
-    })
+@registry.stage('scatter_sample', inputs=['cleaned'], key=lambda ctx: f'{ctx.scatter_per_stratum}/{ctx.seed}')
+def scatter_sample(ctx, df):
+    # Price/rating sample stratified by department and price range, plus the density grid
+    return ScatterSampler(ctx.scatter_per_stratum, ctx.seed).update(df)
 
-# 4. Price Tier vs Rating (Do expensive items get better ratings?)
-df['price_tier'] = pd.qcut(df['discounted_price_clean'], q=3, labels=['Low', 'Mid', 'High'], duplicates='drop')
-price_tiers = df.groupby('price_tier', observed=False)['rating_clean'].apply(lambda x: x.dropna().tolist())
-if len(price_tiers) >= 3:
-    f_stat, p_value = stats.f_oneway(*price_tiers.values)
-    tier_means = {tier: round(float(df[df['price_tier'] == tier]['rating_clean'].mean()), 3) for tier in ['Low', 'Mid', 'High'] if tier in df['price_tier'].values}
-    business_insights.append({
-        'id': 'insight4',
-        'question': 'Do expensive items get better ratings?',
-        'hypothesis': 'H0: Mean rating is the same across price tiers',
-        'test': 'One-way ANOVA',
-        'tier_means': tier_means,
-        'f_statistic': round(float(f_stat), 4),
-        'p_value': round(float(p_value), 6),
-        'significant': bool(p_value < 0.05),
-        'interpretation': 'Price tiers have {} ratings'.format('significantly different' if p_value < 0.05 else 'similar'),
-        'recommendation': 'Focus on {} price segment'.format(max(tier_means, key=tier_means.get)) if p_value < 0.05 else 'Price does not significantly affect ratings'
-    })
 
-# 5. Discount Level Differences by Category
-# ANOVA: discount_percentage ~ category (top 10 categories by product count)
-top_10_cats = category_stats.nlargest(10, 'product_count')['category'].tolist()
-cat_discounts = df[df['category'].isin(top_10_cats)].groupby('category')['discount_percentage_clean'].apply(lambda x: x.dropna().tolist())
-if len(cat_discounts) >= 2:
-    f_stat, p_value = stats.f_oneway(*cat_discounts.values)
-    cat_discount_means = {cat.split('|')[-1]: round(float(df[df['category'] == cat]['discount_percentage_clean'].mean()), 2) for cat in top_10_cats[:5]}
-    business_insights.append({
-        'id': 'insight5',
-        'question': 'Different discount strategies per category?',
-        'hypothesis': 'H0: Mean discount_percentage is equal across all categories',
-        'test': 'One-way ANOVA',
-        'category_discount_means': cat_discount_means,
-        'f_statistic': round(float(f_stat), 4),
-        'p_value': round(float(p_value), 6),
-        'significant': bool(p_value < 0.05),
-        'interpretation': 'Categories have {} discount levels'.format('significantly different' if p_value < 0.05 else 'similar'),
-        'recommendation': 'Adjust pricing policy - some categories are over-subsidized' if p_value < 0.05 else 'Discount strategies are consistent across categories'
-    })
+@registry.stage('insight_q8', inputs=['scatter_sample'], output='insight_q8_correlation.json')
+def insight_q8(ctx, scatter_sample):
+    # Q8: Correlation discounted_price vs rating + weighted sample and density levels for the charts
+    return scatter_sample.result()
 
-# 6. Correlation: discount_percentage vs rating
-discount_rating_corr = df['discount_percentage_clean'].corr(df['rating_clean'])
-# Test H0: correlation = 0
-n = len(df[['discount_percentage_clean', 'rating_clean']].dropna())
-if n > 2:
-    t_corr = discount_rating_corr * np.sqrt((n - 2) / (1 - discount_rating_corr**2))
-    p_value_corr = 2 * (1 - stats.t.cdf(abs(t_corr), n - 2))
-    business_insights.append({
-        'id': 'insight6',
-        'question': 'Correlation: discount vs rating',
-        'hypothesis': 'H0: Correlation ρ = 0',
-        'test': 'Pearson correlation test',
-        'correlation': round(float(discount_rating_corr), 4),
-        'p_value': round(float(p_value_corr), 6),
-        'significant': bool(p_value_corr < 0.05),
-        'interpretation': 'Discount and rating are {} correlated'.format('significantly' if p_value_corr < 0.05 else 'not significantly'),
-        'recommendation': 'Discounts {} affect ratings'.format('do' if p_value_corr < 0.05 else 'do not significantly')
+
+@registry.stage('insight_q9', inputs=['category_stats'], output='insight_q9_top5_categories.json')
+def insight_q9(ctx, category_stats):
+    # Q9: Top 5 categories by rating
+    q9_top5 = category_stats.nlargest(5, 'avg_rating')[['category', 'avg_rating', 'product_count']].copy()
+    q9_top5['category_short'] = leaf_names(q9_top5['category'])
+    return q9_top5[['category_short', 'avg_rating', 'product_count', 'category']].rename(columns={'category': 'category_path'}).round(2)
+
+
+@registry.stage('top_rated', inputs=['cleaned', 'product_groups'])
+def top_rated(ctx, df, groups):
+    # Top products by rating
+    columns = ['product_name', 'category', 'rating_clean', 'rating_count_clean', 'discounted_price_clean']
+    if groups is None:
+        return df.nlargest(20, 'rating_clean')[columns]
+    # Each product group once, under its best-rated listing (ties in file order, like nlargest)
+    ranked = with_groups(df[columns], groups).dropna(subset=['rating_clean'])
+    ranked = ranked.sort_values('rating_clean', ascending=False, kind='stable')
+    ranked = ranked[~(ranked.duplicated('product_group') & ranked['product_group'].notna())]
+    return ranked.head(20)[columns + ['product_group']]
+
+
+@registry.stage('top_rated_products', inputs=['top_rated'], output='top_rated_products.json')
+def top_rated_products(ctx, top_rated):
+    # Rename for dashboard compatibility
+    return top_rated.rename(columns={
+        'rating_clean': 'rating',
+        'rating_count_clean': 'rating_count',
+        'discounted_price_clean': 'discounted_price'
     })
 
-# 7. Top Products vs Others (Quality of best-sellers)
-top_10_pct_threshold = df['rating_count_clean'].quantile(0.9)
-top_products = df[df['rating_count_clean'] >= top_10_pct_threshold]['rating_clean'].dropna()
-other_products = df[df['rating_count_clean'] < top_10_pct_threshold]['rating_clean'].dropna()
-if len(top_products) > 0 and len(other_products) > 0:
-    t_stat, p_value = stats.ttest_ind(top_products, other_products)
-    business_insights.append({
-        'id': 'insight7',
-        'question': 'Quality of best-sellers',
-        'hypothesis': 'H0: Mean rating of top products = mean rating of other products',
-        'test': 'One-sided two-sample t-test',
-        'top_products_mean': round(float(top_products.mean()), 3),
-        'other_products_mean': round(float(other_products.mean()), 3),
-        'top_products_count': int(len(top_products)),
-        'other_products_count': int(len(other_products)),
-        't_statistic': round(float(t_stat), 4),
-        'p_value': round(float(p_value), 6),
-        'significant': bool(p_value < 0.05),
-        'interpretation': 'Top products have {} ratings than others'.format('significantly higher' if p_value < 0.05 and top_products.mean() > other_products.mean() else 'similar'),
-        'recommendation': 'Best-sellers are truly higher quality' if p_value < 0.05 and top_products.mean() > other_products.mean() else 'Best-sellers have similar quality to others'
+
+@registry.stage('cleaned_data', inputs=['cleaned'], output='cleaned_data.csv', memo=False)
+def cleaned_data(ctx, df):
+    # Save cleaned dataset
+    return df[[
+        'product_id', 'product_name', 'category',
+        'discounted_price_clean', 'actual_price_clean', 'discount_percentage_clean',
+        'rating_clean', 'rating_count_clean', 'price_range', 'discount_range'
+    ]].rename(columns={
+        'discounted_price_clean': 'discounted_price',
+        'actual_price_clean': 'actual_price',
+        'discount_percentage_clean': 'discount_percentage',
+        'rating_clean': 'rating',
+        'rating_count_clean': 'rating_count'
     })
 
-# Save business insights
-with open('dashboard_data/business_insights.json', 'w', encoding='utf-8') as f:
-    json.dump(business_insights, f, indent=2)
 
-print("\nData processing complete!")
-print(f"\nSummary Statistics:")
-for key, value in summary_stats.items():
-    print(f"  {key}: {value}")
-print(f"\nBusiness Insights computed: {len(business_insights)}")
+# --- Business insights (hypothesis tests) ---
+
+def insight_samples(df, category_stats):
+    """The exact samples behind every insight test: {insight id: (samples, extra fields)}"""
+    rating = df['rating_clean']
+    high_discount = df['discount_percentage_clean'] >= DISCOUNT_SPLIT
+    low_discount = df['discount_percentage_clean'] < DISCOUNT_SPLIT
+    top_cats, bottom_cats, top_10_cats = insight_categories(category_stats)
+
+    # Price tertiles, and the top 10% of products by review count
+    price_tier = pd.qcut(df['discounted_price_clean'], q=3, labels=PRICE_TIERS, duplicates='drop')
+    price_tiers = df.groupby(price_tier, observed=False)['rating_clean'].apply(lambda x: x.dropna().tolist())
+    cat_discounts = df[df['category'].isin(top_10_cats)].groupby('category')['discount_percentage_clean'].apply(lambda x: x.dropna().tolist())
+    pairs = df[['discount_percentage_clean', 'rating_clean']].dropna()
+    top_10_pct_threshold = df['rating_count_clean'].quantile(TOP_PRODUCTS_QUANTILE)
+
+    return {
+        'insight1': ([rating[high_discount].dropna(), rating[low_discount].dropna()], {}),
+        'insight2': ([df[high_discount]['rating_count_clean'].dropna(), df[low_discount]['rating_count_clean'].dropna()], {}),
+        'insight3': ([rating[df['category'].isin(top_cats)].dropna(), rating[df['category'].isin(bottom_cats)].dropna()],
+                     {'top_categories': top_cats, 'bottom_categories': bottom_cats}),
+        # Exact quantile splits: no row can land in the wrong group
+        'insight4': (list(price_tiers.values) if len(price_tiers) >= 3 else [], {'split_error_rows': 0}),
+        'insight5': (list(cat_discounts.values), {
+            'category_means': {cat: df[df['category'] == cat]['discount_percentage_clean'].mean() for cat in top_10_cats[:5]}}),
+        'insight6': ([pairs['discount_percentage_clean'], pairs['rating_clean']], {}),
+        'insight7': ([rating[df['rating_count_clean'] >= top_10_pct_threshold].dropna(),
+                      rating[df['rating_count_clean'] < top_10_pct_threshold].dropna()], {'split_error_rows': 0}),
+    }
+
+
+def insight_records(summaries):
+    """
+    The business insight records from {insight id: (moments, extra fields)}, where
+    moments are accumulators.Moments per group (CoMoments for insight6); exact
+    samples and the appended-rows accumulator both end up here
+    """
+    business_insights = []
+
+    # 1. Discounts vs Ratings (Do discounts hurt quality perception?)
+    (high_discount, low_discount), _ = summaries['insight1']
+    if high_discount.n > 0 and low_discount.n > 0:
+        t_stat, p_value = ttest(high_discount, low_discount)
+        business_insights.append({
+            'id': 'insight1',
+            'question': 'Do discounts hurt quality perception?',
+            'hypothesis': 'H0: Average rating of high-discount products = average rating of low-discount products',
+            'test': 'Two-sample t-test',
+            'high_discount_mean': round(high_discount.mean, 3),
+            'low_discount_mean': round(low_discount.mean, 3),
+            'high_discount_count': high_discount.n,
+            'low_discount_count': low_discount.n,
+            't_statistic': round(float(t_stat), 4),
+            'p_value': round(float(p_value), 6),
+            'significant': bool(p_value < 0.05),
+            'interpretation': 'High discounts have {} ratings than low discounts'.format('significantly different' if p_value < 0.05 else 'similar'),
+            'recommendation': 'Avoid over-discounting core products' if p_value < 0.05 and high_discount.mean < low_discount.mean else 'Discounts do not significantly impact quality perception'
+        })
+
+    # 2. Discounts vs Popularity (Do discounts drive engagement?)
+    (high_disc_reviews, low_disc_reviews), _ = summaries['insight2']
+    if high_disc_reviews.n > 0 and low_disc_reviews.n > 0:
+        t_stat, p_value = ttest(high_disc_reviews, low_disc_reviews)
+        business_insights.append({
+            'id': 'insight2',
+            'question': 'Do discounts drive engagement?',
+            'hypothesis': 'H0: Mean rating_count for high-discount products = mean rating_count for low-discount products',
+            'test': 'One-sided two-sample t-test',
+            'high_discount_mean_reviews': round(high_disc_reviews.mean, 1),
+            'low_discount_mean_reviews': round(low_disc_reviews.mean, 1),
+            't_statistic': round(float(t_stat), 4),
+            'p_value': round(float(p_value), 6),
+            'significant': bool(p_value < 0.05),
+            'interpretation': 'High-discount products have {} reviews than low-discount products'.format('significantly more' if p_value < 0.05 and high_disc_reviews.mean > low_disc_reviews.mean else 'similar'),
+            'recommendation': 'Discounts increase engagement' if p_value < 0.05 and high_disc_reviews.mean > low_disc_reviews.mean else 'Discounts do not significantly drive engagement'
+        })
+
+    # 3. Category Quality Comparison (Which categories are strong/weak?)
+    # Top 5 vs Bottom 5 categories by avg rating
+    (top_cat_ratings, bottom_cat_ratings), extra = summaries['insight3']
+    if top_cat_ratings.n > 0 and bottom_cat_ratings.n > 0:
+        t_stat, p_value = ttest(top_cat_ratings, bottom_cat_ratings)
+        business_insights.append({
+            'id': 'insight3',
+            'question': 'Which categories are strong/weak?',
+            'hypothesis': 'H0: Mean rating for top categories = mean rating for bottom categories',
+            'test': 'Two-sample t-test',
+            'top_categories_mean': round(top_cat_ratings.mean, 3),
+            'bottom_categories_mean': round(bottom_cat_ratings.mean, 3),
+            'top_categories': leaf_names(extra['top_categories'][:3]).tolist(),
+            'bottom_categories': leaf_names(extra['bottom_categories'][:3]).tolist(),
+            't_statistic': round(float(t_stat), 4),
+            'p_value': round(float(p_value), 6),
+            'significant': bool(p_value < 0.05),
+            'interpretation': 'Top categories have {} ratings than bottom categories'.format('significantly higher' if p_value < 0.05 else 'similar'),
+            'recommendation': 'Focus on high-performing categories; investigate low-performing ones' if p_value < 0.05 else 'Category ratings are similar'
+        })
+
+    # 4. Price Tier vs Rating (Do expensive items get better ratings?)
+    price_tiers, extra = summaries['insight4']
+    if len(price_tiers) >= 3:
+        f_stat, p_value = anova(price_tiers)
+        tier_means = {tier: round(g.mean, 3) for tier, g in zip(PRICE_TIERS, price_tiers) if g.n}
+        business_insights.append({
+            'id': 'insight4',
+            'question': 'Do expensive items get better ratings?',
+            'hypothesis': 'H0: Mean rating is the same across price tiers',
+            'test': 'One-way ANOVA',
+            'tier_means': tier_means,
+            'tier_counts': {tier: g.n for tier, g in zip(PRICE_TIERS, price_tiers) if g.n},
+            'f_statistic': round(float(f_stat), 4),
+            'p_value': round(float(p_value), 6),
+            'significant': bool(p_value < 0.05),
+            'interpretation': 'Price tiers have {} ratings'.format('significantly different' if p_value < 0.05 else 'similar'),
+            'recommendation': 'Focus on {} price segment'.format(max(tier_means, key=tier_means.get)) if p_value < 0.05 else 'Price does not significantly affect ratings'
+        })
+        business_insights[-1].update(extra)
+
+    # 5. Discount Level Differences by Category
+    # ANOVA: discount_percentage ~ category (top 10 categories by product count)
+    cat_discounts, extra = summaries['insight5']
+    if len(cat_discounts) >= 2:
+        f_stat, p_value = anova(cat_discounts)
+        cat_discount_means = {cat.split('|')[-1]: round(float(mean), 2) for cat, mean in extra['category_means'].items()}
+        business_insights.append({
+            'id': 'insight5',
+            'question': 'Different discount strategies per category?',
+            'hypothesis': 'H0: Mean discount_percentage is equal across all categories',
+            'test': 'One-way ANOVA',
+            'category_discount_means': cat_discount_means,
+            'f_statistic': round(float(f_stat), 4),
+            'p_value': round(float(p_value), 6),
+            'significant': bool(p_value < 0.05),
+            'interpretation': 'Categories have {} discount levels'.format('significantly different' if p_value < 0.05 else 'similar'),
+            'recommendation': 'Adjust pricing policy - some categories are over-subsidized' if p_value < 0.05 else 'Discount strategies are consistent across categories'
+        })
+
+    # 6. Correlation: discount_percentage vs rating
+    pairs, _ = summaries['insight6']
+    discount_rating_corr = pairs.correlation
+    # Test H0: correlation = 0
+    n = pairs.n
+    if n > 2:
+        t_corr = discount_rating_corr * np.sqrt((n - 2) / (1 - discount_rating_corr**2))
+        p_value_corr = 2 * (1 - stats.t.cdf(abs(t_corr), n - 2))
+        business_insights.append({
+            'id': 'insight6',
+            'question': 'Correlation: discount vs rating',
+            'hypothesis': 'H0: Correlation ρ = 0',
+            'test': 'Pearson correlation test',
+            'correlation': round(float(discount_rating_corr), 4),
+            'p_value': round(float(p_value_corr), 6),
+            'significant': bool(p_value_corr < 0.05),
+            'interpretation': 'Discount and rating are {} correlated'.format('significantly' if p_value_corr < 0.05 else 'not significantly'),
+            'recommendation': 'Discounts {} affect ratings'.format('do' if p_value_corr < 0.05 else 'do not significantly')
+        })
+
+    # 7. Top Products vs Others (Quality of best-sellers)
+    (top_products, other_products), extra = summaries['insight7']
+    if top_products.n > 0 and other_products.n > 0:
+        t_stat, p_value = ttest(top_products, other_products)
+        business_insights.append({
+            'id': 'insight7',
+            'question': 'Quality of best-sellers',
+            'hypothesis': 'H0: Mean rating of top products = mean rating of other products',
+            'test': 'One-sided two-sample t-test',
+            'top_products_mean': round(top_products.mean, 3),
+            'other_products_mean': round(other_products.mean, 3),
+            'top_products_count': top_products.n,
+            'other_products_count': other_products.n,
+            't_statistic': round(float(t_stat), 4),
+            'p_value': round(float(p_value), 6),
+            'significant': bool(p_value < 0.05),
+            'interpretation': 'Top products have {} ratings than others'.format('significantly higher' if p_value < 0.05 and top_products.mean > other_products.mean else 'similar'),
+            'recommendation': 'Best-sellers are truly higher quality' if p_value < 0.05 and top_products.mean > other_products.mean else 'Best-sellers have similar quality to others'
+        })
+        business_insights[-1].update(extra)
+
+    # Resampling fields are always present; the business_insights stage fills them in with --resamples
+    for insight in business_insights:
+        insight.update(skipped_fields())
+    return business_insights
+
+
+@registry.stage('business_insights', inputs=['cleaned', 'category_stats'], output='business_insights.json',
+                key=lambda ctx: f'{ctx.resamples}/{ctx.seed}/{ctx.resample_rows}')
+def business_insights(ctx, df, category_stats):
+    # Statistical hypothesis tests on the exact samples, plus permutation p-values and
+    # bootstrap CIs (resampling.py) unless --resamples 0
+    samples = insight_samples(df, category_stats)
+    summaries = {name: (CoMoments.of(*groups) if name == 'insight6' else [Moments.of(g) for g in groups], extra)
+                 for name, (groups, extra) in samples.items()}
+    business_insights = insight_records(summaries)
+    if ctx.resamples:
+        # Without --workers, resampling still uses every CPU
+        backend = get_backend(0) if ctx.workers is None else ctx.backend
+        resampler = Resampler(ctx.resamples, ctx.seed, backend, max_rows=ctx.resample_rows)
+        for insight in business_insights:
+            name = insight['id']
+            groups = samples[name][0]
+            if name == 'insight6':
+                insight.update(resampler.correlation(name, *groups))
+            elif name in ('insight4', 'insight5'):
+                insight.update(resampler.anova(name, groups))
+            else:
+                insight.update(resampler.grouped(name, groups))
+    return business_insights
+
+
+@registry.stage('insight_accumulator', inputs=['cleaned'])
+def insight_accumulator(ctx, df):
+    # Mergeable state of the insight tests, saved with --insight-state for --append runs
+    return InsightAccumulator().update(df)
+
+
+def run_mode(pipeline, args):
+    """Run the stages of the mode selected by args; returns {stage: result}"""
+    if args.chunksize:
+        # Streaming mode: fold chunks into partial aggregates so memory stays flat in input size
+        print(f"Streaming data in chunks of {args.chunksize:,} rows...")
+        sampler = ScatterSampler(args.scatter_per_stratum, args.seed)
+        provided = {
+            'aggregates': aggregate_csv(args.input, chunksize=args.chunksize, consumers=[sampler]),
+            'scatter_sample': sampler,
+        }
+        results = pipeline.run(args.only or STREAMING_OUTPUTS, provided=provided)
+        print("\nStreaming aggregation complete (row-level outputs Q2, Q5-Q7, top products and insights skipped)")
+    elif args.incremental:
+        # Incremental mode: diff the CSV against the saved state and recompute only what changed
+        print("Loading data...")
+        raw = pd.read_csv(args.input, encoding='utf-8')
+        state = load_state(args.incremental)
+        report = state.update(raw)
+        print(f"Rows added/modified/removed: {report['added']}/{report['modified']}/{report['removed']}, "
+              f"recomputed {report['recomputed_categories']} categories and {report['recomputed_products']} products "
+              f"({report['recleaned_rows']} rows re-cleaned)")
+        provided = {
+            'aggregates': state.aggregates(),
+            'top_products': state.top_products_list(),
+            'product_popularity': state.products.copy(),
+            'top_rated': state.top_rated,
+        }
+        results = pipeline.run(args.only or INCREMENTAL_OUTPUTS, provided=provided)
+        save_state(state, args.incremental)
+        print("\nIncremental update complete (Q6-Q8, cleaned data and insights need a full run)")
+    elif args.append:
+        # Append mode: fold only the new rows into the saved insight accumulators
+        state = load_accumulator(args.insight_state)
+        if state is None:
+            raise SystemExit(f"No insight state in {args.insight_state}: run once with --insight-state first")
+        print(f"Loading appended rows from {args.append}...")
+        batch = clean_frame(pd.read_csv(args.append, encoding='utf-8'))
+        state.update(batch)
+        results = pipeline.run(['business_insights'], provided={'business_insights': insight_records(state.summaries())})
+        save_state(state, args.insight_state)
+        print(f"\nAppended {len(batch):,} rows ({state.rows:,} in total); only business_insights.json was updated")
+    else:
+        print("\nComputing stages...")
+        targets = args.only
+        if args.insight_state:
+            targets = list(targets or registry.outputs()) + ['insight_accumulator']
+        results = pipeline.run(targets)
+        if args.insight_state:
+            save_state(results['insight_accumulator'], args.insight_state)
+        print("\nData processing complete!")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process the Amazon Sales dataset into dashboard_data/')
+    parser.add_argument('--input', default='amazon_sales_data.csv', help='raw CSV export')
+    parser.add_argument('--output-dir', default='dashboard_data', help='where the dashboard files are written')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream the CSV in chunks of this many rows (aggregate outputs and Q8 only)')
+    parser.add_argument('--incremental', metavar='STATE_FILE', default=None,
+                        help='only recompute categories/products whose rows changed since the run that wrote STATE_FILE')
+    parser.add_argument('--append', metavar='NEW_ROWS_CSV', default=None,
+                        help='fold rows appended to the dataset into the --insight-state accumulators and '
+                             'rewrite business_insights.json only')
+    parser.add_argument('--insight-state', metavar='STATE_FILE', default=None,
+                        help='where the business insight accumulators are saved (full runs) and updated (--append)')
+    parser.add_argument('--cache-dir', default='.cache',
+                        help='where the cleaned columnar cache (needs pyarrow) and stage memos are kept')
+    parser.add_argument('--no-cache', action='store_true', help='always re-read and re-clean the CSV and recompute every stage')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for the category/product aggregations (default 1) and the resampling '
+                             '(default one per CPU); 0 = one per CPU')
+    parser.add_argument('--jobs', type=int, default=1, help='stages run concurrently')
+    parser.add_argument('--keyword-capacity', type=int, default=0,
+                        help='count Q6 keywords in a Space-Saving summary of this many entries (0 = exact)')
+    parser.add_argument('--keyword-ngram', type=int, default=1, help='count runs of this many words as Q6 keywords')
+    parser.add_argument('--resamples', type=int, default=0,
+                        help='permutation/bootstrap resamples per business insight, e.g. 2000 (0 = parametric tests only)')
+    parser.add_argument('--resample-rows', type=int, default=20000,
+                        help='values per test that are resampled; larger tests use a random subsample of this size')
+    parser.add_argument('--seed', type=int, default=42, help='seed for the resampling tests and the Q8 scatter sample')
+    parser.add_argument('--scatter-per-stratum', type=int, default=20,
+                        help='Q8 scatter points kept per (department, price range) stratum')
+    parser.add_argument('--stopwords', action='store_true', help='drop common English filler words from Q6 keywords')
+    parser.add_argument('--dedup-threshold', type=float, default=0,
+                        help='word-set similarity, e.g. 0.8, at which product names count as one product in Q2, '
+                             'Q5 and top rated (default 0 = exact names; not with --incremental)')
+    parser.add_argument('--profile', metavar='FILE', default=None,
+                        help='write per-stage wall time and peak RSS to FILE as JSON (runs stages one at a time)')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='with --profile, also record Python allocations per stage (slower)')
+    parser.add_argument('--only', nargs='+', metavar='STAGE', choices=list(registry.stages),
+                        help='only compute these stages (and what they depend on)')
+    args = parser.parse_args(argv)
+    if args.append and not args.insight_state:
+        parser.error('--append needs --insight-state')
+    modes = [flag for flag, value in [('--chunksize', args.chunksize), ('--incremental', args.incremental),
+                                      ('--append', args.append)] if value]
+    if len(modes) > 1:
+        parser.error(f'{" and ".join(modes)} are separate modes; use only one of them')
+    # Row-level stages need the cleaned rows, which the streaming and incremental modes never load
+    mode_outputs = STREAMING_OUTPUTS if args.chunksize else INCREMENTAL_OUTPUTS if args.incremental else None
+    if mode_outputs and args.only and set(args.only) - set(mode_outputs):
+        parser.error(f'{modes[0]} cannot compute {", ".join(sorted(set(args.only) - set(mode_outputs)))} '
+                     f'(only {", ".join(mode_outputs)}); run those without {modes[0]}')
+    if args.append and args.only:
+        parser.error('--append only updates business_insights; it cannot be combined with --only')
+    if args.incremental and args.dedup_threshold:
+        parser.error('--incremental keeps exact product names; it cannot be combined with --dedup-threshold')
+
+    args.backend = get_backend(1 if args.workers is None else args.workers)
+    args.profiler = Profiler(args.trace_allocations) if args.profile else None
+    memo_dir = None if args.no_cache else os.path.join(args.cache_dir, 'stages')
+    # Outputs go to a staging directory first and are published together at the end
+    staging = staging_dir(args.output_dir)
+    pipeline = Pipeline(registry, args, memo_dir=memo_dir, jobs=1 if args.profile else args.jobs,
+                        code_version=code_version(), output_dir=staging, profiler=args.profiler)
+    try:
+        results = run_mode(pipeline, args)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    with measure(args.profiler, 'publish'):
+        manifest = publish(staging, args.output_dir, input=os.path.abspath(args.input), stages=sorted(results))
+    print(f"Published {len(manifest['written'])} files to {args.output_dir} (bundle: {manifest['bundle']['file']})")
+
+    if args.profiler:
+        args.profiler.write(args.profile, input=os.path.abspath(args.input), workers=args.workers)
+        print(f"\nProfile written to {args.profile}")
+
+    if 'summary_stats' in results:
+        print(f"\nSummary Statistics:")
+        for key, value in results['summary_stats'].items():
+            print(f"  {key}: {value}")
+    if 'business_insights' in results:
+        print(f"\nBusiness Insights computed: {len(results['business_insights'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-stage wall time and memory measurements for the pipeline
+A Profiler records, for every measured step, the wall time, the peak resident
+set size seen while it ran (sampled from /proc/self/statm, falling back to the
+process-wide maximum from getrusage) and optionally the Python allocations
+traced by tracemalloc
+"""
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def max_rss():
+    """Peak resident set size of this process so far in bytes"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _RssSampler(threading.Thread):
+    # Polls the RSS while a step runs, since the process-wide maximum never goes down
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss() or 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss() or 0)
+        return self.peak
+
+
+class Profiler:
+    """Collects measurements of named steps; run steps one at a time for meaningful memory numbers"""
+
+    def __init__(self, trace_allocations=False, interval=0.01):
+        self.trace_allocations = trace_allocations
+        self.interval = interval
+        self.steps = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def measure(self, name):
+        sampler = _RssSampler(self.interval) if current_rss() is not None else None
+        if sampler:
+            sampler.start()
+        # Allocations are traced for outermost steps only (tracemalloc cannot nest)
+        tracing = self.trace_allocations and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            step = {'stage': name, 'seconds': round(time.perf_counter() - start, 4)}
+            if tracing:
+                size, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                step['allocated_mb'] = round(size / 1e6, 2)
+                step['peak_allocated_mb'] = round(peak / 1e6, 2)
+            peak = sampler.stop() if sampler else max_rss()
+            if peak is not None:
+                step['peak_rss_mb'] = round(peak / 1e6, 1)
+            self.steps.append(step)
+
+    def report(self, **extra):
+        """Measurements plus run metadata as a JSON-serializable dict"""
+        peak = max_rss()
+        return {
+            **extra,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'peak_rss_mb': round(peak / 1e6, 1) if peak is not None else None,
+            'stages': self.steps,
+        }
+
+    def write(self, path, **extra):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**extra), f, indent=2)
+
+
+@contextmanager
+def measure(profiler, name):
+    """profiler.measure(name), or nothing when profiler is None"""
+    if profiler is None:
+        yield
+    else:
+        with profiler.measure(name):
+            yield
@@ -0,0 +1,143 @@
+"""
+Atomic publishing of the pipeline outputs
+A run writes its files into a staging directory inside the output directory.
+publish() then writes content-hashed copies of the JSON outputs under hashed/
+(with gzip and, when the brotli package is installed, brotli variants next to
+them) plus one bundle holding every JSON output, and replaces manifest.json.
+The manifest is the commit point: it records every output's size and hash, and
+readers that go through it never see a half-written run. If anything fails
+before it is replaced, the previous manifest and plain files are left as they
+were. Only then are the plain files moved into place, one by one, for readers
+that do not use the manifest; these can briefly mix two runs.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from cache import file_sha256
+
+MANIFEST = 'manifest.json'
+HASHED_DIR = 'hashed'
+BUNDLE = 'bundle.json'
+MANIFEST_VERSION = 1
+
+
+def _write(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def _compressed_variants():
+    variants = [('gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(('br', '.br', brotli.compress))
+    return variants
+
+
+def hashed_copy(output_dir, name, data):
+    """Write data as hashed/<stem>.<hash><ext> plus compressed variants; returns its manifest entry"""
+    digest = hashlib.sha256(data).hexdigest()
+    stem, ext = os.path.splitext(name)
+    path = os.path.join(output_dir, HASHED_DIR, f'{stem}.{digest[:16]}{ext}')
+    entry = {'bytes': len(data), 'sha256': digest, 'file': os.path.relpath(path, output_dir).replace(os.sep, '/')}
+    # Same name means same content, so files left by an earlier run are reused as they are
+    if not os.path.exists(path):
+        _write(path, data)
+    for encoding, suffix, compress in _compressed_variants():
+        if not os.path.exists(path + suffix):
+            _write(path + suffix, compress(data))
+        entry[f'{encoding}_bytes'] = os.path.getsize(path + suffix)
+    return entry
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+
+def _referenced(manifest):
+    files = set()
+    for entry in [manifest.get('bundle'), *manifest.get('outputs', {}).values()]:
+        if entry and 'file' in entry:
+            name = os.path.basename(entry['file'])
+            files.update([name] + [name + suffix for _, suffix, _ in _compressed_variants()])
+    return files
+
+
+def staging_dir(output_dir):
+    """Fresh directory next to the published files (same filesystem, so moving out of it is a rename)"""
+    os.makedirs(output_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix='.staging-', dir=output_dir)
+
+
+def publish(staging, output_dir, **info):
+    """
+    Publish the files in staging (which is removed afterwards, also on failure).
+    Outputs this run did not write keep their previous entries; hashed files of
+    the previous manifest are kept too, for readers still on it. Returns the new
+    manifest.
+    """
+    try:
+        return _publish(staging, output_dir, info)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _publish(staging, output_dir, info):
+    previous = load_manifest(output_dir)
+    os.makedirs(os.path.join(output_dir, HASHED_DIR), exist_ok=True)
+    outputs = dict(previous.get('outputs', {}))
+    written = sorted(os.listdir(staging))
+    contents = {}
+    for name in written:
+        path = os.path.join(staging, name)
+        if name.endswith('.json'):
+            with open(path, 'rb') as f:
+                contents[name] = f.read()
+            outputs[name] = hashed_copy(output_dir, name, contents[name])
+        else:
+            outputs[name] = {'bytes': os.path.getsize(path), 'sha256': file_sha256(path)}
+
+    # One {file name: records} object, so the dashboard needs a single request
+    parts = []
+    for name, entry in sorted(outputs.items()):
+        if name.endswith('.json'):
+            if name not in contents:
+                with open(os.path.join(output_dir, entry['file']), 'rb') as f:
+                    contents[name] = f.read()
+            parts.append(json.dumps(name).encode('utf-8') + b':' + contents[name])
+    bundle = hashed_copy(output_dir, BUNDLE, b'{' + b','.join(parts) + b'}')
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'published_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        **info,
+        'written': written,
+        'bundle': bundle,
+        'outputs': outputs,
+    }
+    _write(os.path.join(output_dir, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    for name in written:
+        os.replace(os.path.join(staging, name), os.path.join(output_dir, name))
+
+    keep = _referenced(manifest) | _referenced(previous)
+    hashed_dir = os.path.join(output_dir, HASHED_DIR)
+    for name in os.listdir(hashed_dir):
+        if name not in keep:
+            os.remove(os.path.join(hashed_dir, name))
+    return manifest
@@ -0,0 +1,198 @@
+"""
+Permutation p-values and bootstrap confidence intervals for the business insights
+Resamples are drawn as NumPy index matrices (one row per resample), in chunks
+small enough to bound memory, and the chunks can be spread over the parallel.py
+backends. Every chunk has its own seed derived from (seed, test name, chunk), so
+results are reproducible and do not depend on the number of workers.
+
+Tests with more than max_rows values resample a seeded random subsample of that
+size instead (each group shrunk in proportion, at least 2 values), so the cost
+is bounded whatever the size of the export; resample_rows records how many
+values were used. The bootstrap of a subsample of m out of N values spreads
+about sqrt(N/m) times wider than one of all N, so its interval is rescaled
+(m-out-of-n bootstrap): the deviations of the resampled statistics from the
+subsample's statistic are shrunk by sqrt(m/N) and added to the statistic of all
+N values. A permutation p-value of the subsample would be just as inflated and
+has no such correction, so it is left out (null) above the cap.
+"""
+
+import zlib
+
+import numpy as np
+
+from parallel import SerialBackend
+
+# Resampled values held in memory at once per chunk (float64 -> 8 bytes each)
+MAX_CELLS = 4000000
+# Values per test (all groups together) that are resampled
+MAX_ROWS = 20000
+
+
+def _group_moments(values, sizes):
+    # Per-row sums and sums of squares of consecutive groups of the given sizes
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    return np.add.reduceat(values, starts, axis=1), np.add.reduceat(values * values, starts, axis=1)
+
+
+def mean_difference(sums, sumsqs, sizes):
+    """Mean of the first group minus mean of the second"""
+    return sums[:, 0] / sizes[0] - sums[:, 1] / sizes[1]
+
+
+def eta_squared(sums, sumsqs, sizes):
+    """Share of the variance explained by the groups (monotonic in the ANOVA F statistic)"""
+    n = sizes.sum()
+    grand = sums.sum(axis=1)
+    total = sumsqs.sum(axis=1) - grand * grand / n
+    between = (sums * sums / sizes).sum(axis=1) - grand * grand / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return between / total
+
+
+def pearson(x, y):
+    """Row-wise Pearson correlation of two matrices"""
+    n = x.shape[1]
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    cov = (x * y).sum(axis=1) - sx * sy / n
+    vx = (x * x).sum(axis=1) - sx * sx / n
+    vy = (y * y).sum(axis=1) - sy * sy / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cov / np.sqrt(vx * vy)
+
+
+def _grouped_statistic(statistic, groups):
+    # statistic of the groups as they are, and their total size
+    sizes = np.array([len(g) for g in groups])
+    sums, sumsqs = _group_moments(np.concatenate(groups)[None, :], sizes)
+    return statistic(sums, sumsqs, sizes)[0], int(sizes.sum())
+
+
+def _grouped_chunk(mode, statistic, groups, rows, seed):
+    # One chunk of a grouped test: 'permutation' shuffles the pooled values across
+    # groups, 'bootstrap' resamples each group with replacement
+    rng = np.random.default_rng(seed)
+    sizes = np.array([len(g) for g in groups])
+    if mode == 'permutation':
+        pooled = np.concatenate(groups)
+        index = rng.permuted(np.broadcast_to(np.arange(len(pooled)), (rows, len(pooled))), axis=1)
+        values = pooled[index]
+    else:
+        values = np.concatenate([g[rng.integers(0, len(g), (rows, len(g)))] for g in groups], axis=1)
+    sums, sumsqs = _group_moments(values, sizes)
+    return statistic(sums, sumsqs, sizes)
+
+
+def _paired_chunk(mode, x, y, rows, seed):
+    # One chunk of the correlation test: 'permutation' shuffles y against x,
+    # 'bootstrap' resamples (x, y) pairs
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    if mode == 'permutation':
+        index = rng.permuted(np.broadcast_to(np.arange(n), (rows, n)), axis=1)
+        return pearson(np.broadcast_to(x, (rows, n)), y[index])
+    index = rng.integers(0, n, (rows, n))
+    return pearson(x[index], y[index])
+
+
+def _run_chunks(task):
+    # All chunks given to one worker, so the data is sent to it only once
+    worker, args, chunks = task
+    return np.concatenate([worker(*args, rows, seed) for rows, seed in chunks])
+
+
+def skipped_fields():
+    """The resampling fields of an insight that was not resampled (--resamples 0 or --append)"""
+    return {
+        'resample_statistic': None,
+        'permutation_p_value': None,
+        'ci_level': None,
+        'ci_low': None,
+        'ci_high': None,
+        'resamples': 0,
+        'resample_rows': 0,
+    }
+
+
+class Resampler:
+    """Runs the resampling tests with a fixed number of resamples, seed and backend"""
+
+    def __init__(self, resamples=2000, seed=42, backend=None, confidence=0.95, max_cells=MAX_CELLS,
+                 max_rows=MAX_ROWS):
+        self.resamples = resamples
+        self.seed = seed
+        self.backend = backend or SerialBackend()
+        self.confidence = confidence
+        self.max_cells = max_cells
+        self.max_rows = max_rows
+
+    def _subsample(self, name, sizes):
+        # Sorted positions to keep from each group (all of them when the test is small enough)
+        total = int(sum(sizes))
+        if not self.max_rows or total <= self.max_rows:
+            return [np.arange(size) for size in sizes]
+        rng = np.random.default_rng([self.seed, zlib.crc32(f'{name}/subsample'.encode('utf-8'))])
+        keep = [min(size, max(2, round(size * self.max_rows / total))) for size in sizes]
+        return [np.sort(rng.choice(size, k, replace=False)) for size, k in zip(sizes, keep)]
+
+    def _run(self, worker, name, args, cells):
+        # Split the resamples into chunks of at most max_cells values, each with its own
+        # seed, and hand contiguous runs of chunks to the backend's workers
+        rows = max(1, min(self.resamples, self.max_cells // max(1, cells)))
+        counts = [min(rows, self.resamples - start) for start in range(0, self.resamples, rows)]
+        root = np.random.SeedSequence([self.seed, zlib.crc32(f'{name}/{args[0]}'.encode('utf-8'))])
+        chunks = list(zip(counts, root.spawn(len(counts))))
+        per_worker = -(-len(chunks) // self.backend.workers)
+        tasks = [(worker, args, chunks[i:i + per_worker]) for i in range(0, len(chunks), per_worker)]
+        return np.concatenate(self.backend.map(_run_chunks, tasks))
+
+    def _fields(self, statistic_name, observed, sampled, permuted, boot, two_sided, rows, total):
+        # observed is the statistic of all total values, sampled that of the rows resampled
+        p_value = None
+        if rows == total:
+            # Small tolerance so resamples equal to the observed value up to rounding count as extreme
+            tolerance = 1e-9 * max(1.0, abs(observed))
+            if two_sided:
+                extreme = np.abs(permuted) >= abs(observed) - tolerance
+            else:
+                extreme = permuted >= observed - tolerance
+            p_value = round(float((extreme.sum() + 1) / (len(permuted) + 1)), 6)
+        boot = boot[~np.isnan(boot)]
+        alpha = (1 - self.confidence) / 2
+        low, high = np.quantile(boot, [alpha, 1 - alpha]) if len(boot) else (np.nan, np.nan)
+        scale = np.sqrt(rows / total)
+        low, high = observed + scale * (low - sampled), observed + scale * (high - sampled)
+        return {
+            'resample_statistic': statistic_name,
+            'permutation_p_value': p_value,
+            'ci_level': self.confidence,
+            'ci_low': round(float(low), 4),
+            'ci_high': round(float(high), 4),
+            'resamples': int(self.resamples),
+            'resample_rows': int(rows),
+        }
+
+    def grouped(self, name, groups, statistic=mean_difference, statistic_name='mean_difference', two_sided=True):
+        """Permutation p-value and bootstrap CI of statistic(groups) for a list of 1-D samples"""
+        groups = [np.asarray(g, dtype='float64') for g in groups]
+        observed, total = _grouped_statistic(statistic, groups)
+        groups = [g[keep] for g, keep in zip(groups, self._subsample(name, [len(g) for g in groups]))]
+        sampled, cells = _grouped_statistic(statistic, groups)
+        permuted = self._run(_grouped_chunk, name, ('permutation', statistic, groups), cells)
+        boot = self._run(_grouped_chunk, name, ('bootstrap', statistic, groups), cells)
+        return self._fields(statistic_name, observed, sampled, permuted, boot, two_sided, cells, total)
+
+    def anova(self, name, groups):
+        """Permutation p-value and bootstrap CI of eta squared across the groups"""
+        return self.grouped(name, groups, eta_squared, 'eta_squared', two_sided=False)
+
+    def correlation(self, name, x, y):
+        """Permutation p-value and bootstrap CI of the Pearson correlation of paired samples"""
+        x = np.asarray(x, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+        observed, total = pearson(x[None, :], y[None, :])[0], len(x)
+        keep = self._subsample(name, [len(x)])[0]
+        x, y = x[keep], y[keep]
+        sampled = pearson(x[None, :], y[None, :])[0]
+        permuted = self._run(_paired_chunk, name, ('permutation', x, y), 2 * len(x))
+        boot = self._run(_paired_chunk, name, ('bootstrap', x, y), 2 * len(x))
+        return self._fields('correlation', observed, sampled, permuted, boot, True, len(x), total)
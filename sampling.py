@@ -0,0 +1,132 @@
+"""
+Scatter sample and density grid for the Q8 price vs rating chart
+Both are built in one pass over cleaned chunks (or the whole frame at once):
+
+- a reservoir sample stratified by department (top level of the category path)
+  and price_range: every row gets a uniform random key and each stratum keeps the
+  per_stratum rows with the smallest keys, so every stratum is represented and
+  the payload is bounded by strata x per_stratum. Keys come from one generator in
+  row order, so the sample does not depend on how the rows were chunked. Each
+  point carries its weight (stratum rows / sampled rows) for weighted views.
+- price x rating counts on a fixed grid (log10 price, 0.1 rating steps) at
+  several resolutions, each coarser level summing 2 x 2 cells of the one below,
+  so a heatmap can be drawn at any zoom from a few thousand cells at most.
+"""
+
+import numpy as np
+import pandas as pd
+
+from accumulators import CoMoments
+
+# Finest grid: log10(price) over PRICE_LOG10 and rating over RATING_RANGE
+PRICE_LOG10 = (1.0, 6.0)
+RATING_RANGE = (1.0, 5.0)
+PRICE_BINS = 64
+RATING_BINS = 40
+LEVELS = 4
+
+
+def departments(categories):
+    """Top level of every category path (missing paths stay missing)"""
+    codes, uniques = pd.factorize(pd.Series(categories))
+    tops = np.array([cat.split('|')[0] for cat in uniques] + [None], dtype=object)
+    return tops[codes]
+
+
+class DensityGrid:
+    """Row counts per (price bin, rating bin) of the finest grid"""
+
+    def __init__(self):
+        self.counts = np.zeros((PRICE_BINS, RATING_BINS), dtype='int64')
+
+    def update(self, price, rating):
+        price = np.asarray(price, dtype='float64')
+        rating = np.asarray(rating, dtype='float64')
+        present = ~(np.isnan(price) | np.isnan(rating)) & (price > 0)
+        low, high = PRICE_LOG10
+        x = np.floor((np.log10(price[present]) - low) / (high - low) * PRICE_BINS)
+        low, high = RATING_RANGE
+        # Ratings have one decimal; the small offset keeps e.g. 4.3 out of the 4.2 bin
+        y = np.floor((rating[present] - low) / (high - low) * RATING_BINS + 1e-6)
+        x = np.clip(x, 0, PRICE_BINS - 1).astype('int64')
+        y = np.clip(y, 0, RATING_BINS - 1).astype('int64')
+        self.counts += np.bincount(x * RATING_BINS + y, minlength=PRICE_BINS * RATING_BINS).reshape(self.counts.shape)
+        return self
+
+    def levels(self):
+        """Sparse [price bin, rating bin, rows] cells per level, coarsest first"""
+        result = []
+        counts = self.counts
+        for level in range(LEVELS):
+            if level:
+                counts = counts.reshape(counts.shape[0] // 2, 2, counts.shape[1] // 2, 2).sum(axis=(1, 3))
+            x, y = np.nonzero(counts)
+            result.append({
+                'price_bins': int(counts.shape[0]),
+                'rating_bins': int(counts.shape[1]),
+                'cells': np.column_stack([x, y, counts[x, y]]).tolist(),
+            })
+        return result[::-1]
+
+
+class ScatterSampler:
+    """Stratified reservoir sample, density grid and price/rating co-moments of a stream of cleaned rows"""
+
+    def __init__(self, per_stratum=20, seed=42):
+        self.per_stratum = per_stratum
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.reservoir = None
+        self.population = None
+        self.grid = DensityGrid()
+        self.moments = CoMoments()
+
+    def update(self, df):
+        """Fold a cleaned frame (with price_range) into the sample"""
+        price = df['discounted_price_clean'].astype('float64')
+        rating = df['rating_clean'].astype('float64')
+        self.moments = self.moments.merge(CoMoments.of(price, rating))
+        self.grid.update(price, rating)
+        rows = pd.DataFrame({
+            'price': price.to_numpy(),
+            'rating': rating.to_numpy(),
+            'category': departments(df['category']),
+            'price_range': df['price_range'].astype(object).to_numpy(),
+            # One key per row, drawn even for rows without a point, so chunking does not matter
+            'key': self.rng.random(len(df)),
+        }).dropna(subset=['price', 'rating'])
+        strata = ['category', 'price_range']
+        counts = rows.groupby(strata, dropna=False).size()
+        if self.reservoir is None:
+            self.population, candidates = counts, rows
+        else:
+            self.population = self.population.add(counts, fill_value=0).astype('int64')
+            candidates = pd.concat([self.reservoir, rows], ignore_index=True)
+        self.reservoir = candidates.sort_values('key', kind='stable').groupby(
+            strata, dropna=False).head(self.per_stratum).reset_index(drop=True)
+        return self
+
+    def result(self):
+        """The Q8 payload: correlation, weighted stratified scatter and the density levels"""
+        if self.reservoir is None:
+            self.update(pd.DataFrame(columns=['discounted_price_clean', 'rating_clean', 'category', 'price_range']))
+        points = self.reservoir
+        strata = ['category', 'price_range']
+        sampled = points.groupby(strata, dropna=False)['key'].transform('size')
+        population = self.population.reindex(pd.MultiIndex.from_frame(points[strata])).to_numpy()
+        points = points.assign(weight=population / sampled.to_numpy()).sort_values(strata + ['key'])
+        return {
+            'correlation': round(float(self.moments.correlation), 4),
+            'scatter': points[['price', 'rating', 'category', 'price_range', 'weight']].round(2).to_dict('records'),
+            'sample': {
+                'rows': int(self.population.sum()),
+                'strata': int(len(self.population)),
+                'per_stratum': self.per_stratum,
+                'seed': self.seed,
+            },
+            'density': {
+                'price_log10': list(PRICE_LOG10),
+                'rating': list(RATING_RANGE),
+                'levels': self.grid.levels(),
+            },
+        }
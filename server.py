@@ -0,0 +1,430 @@
+"""
+Query API over the cleaned Amazon Sales data
+A small asyncio HTTP server that loads the cleaned frame once (from the Feather
+cache when possible) and answers filtered, sorted and paginated versions of the
+dashboard tables. Results are kept in an LRU cache keyed by the query, which is
+cleared whenever process_data.py publishes a new run.
+
+Usage: python server.py --input amazon_sales_data.csv --port 8000
+
+Endpoints (all GET, JSON; list endpoints return the same records as the matching
+dashboard_data file and the unpaginated count in X-Total-Count):
+  /api/health
+  /api/summary_stats
+  /api/category_stats       level=N groups by the first N path levels
+  /api/price_range_stats
+  /api/discount_stats
+  /api/top_products         n=3 per category (Q2)
+  /api/top_rated_products
+  /api/products             search=<text in product_name>
+Filters on every endpoint: prefix=<category path prefix>, price_range=<labels>,
+discount_range=<labels> (comma-separated). Lists also take sort=<column>,
+order=asc|desc, limit and offset.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from aggregates import PartialAggregates, add_ranges, category_cube, top_products_by_category
+from cache import load_cleaned, store_cleaned
+from cleaning import clean_frame
+from dedup import product_groups, with_groups
+from publish import MANIFEST
+
+MAX_LIMIT = 1000
+
+PRODUCT_COLUMNS = {
+    'product_id': 'product_id',
+    'product_name': 'product_name',
+    'category': 'category',
+    'discounted_price_clean': 'discounted_price',
+    'actual_price_clean': 'actual_price',
+    'discount_percentage_clean': 'discount_percentage',
+    'rating_clean': 'rating',
+    'rating_count_clean': 'rating_count',
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class LRUCache:
+    """Least-recently-used cache of encoded responses"""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {'size': len(self.entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def load_frame(input_path, cache_dir):
+    """The cleaned frame, from the columnar cache when it is current"""
+    df = load_cleaned(input_path, cache_dir)
+    if df is None:
+        df = add_ranges(clean_frame(pd.read_csv(input_path, encoding='utf-8')))
+        if store_cleaned(df, input_path, cache_dir):
+            df = load_cleaned(input_path, cache_dir)
+    return df
+
+
+def _int_param(params, name, default, minimum=0, maximum=None):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        bounds = f'>= {minimum}' if maximum is None else f'between {minimum} and {maximum}'
+        raise BadRequest(f"{name} must be {bounds}")
+    return value
+
+
+def _labels(params, name):
+    return [label for label in params.get(name, '').split(',') if label]
+
+
+class DataStore:
+    """The cleaned frame plus the queries the API answers"""
+
+    def __init__(self, input_path, cache_dir, dedup_threshold=0):
+        self.input_path = input_path
+        self.cache_dir = cache_dir
+        self.dedup_threshold = dedup_threshold
+        self.df = None
+        self.cube_index = None
+        self.cells = None
+        self.ranked = None
+        self.by_rating = None
+        self.loaded_at = None
+
+    def load(self):
+        df = load_frame(self.input_path, self.cache_dir)
+        if self.dedup_threshold:
+            # Same product groups as process_data.py, for the Q2 and top rated lists
+            df = with_groups(df, product_groups(df, self.dedup_threshold))
+            df['group_code'] = pd.factorize(df['product_group'])[0]
+        # Aggregate queries only filter on category and the range bins, so they are
+        # answered from the category cube's cells instead of the rows
+        cube = category_cube(df)
+        self.cube_index = list(cube.index.names)
+        self.cells = cube.reset_index()
+        # Rows ranked once by reviews and by rating, the default orders of the row queries
+        self.ranked = df.sort_values('rating_count_clean', ascending=False, kind='stable', na_position='last')
+        self.by_rating = df.sort_values('rating_clean', ascending=False, kind='stable', na_position='last')
+        self.df = df
+        self.loaded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        return self
+
+    # --- Filtering and paging ---
+
+    def _mask(self, frame, params):
+        mask = np.ones(len(frame), dtype=bool)
+        prefix = params.get('prefix')
+        if prefix:
+            # Match on the distinct categories, then broadcast to the rows
+            categories = pd.Series(frame['category'].unique()).dropna()
+            wanted = categories[(categories == prefix) | categories.str.startswith(prefix + '|')]
+            mask &= frame['category'].isin(wanted).to_numpy()
+        for name in ['price_range', 'discount_range']:
+            labels = _labels(params, name)
+            if labels:
+                mask &= frame[name].isin(labels).to_numpy()
+        search = params.get('search')
+        if search:
+            names = pd.Series(frame['product_name'].unique()).dropna()
+            wanted = names[names.str.contains(search, case=False, regex=False)]
+            mask &= frame['product_name'].isin(wanted).to_numpy()
+        return mask
+
+    def filtered(self, params, frame=None):
+        """Rows (or another frame with the same columns) matching the filters"""
+        frame = self.df if frame is None else frame
+        mask = self._mask(frame, params)
+        return frame if mask.all() else frame[mask]
+
+    def page(self, table, params, default_sort=None, default_order='desc', default_limit=MAX_LIMIT, distinct=None):
+        """Sort, then slice a DataFrame (keeping the first row of each value of distinct); returns (page, total rows)"""
+        sort = params.get('sort', default_sort)
+        if sort and not table.empty:
+            if sort not in table.columns:
+                raise BadRequest(f"Cannot sort by {sort}; columns: {', '.join(table.columns)}")
+            order = params.get('order', default_order)
+            if order not in ('asc', 'desc'):
+                raise BadRequest("order must be asc or desc")
+            table = table.sort_values(sort, ascending=order == 'asc', kind='stable', na_position='last')
+        if distinct and distinct in table.columns:
+            table = table[~(table.duplicated(distinct) & table[distinct].notna())]
+        offset = _int_param(params, 'offset', 0)
+        limit = _int_param(params, 'limit', default_limit, 1, MAX_LIMIT)
+        return table.iloc[offset:offset + limit], len(table)
+
+    def _aggregates(self, params, level=None):
+        """PartialAggregates of the filtered rows, or None if nothing matches"""
+        if params.get('search'):
+            # Product-name filters need the rows
+            rows = self.filtered(params)
+            cells = category_cube(rows).reset_index() if len(rows) else rows
+        else:
+            cells = self.filtered(params, self.cells)
+        if not len(cells):
+            return None
+        if level:
+            # Category paths cut to their first `level` components
+            codes, uniques = pd.factorize(cells['category'])
+            # Trailing None so missing categories (code -1) stay missing
+            cut = np.array(['|'.join(cat.split('|')[:level]) for cat in uniques] + [None], dtype=object)
+            cells = cells.assign(category=cut[codes])
+        return PartialAggregates.from_cube(cells.set_index(self.cube_index))
+
+    # --- Endpoints: each returns (payload, total rows or None) ---
+
+    def summary_stats(self, params):
+        aggregates = self._aggregates(params)
+        return (aggregates.summary_stats() if aggregates else {'total_products': 0}), None
+
+    def category_stats(self, params):
+        aggregates = self._aggregates(params, _int_param(params, 'level', 0) or None)
+        return self.page(aggregates.category_stats() if aggregates else pd.DataFrame(), params)
+
+    def price_range_stats(self, params):
+        aggregates = self._aggregates(params)
+        return self.page(aggregates.price_range_stats() if aggregates else pd.DataFrame(), params)
+
+    def discount_stats(self, params):
+        aggregates = self._aggregates(params)
+        return self.page(aggregates.discount_stats() if aggregates else pd.DataFrame(), params)
+
+    def top_products(self, params):
+        df = self.filtered(params, self.ranked)
+        n = _int_param(params, 'n', 3, 1, 100)
+        rows = [row for _, group in top_products_by_category(df, n) for row in group]
+        table = pd.DataFrame(rows, columns=list(rows[0]) if rows else ['category', 'product_name', 'rating_count', 'rating'])
+        return self.page(table, params)
+
+    def _rows(self, params, columns, default_sort, default_limit, distinct=False):
+        # distinct: one row per product group (the first in the requested order)
+        distinct = distinct and 'product_group' in self.df.columns
+        sort = params.get('sort', default_sort)
+        if params.get('order', 'desc') == 'desc' and sort in ('rating_count', 'rating'):
+            # Pre-ranked copy in the requested order: only the rows of the page are copied
+            frame = self.ranked if sort == 'rating_count' else self.by_rating
+            positions = np.flatnonzero(self._mask(frame, params))
+            if distinct:
+                codes = frame['group_code'].to_numpy()[positions]
+                _, first = np.unique(codes, return_index=True)
+                keep = np.zeros(len(positions), dtype=bool)
+                keep[first] = True
+                positions = positions[keep | (codes < 0)]
+            offset = _int_param(params, 'offset', 0)
+            limit = _int_param(params, 'limit', default_limit, 1, MAX_LIMIT)
+            page = frame.iloc[positions[offset:offset + limit]]
+            return page[columns].rename(columns=PRODUCT_COLUMNS), len(positions)
+        table = self.filtered(params)[columns].rename(columns=PRODUCT_COLUMNS)
+        return self.page(table, params, default_sort=default_sort, default_limit=default_limit,
+                         distinct='product_group' if distinct else None)
+
+    def top_rated_products(self, params):
+        # Same order as the published file: nlargest keeps file order among ties
+        columns = ['product_name', 'category', 'rating_clean', 'rating_count_clean', 'discounted_price_clean']
+        if 'product_group' in self.df.columns:
+            columns.append('product_group')
+        return self._rows(params, columns, 'rating', 20, distinct=True)
+
+    def products(self, params):
+        return self._rows(params, list(PRODUCT_COLUMNS), 'rating_count', 50)
+
+
+ENDPOINTS = {
+    '/api/summary_stats': DataStore.summary_stats,
+    '/api/category_stats': DataStore.category_stats,
+    '/api/price_range_stats': DataStore.price_range_stats,
+    '/api/discount_stats': DataStore.discount_stats,
+    '/api/top_products': DataStore.top_products,
+    '/api/top_rated_products': DataStore.top_rated_products,
+    '/api/products': DataStore.products,
+}
+
+
+def encode(payload):
+    if isinstance(payload, pd.DataFrame):
+        return payload.to_json(orient='records').encode('utf-8')
+    return json.dumps(payload).encode('utf-8')
+
+
+def _run_endpoint(endpoint, store, params):
+    # Query and JSON encoding both run off the event loop
+    payload, total = endpoint(store, params)
+    return encode(payload), total
+
+
+class QueryServer:
+    """HTTP/1.1 front end: routing, the result cache and reloads on publish"""
+
+    def __init__(self, store, cache, manifest_path=None, poll_interval=1.0):
+        self.store = store
+        self.cache = cache
+        self.manifest_path = manifest_path
+        self.poll_interval = poll_interval
+        self.manifest_mtime = self._manifest_mtime()
+        self.generation = 0
+        self.pending = {}
+
+    def _manifest_mtime(self):
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            return os.stat(self.manifest_path).st_mtime_ns
+        return None
+
+    async def watch(self):
+        """Reload the data and drop cached results whenever process_data.py publishes a new manifest"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            mtime = self._manifest_mtime()
+            if mtime != self.manifest_mtime:
+                self.manifest_mtime = mtime
+                # Load into a new store and swap, so running queries keep a consistent view
+                self.store = await asyncio.to_thread(DataStore(self.store.input_path, self.store.cache_dir, self.store.dedup_threshold).load)
+                self.generation += 1
+                self.cache.clear()
+                print(f"New data published, reloaded {len(self.store.df):,} rows")
+
+    async def respond(self, method, target):
+        if method != 'GET':
+            return 405, {'error': 'Only GET is supported'}, None
+        url = urlsplit(target)
+        if url.path == '/api/health':
+            return 200, {'rows': len(self.store.df), 'loaded_at': self.store.loaded_at,
+                         'generation': self.generation, 'cache': self.cache.stats()}, None
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            return 404, {'error': f'Unknown endpoint {url.path}', 'endpoints': sorted(ENDPOINTS)}, None
+        params = dict(parse_qsl(url.query))
+        key = (url.path, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return 200, cached[0], cached[1]
+        # Concurrent requests for the same uncached query share one computation
+        pending_key = (self.generation, key)
+        task = self.pending.get(pending_key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, endpoint, params))
+            self.pending[pending_key] = task
+            task.add_done_callback(lambda _: self.pending.pop(pending_key, None))
+        try:
+            body, total = await task
+        except BadRequest as e:
+            return 400, {'error': str(e)}, None
+        except Exception as e:
+            return 500, {'error': f'{type(e).__name__}: {e}'}, None
+        return 200, body, total
+
+    async def _compute(self, key, endpoint, params):
+        generation = self.generation
+        store = self.store
+        body, total = await asyncio.to_thread(lambda: _run_endpoint(endpoint, store, params))
+        # Do not cache a result computed from data that was replaced meanwhile
+        if generation == self.generation:
+            self.cache.put(key, (body, total))
+        return body, total
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                start = time.perf_counter()
+                status, body, total = await self.respond(method, target)
+                if not isinstance(body, bytes):
+                    body = encode(body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = [
+                    f'HTTP/1.1 {status} {REASONS.get(status, "")}',
+                    'Content-Type: application/json',
+                    f'Content-Length: {len(body)}',
+                    'Access-Control-Allow-Origin: *',
+                    'Access-Control-Expose-Headers: X-Total-Count',
+                    f'Server-Timing: app;dur={(time.perf_counter() - start) * 1000:.2f}',
+                    'Connection: ' + ('keep-alive' if keep_alive else 'close'),
+                ]
+                if total is not None:
+                    head.append(f'X-Total-Count: {total}')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+async def serve(args):
+    print(f"Loading {args.input}...")
+    store = await asyncio.to_thread(DataStore(args.input, args.cache_dir, args.dedup_threshold).load)
+    app = QueryServer(store, LRUCache(args.cache_size), os.path.join(args.output_dir, MANIFEST))
+    server = await asyncio.start_server(app.handle, args.host, args.port)
+    print(f"Serving {len(store.df):,} rows on http://{args.host}:{args.port}/api/")
+    async with server:
+        await asyncio.gather(server.serve_forever(), app.watch())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query API over the cleaned Amazon Sales data')
+    parser.add_argument('--input', default='amazon_sales_data.csv', help='raw CSV export (cleaned via the .cache)')
+    parser.add_argument('--cache-dir', default='.cache')
+    parser.add_argument('--output-dir', default='dashboard_data', help='where process_data.py publishes (watched for reloads)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-size', type=int, default=512, help='query results kept in the LRU cache')
+    parser.add_argument('--dedup-threshold', type=float, default=0,
+                        help='same as process_data.py: near-duplicate names count as one product (default 0 = exact names)')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# The pipeline modules are top-level scripts, and the synthetic data helpers live in benchmarks/
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
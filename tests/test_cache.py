@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+import pytest
+
+import cache
+from aggregates import add_ranges
+from cleaning import clean_frame
+from verify_incremental import make_raw
+
+pytestmark = pytest.mark.skipif(not cache.available(), reason='the cache needs pyarrow')
+
+
+def test_cleaning_code_change_is_a_cache_miss(tmp_path, monkeypatch):
+    input_path = str(tmp_path / 'input.csv')
+    raw = make_raw(500, np.random.default_rng(2))
+    raw.to_csv(input_path, index=False)
+    df = add_ranges(clean_frame(raw))
+    cache_dir = str(tmp_path / 'cache')
+    cache.store_cleaned(df, input_path, cache_dir)
+    assert cache.load_cleaned(input_path, cache_dir) is not None
+
+    monkeypatch.setattr(cache, 'cleaning_version', lambda: 'changed')
+    assert cache.load_cleaned(input_path, cache_dir) is None
+    # Storing again under the new code replaces the old entry
+    cache.store_cleaned(df, input_path, cache_dir)
+    assert cache.load_cleaned(input_path, cache_dir) is not None
+    assert len([name for name in os.listdir(cache_dir) if name.endswith('.feather')]) == 1
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_cleaning import legacy, make_columns, vectorized
+from cleaning import (clean_discount, clean_discount_column, clean_frame, clean_price, clean_price_column,
+                      clean_rating_count, clean_rating_count_column)
+
+# Well formed, comma formatted, missing, malformed and '|' values as they appear in exports
+PRICES = ['₹1,099', '₹399', '₹1,23,456.50', ' ₹ 99 ', '1099', '₹1,099|', '|', '', 'free', '₹', None, np.nan,
+          '₹12.5.3', 1099.0]
+DISCOUNTS = ['64%', '0%', ' 12 %', '12.5%', '|', '--%', '%', '', 'abc', None, np.nan, '100', 7]
+COUNTS = ['24,269', '1,00,000', '7', ' 43,994 ', '3.0', '1e3', '|', 'n/a', '', '-5', 'inf', None, np.nan, 12]
+
+
+def as_expected(values, clean):
+    return pd.Series([clean(v) for v in values], dtype='float64')
+
+
+@pytest.mark.parametrize('values, clean, column', [
+    (PRICES, clean_price, clean_price_column),
+    (DISCOUNTS, clean_discount, clean_discount_column),
+    (COUNTS, clean_rating_count, clean_rating_count_column),
+])
+def test_vectorized_matches_scalar(values, clean, column):
+    series = pd.Series(values, dtype=object)
+    result = column(series).astype('float64')
+    pd.testing.assert_series_equal(result, as_expected(values, clean), check_names=False)
+
+
+def test_known_values():
+    assert clean_price_column(pd.Series(['₹1,23,456.50', '₹1,099|', '|'])).tolist()[:2] == [123456.5, 1099.0]
+    assert np.isnan(clean_price_column(pd.Series(['|']))[0])
+    assert clean_discount_column(pd.Series(['64%', '--%'])).isna().tolist() == [False, True]
+    counts = clean_rating_count_column(pd.Series(['1,00,000', '3.9', 'n/a', None]))
+    assert counts.dtype == 'Int32'
+    assert counts.tolist()[:2] == [100000, 3] and counts[2:].isna().all()
+
+
+def test_counts_beyond_int32_stay_exact():
+    counts = clean_rating_count_column(pd.Series(['3,000,000,000', '1']))
+    assert counts.dtype == 'Int64'
+    assert counts.tolist() == [3000000000, 1]
+
+
+def test_compact_prices_only_when_lossless():
+    assert clean_price_column(pd.Series(['₹1,099', '₹399.5']), compact=True).dtype == 'float32'
+    assert clean_price_column(pd.Series(['₹1,099.13']), compact=True).dtype == 'float64'
+
+
+def test_synthetic_columns_match_scalar_cleaners():
+    cols = make_columns(5000)
+    pd.testing.assert_frame_equal(vectorized(cols).astype('float64'), legacy(cols).astype('float64'))
+
+
+def test_clean_frame_adds_columns():
+    df = pd.DataFrame({'discounted_price': ['₹399', '|'], 'actual_price': ['₹1,099', '₹999'],
+                       'discount_percentage': ['64%', '|'], 'rating': ['4.2', '|'], 'rating_count': ['24,269', '|']})
+    clean_frame(df)
+    assert df['discount_amount'].tolist()[0] == 700.0
+    assert df.loc[1, ['discounted_price_clean', 'discount_percentage_clean', 'rating_clean']].isna().all()
+    assert pd.isna(df.loc[1, 'rating_count_clean'])
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from dedup import cluster_names, jaccard, normalize, product_groups, word_sets
+
+
+def test_model_numbers_stay_separate():
+    # Seven words with six shared: exact Jaccard 0.75, below the threshold, though the
+    # MinHash estimate of many of these pairs reaches 0.8
+    names = [f'boAt Rockerz {model} Bluetooth Wireless Headphones Black' for model in range(100, 400, 5)]
+    assert len(set(cluster_names(names, 0.8))) == len(names)
+
+
+def test_variants_are_grouped():
+    names = [
+        'boAt Rockerz 450 Bluetooth Wireless Headphones Black',
+        'Boat rockerz-450 bluetooth wireless headphones, black',
+        'Black boAt Rockerz 450 Wireless Bluetooth Headphones',
+        'boAt Rockerz 450 Bluetooth Wireless Headphones Black Edition',
+    ]
+    assert len(set(cluster_names(names, 0.8))) == 1
+
+
+def test_groups_are_not_chained():
+    # a-b and b-c reach 0.8 but a-c does not, so c cannot join a's group through b
+    a = 'w1 w2 w3 w4 w5 w6 w7 w8 w9'
+    b = 'w1 w2 w3 w4 w5 w6 w7 w8 x9'
+    c = 'w1 w2 w3 w4 w5 w6 w7 x8 x9'
+    labels = cluster_names([a, b, c], 0.8)
+    assert labels[0] == labels[1] != labels[2]
+
+
+def test_every_member_matches_its_canonical_name():
+    rng = np.random.default_rng(0)
+    bases = [rng.choice(40, 9, replace=False) for _ in range(40)]
+    names = []
+    for _ in range(1500):
+        words = bases[rng.integers(len(bases))].copy()
+        changed = rng.integers(0, 3)
+        words[rng.choice(9, changed, replace=False)] = rng.integers(40, 80, changed)
+        names.append(' '.join(f'w{i}' for i in rng.permutation(words)))
+    df = pd.DataFrame({'product_id': [f'B{i:05d}' for i in range(len(names))], 'product_name': names})
+    groups = product_groups(df, 0.8)
+    assert groups['canonical_name'].nunique() < len(groups)
+    sets = word_sets(normalize(pd.concat([groups.index.to_series(), groups['canonical_name']], ignore_index=True)))
+    pairs = np.column_stack([np.arange(len(groups)), np.arange(len(groups)) + len(groups)])
+    assert (jaccard(sets, pairs) >= 0.8).all()
+    # The canonical name is the group's most listed name
+    listings = df['product_name'].value_counts()
+    best = groups.assign(listings=listings.reindex(groups.index).to_numpy()).groupby('canonical_name')['listings'].max()
+    assert (listings.reindex(best.index).to_numpy() == best.to_numpy()).all()
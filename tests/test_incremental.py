@@ -0,0 +1,24 @@
+import filecmp
+import json
+
+import numpy as np
+
+from verify_incremental import INCREMENTAL_OUTPUTS, make_raw, mutate, run
+
+
+def test_incremental_matches_full_run(tmp_path):
+    rng = np.random.default_rng(11)
+    raw = make_raw(3000, rng)
+    state = tmp_path / 'state.pkl'
+    for round_no in range(3):
+        if round_no:
+            raw = mutate(raw, rng)
+        raw.to_csv(tmp_path / 'input.csv', index=False)
+        run(str(tmp_path / 'incremental'), '--incremental', str(state))
+        run(str(tmp_path / 'full'))
+        with open(tmp_path / 'incremental' / 'dashboard_data' / 'manifest.json', encoding='utf-8') as f:
+            assert sorted(json.load(f)['written']) == sorted(INCREMENTAL_OUTPUTS)
+        mismatched = [name for name in INCREMENTAL_OUTPUTS
+                      if not filecmp.cmp(tmp_path / 'incremental' / 'dashboard_data' / name,
+                                         tmp_path / 'full' / 'dashboard_data' / name, shallow=False)]
+        assert mismatched == [], f'round {round_no}'
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+import pytest
+
+from bench_keywords import legacy, make_names
+from conftest import ROOT
+from keywords import KeywordCounter, tokenize, top_keywords
+
+
+@pytest.fixture(scope='module')
+def names():
+    # The sample export's product names plus synthetic ones with a long tail of keywords
+    sample = pd.read_csv(os.path.join(ROOT, 'dashboard_data', 'cleaned_data.csv'), usecols=['product_name'])
+    return pd.concat([sample['product_name'], make_names(20000)], ignore_index=True)
+
+
+def exact_counts(names):
+    return tokenize(names.dropna()).value_counts()
+
+
+def test_exact_mode_matches_value_counts(names):
+    assert top_keywords(names) == legacy(names)
+
+
+def test_space_saving_error_bound(names):
+    capacity = 300
+    counts = exact_counts(names)
+    total = int(counts.sum())
+    counter = KeywordCounter(capacity)
+    for start in range(0, len(names), 5000):
+        counter.update(names.dropna().iloc[start:start + 5000].to_numpy())
+    assert counter.total == total
+    for keyword, estimate in counter.estimates.items():
+        true = int(counts.get(keyword, 0))
+        # Never underestimated, overestimated by at most the recorded error <= total / capacity
+        assert true <= estimate <= true + counter.errors[keyword]
+        assert counter.errors[keyword] <= total / capacity
+    # Keywords counted more than total / capacity times are all kept
+    assert set(counts[counts > total / capacity].index) <= set(counter.estimates.index)
+
+
+def test_merged_summaries_keep_the_bound(names):
+    capacity = 300
+    names = names.dropna()
+    half = len(names) // 2
+    merged = KeywordCounter(capacity).update(names.iloc[:half].to_numpy())
+    merged.merge(KeywordCounter(capacity).update(names.iloc[half:].to_numpy()))
+    counts = exact_counts(names)
+    for keyword, estimate in merged.estimates.items():
+        true = int(counts.get(keyword, 0))
+        assert true <= estimate <= true + merged.errors[keyword] <= true + merged.total / capacity
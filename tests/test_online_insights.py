@@ -0,0 +1,31 @@
+import numpy as np
+
+from verify_incremental import make_raw
+from verify_online_insights import EXACT, run
+
+
+def test_appended_insights_match_full_runs(tmp_path):
+    raw = make_raw(6000, np.random.default_rng(9))
+    state = str(tmp_path / 'insights.pkl')
+    raw.iloc[:3000].to_csv(tmp_path / 'base.csv', index=False)
+    run(str(tmp_path / 'online'), '--input', str(tmp_path / 'base.csv'), '--only', 'business_insights',
+        '--insight-state', state)
+    for batch_no, (start, end) in enumerate([(3000, 4500), (4500, 6000)]):
+        raw.iloc[start:end].to_csv(tmp_path / f'batch{batch_no}.csv', index=False)
+        online, _ = run(str(tmp_path / 'online'), '--append', str(tmp_path / f'batch{batch_no}.csv'),
+                        '--insight-state', state)
+        raw.iloc[:end].to_csv(tmp_path / 'input.csv', index=False)
+        full, _ = run(str(tmp_path / 'full'), '--input', str(tmp_path / 'input.csv'), '--only', 'business_insights')
+
+        assert {name: list(insight) for name, insight in online.items()} == \
+            {name: list(insight) for name, insight in full.items()}
+        for name in EXACT:
+            assert online[name] == full[name], name
+        # Quantile splits: only rows in a threshold's bucket may land in another group
+        insight7 = online['insight7']
+        assert abs(insight7['top_products_count'] - full['insight7']['top_products_count']) \
+            <= insight7['split_error_rows']
+        tiers, full_tiers = online['insight4']['tier_counts'], full['insight4']['tier_counts']
+        assert tiers.keys() == full_tiers.keys()
+        assert max(abs(tiers[t] - full_tiers[t]) for t in tiers) <= online['insight4']['split_error_rows']
+        assert full['insight4']['split_error_rows'] == full['insight7']['split_error_rows'] == 0
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from aggregates import add_ranges
+from cleaning import clean_frame
+from conftest import ROOT
+from parallel import ProcessPoolBackend, SerialBackend, parallel_aggregates
+from verify_incremental import make_raw
+
+
+def test_spawned_workers_match_serial():
+    # spawn re-imports the modules in every worker, as on Windows and macOS
+    df = add_ranges(clean_frame(make_raw(3000, np.random.default_rng(3))))
+    serial = parallel_aggregates(df, SerialBackend()).category_stats()
+    spawned = parallel_aggregates(df, ProcessPoolBackend(2, start_method='spawn')).category_stats()
+    pd.testing.assert_frame_equal(serial, spawned)
+
+
+def test_importing_process_data_runs_nothing():
+    # Workers started with spawn/forkserver import the main script again
+    result = subprocess.run([sys.executable, '-c', 'import process_data'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == ''
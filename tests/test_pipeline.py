@@ -0,0 +1,36 @@
+import json
+
+import numpy as np
+import pytest
+
+from process_data import main, registry
+from verify_incremental import make_raw, run
+
+
+def test_profiled_stages_run_one_at_a_time(tmp_path):
+    make_raw(2000, np.random.default_rng(5)).to_csv(tmp_path / 'input.csv', index=False)
+    run(str(tmp_path / 'run'), '--no-cache', '--jobs', '4', '--profile', 'profile.json', '--trace-allocations')
+    with open(tmp_path / 'run' / 'profile.json', encoding='utf-8') as f:
+        steps = json.load(f)['stages']
+    stages = [step for step in steps if step['stage'] in registry.stages]
+    assert stages
+    # Allocations are only traced for steps that do not overlap another one
+    assert all('allocated_mb' in step for step in stages)
+    # Every write follows its own stage directly
+    for previous, step in zip(steps, steps[1:]):
+        if step['stage'].endswith(':write'):
+            assert previous['stage'] == step['stage'][:-len(':write')]
+
+
+@pytest.mark.parametrize('argv', [
+    ['--chunksize', '100', '--incremental', 'state.pkl'],
+    ['--chunksize', '100', '--only', 'insight_q6'],
+    ['--incremental', 'state.pkl', '--only', 'insight_q2', 'insight_q7'],
+    ['--incremental', 'state.pkl', '--dedup-threshold', '0.8'],
+    ['--append', 'rows.csv', '--insight-state', 'insights.pkl', '--only', 'insight_q1'],
+])
+def test_conflicting_options_are_rejected(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    assert exit_info.value.code == 2
+    assert 'error' in capsys.readouterr().err
@@ -0,0 +1,46 @@
+import json
+import os
+
+import pytest
+
+import publish
+
+
+def stage(output_dir, files):
+    staging = publish.staging_dir(str(output_dir))
+    for name, data in files.items():
+        with open(os.path.join(staging, name), 'w', encoding='utf-8') as f:
+            f.write(data)
+    return staging
+
+
+def snapshot(output_dir):
+    return {name: (output_dir / name).read_bytes() for name in os.listdir(output_dir)
+            if (output_dir / name).is_file()}
+
+
+def test_manifest_points_at_the_published_run(tmp_path):
+    manifest = publish.publish(stage(tmp_path, {'a.json': '[1]', 'b.json': '[2]', 'c.csv': 'x\n1\n'}), str(tmp_path))
+    for name in ['a.json', 'b.json']:
+        hashed = tmp_path / manifest['outputs'][name]['file']
+        assert hashed.read_bytes() == (tmp_path / name).read_bytes()
+    bundle = json.loads((tmp_path / manifest['bundle']['file']).read_text())
+    assert bundle == {'a.json': [1], 'b.json': [2]}
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.staging-')]
+
+
+def test_failed_publish_leaves_the_previous_run(tmp_path, monkeypatch):
+    publish.publish(stage(tmp_path, {'a.json': '[1]', 'b.json': '[2]'}), str(tmp_path))
+    before = snapshot(tmp_path)
+    original = publish.hashed_copy
+
+    def failing_copy(output_dir, name, data):
+        if name == 'b.json':
+            raise OSError('disk full')
+        return original(output_dir, name, data)
+
+    monkeypatch.setattr(publish, 'hashed_copy', failing_copy)
+    with pytest.raises(OSError):
+        publish.publish(stage(tmp_path, {'a.json': '[10]', 'b.json': '[20]'}), str(tmp_path))
+    assert snapshot(tmp_path) == before
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.staging-')]
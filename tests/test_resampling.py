@@ -0,0 +1,39 @@
+import numpy as np
+
+from parallel import ProcessPoolBackend, SerialBackend
+from resampling import Resampler
+
+
+def samples(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(4.1, 0.3, n), rng.normal(4.12, 0.3, n), rng.normal(4.15, 0.3, n)]
+
+
+def run_all(resampler):
+    groups = samples(3000)
+    return [
+        resampler.grouped('insight1', groups[:2]),
+        resampler.anova('insight4', groups),
+        resampler.correlation('insight6', groups[0], groups[0] + groups[1]),
+    ]
+
+
+def test_results_depend_on_seed_only():
+    # Small chunks so the resamples are spread over many seeded chunks and both workers
+    serial = run_all(Resampler(200, seed=5, max_cells=50000))
+    assert run_all(Resampler(200, seed=5, max_cells=50000)) == serial
+    pooled = run_all(Resampler(200, seed=5, backend=ProcessPoolBackend(2), max_cells=50000))
+    assert pooled == serial
+    assert run_all(Resampler(200, seed=6, backend=SerialBackend(), max_cells=50000)) != serial
+
+
+def test_subsampled_interval_matches_all_rows():
+    a, b = samples(150000)[:2]
+    fields = Resampler(1000, max_rows=5000).grouped('insight1', [a, b])
+    difference = a.mean() - b.mean()
+    se = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    assert fields['resample_rows'] == 5000
+    assert fields['permutation_p_value'] is None
+    # Centred on the statistic of all rows, about as wide as the analytic 95% interval
+    assert abs((fields['ci_low'] + fields['ci_high']) / 2 - difference) < 0.2 * se
+    assert abs((fields['ci_high'] - fields['ci_low']) / (2 * 1.96 * se) - 1) < 0.2
@@ -0,0 +1,19 @@
+import pytest
+
+from server import BadRequest, DataStore, _int_param
+
+
+def test_int_param_bounds():
+    assert _int_param({'offset': '5'}, 'offset', 0) == 5
+    assert _int_param({}, 'limit', 50, 1, 100) == 50
+    with pytest.raises(BadRequest, match='offset must be >= 0'):
+        _int_param({'offset': '-1'}, 'offset', 0)
+    with pytest.raises(BadRequest, match='limit must be between 1 and 100'):
+        _int_param({'limit': '101'}, 'limit', 50, 1, 100)
+    with pytest.raises(BadRequest, match='must be an integer'):
+        _int_param({'n': 'x'}, 'n', 3)
+
+
+def test_store_attributes_exist_before_load():
+    store = DataStore('input.csv', '.cache')
+    assert store.cube_index is None and store.cells is None and store.df is None